@@ -0,0 +1,179 @@
+"""
+an in-memory stand in for an evdev.InputDevice
+
+the events are written as raw input_event structs into a pipe,
+so select() / loop.add_reader() work on it like on a real device
+
+importing this also replaces uinput and the x display (see
+install_fake_backend), so it has to be imported before src is,
+which makes its virtual devices and opens the display on import
+"""
+import os
+import struct
+import time
+
+import evdev
+import Xlib.display
+
+# struct input_event {
+#     struct timeval time;  (long, long)
+#     __u16 type;
+#     __u16 code;
+#     __s32 value;
+# }
+INPUT_EVENT = struct.Struct("llHHi")
+
+
+class FakeDevice:
+    def __init__(self, name="fake-device", path="/dev/input/fake"):
+        self.name = name
+        self.path = path
+        self.phys = ""
+
+        self.fd, self._write_fd = os.pipe()
+        os.set_blocking(self.fd, False)
+
+    def send(self, *events: tuple[int, int, int], timestamp=None):
+        """ writes (type, code, value) events stamped with {timestamp} """
+        timestamp = time.time() if timestamp is None else timestamp
+        sec = int(timestamp)
+        usec = int((timestamp - sec) * 10 ** 6)
+
+        os.write(self._write_fd, b"".join(
+            INPUT_EVENT.pack(sec, usec, *event)
+            for event in events
+        ))
+
+    def read(self):
+        data = os.read(self.fd, INPUT_EVENT.size * 64)
+
+        for sec, usec, type_, code, value in INPUT_EVENT.iter_unpack(data):
+            yield evdev.InputEvent(sec, usec, type_, code, value)
+
+    def active_keys(self):
+        return []
+
+    def grab(self):
+        pass
+
+    def ungrab(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def install_fake_devices(*devices: FakeDevice):
+    """ makes the LinuxEventApi listen to {devices} instead of /dev/input """
+    from src.OsAbstractions.Linux.EventApi import LinuxEventApi
+
+    LinuxEventApi._get_devices = classmethod(
+        lambda cls, paths: {device.fd: device for device in devices}
+    )
+
+
+def key_press(vk: int) -> list[tuple[int, int, int]]:
+    """ the frames a keyboard sends for one press and release of {vk} """
+    return [
+        (evdev.ecodes.EV_KEY, vk, 1),
+        (evdev.ecodes.EV_SYN, evdev.ecodes.SYN_REPORT, 0),
+        (evdev.ecodes.EV_KEY, vk, 0),
+        (evdev.ecodes.EV_SYN, evdev.ecodes.SYN_REPORT, 0),
+    ]
+
+
+class FakePassthrough:
+    """ stands in for the uinput device the grabbed events are reinjected to """
+
+    def __init__(self):
+        self._read_fd, self.fd = os.pipe()
+        os.set_blocking(self._read_fd, False)
+
+    def read_forwarded(self) -> list[tuple[int, int, int]]:
+        """ :return: the (type, code, value) events that where forwarded """
+        out = []
+        while True:
+            try:
+                data = os.read(self._read_fd, INPUT_EVENT.size * 256)
+            except BlockingIOError:
+                return out
+
+            out += [
+                (type_, code, value)
+                for sec, usec, type_, code, value
+                in INPUT_EVENT.iter_unpack(data)
+            ]
+
+    def close(self):
+        pass
+
+
+class FakeUInput:
+    """ records what's written instead of making a virtual device """
+    def __init__(self, *args, name="py-evdev-uinput", **kwargs):
+        self.name = name
+        self.device = None
+        self.fd = -1
+
+        self.written: list[tuple[int, int, int]] = []
+
+    @classmethod
+    def from_device(cls, *devices, **kwargs):
+        return cls(**kwargs)
+
+    def write(self, type_: int, code: int, value: int):
+        self.written.append((type_, code, value))
+
+    def syn(self):
+        self.write(evdev.ecodes.EV_SYN, evdev.ecodes.SYN_REPORT, 0)
+
+    def close(self):
+        pass
+
+
+class _FakePointer:
+    root_x = 10
+    root_y = 20
+
+
+class _FakeRoot:
+    def query_pointer(self):
+        return _FakePointer()
+
+
+class _FakeScreen:
+    root = _FakeRoot()
+    width_in_pixels = 1920
+    height_in_pixels = 1080
+
+
+class FakeDisplay:
+    """ a screen with the pointer at (10, 20) """
+    def __init__(self, *args):
+        pass
+
+    def screen(self):
+        return _FakeScreen()
+
+    def sync(self):
+        pass
+
+    def set_error_handler(self, handler):
+        return None
+
+    def close(self):
+        pass
+
+
+def install_fake_backend():
+    """
+    replaces uinput and the x display, so that src can be
+    imported without /dev/uinput, a display or root
+    """
+    os.environ.setdefault("DISPLAY", ":0")
+
+    evdev.UInput = FakeUInput
+    Xlib.display.Display = FakeDisplay
+
+
+install_fake_backend()
@@ -0,0 +1,180 @@
+"""
+measures how many raw events/s get through LinuxEventApi.fetch_new_events
+on a replayed 1 kHz gaming mouse trace, with the bulk reader
+(LinuxEventApi.bulk_read = True) and with the evdev.InputEvent based one
+
+--baseline REV also runs the trace through the decoder of another
+commit (e.g. the one before the bulk reader), checked out in a
+temporary git worktree, since both of the readers above share the
+inlined frame decoding
+
+run from the repo root with
+    python -m benchmarks.bulk_decode --baseline deb8e50
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from select import select
+
+import evdev
+
+from benchmarks._fake_device import FakeDevice, install_fake_devices
+from src.OsAbstractions.Linux.EventApi import LinuxEventApi
+
+_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# what the --worker result line starts with
+_RESULT = "raw events/s: "
+
+
+def mouse_trace(frames: int) -> list[tuple[int, int, int, int]]:
+    """ (timestamp, type, code, value) of a mouse moving in circles at 1 kHz """
+    out = []
+    for i in range(frames):
+        timestamp = i / 1000
+        out += [
+            (timestamp, evdev.ecodes.EV_REL, evdev.ecodes.REL_X, (i % 7) - 3),
+            (timestamp, evdev.ecodes.EV_REL, evdev.ecodes.REL_Y, (i % 5) - 2),
+            (timestamp, evdev.ecodes.EV_SYN, evdev.ecodes.SYN_REPORT, 0),
+        ]
+
+    return out
+
+
+def _run(bulk_read: bool, trace, chunk: int) -> float:
+    """ :return: raw events/s, only counting the time spent fetching """
+    device = FakeDevice()
+    install_fake_devices(device)
+
+    # older versions don't have it, and always read through evdev
+    LinuxEventApi.bulk_read = bulk_read
+    LinuxEventApi.start_listening()
+
+    duration = 0
+
+    # the pipe only fits so much, so replay it a chunk at a time
+    for i in range(0, len(trace), chunk):
+        for timestamp, *event in trace[i:i + chunk]:
+            device.send(tuple(event), timestamp=timestamp)
+
+        start = time.perf_counter()
+
+        # older versions only do one read per fetch, and block if
+        # there's nothing to read, so fetch while there's something left
+        while select([device.fd], [], [], 0)[0]:
+            LinuxEventApi.fetch_new_events()
+            LinuxEventApi.clear_queued_events()
+
+        duration += time.perf_counter() - start
+
+    LinuxEventApi.stop_listening()
+
+    return len(trace) / duration
+
+
+def _best_of(repeat: int, *args) -> float:
+    return max(_run(*args) for _ in range(repeat))
+
+
+def _run_baseline(revision: str, args) -> float:
+    """ runs the trace through the src of {revision}, in a subprocess """
+    with tempfile.TemporaryDirectory() as directory:
+        worktree = os.path.join(directory, "baseline")
+
+        subprocess.run(
+            ["git", "worktree", "add", "--detach", worktree, revision],
+            cwd=_REPO, check=True, capture_output=True,
+        )
+
+        try:
+            # the src of the worktree, but these benchmarks
+            env = {
+                **os.environ,
+                "PYTHONPATH": os.pathsep.join(
+                    [worktree, _REPO, os.environ.get("PYTHONPATH", "")]
+                ),
+            }
+
+            result = subprocess.run(
+                [
+                    sys.executable, "-m", "benchmarks.bulk_decode",
+                    "--worker",
+                    "--frames", str(args.frames),
+                    "--chunk", str(args.chunk),
+                    "--repeat", str(args.repeat),
+                ],
+                cwd=worktree, env=env, check=True,
+                capture_output=True, text=True,
+            )
+        finally:
+            subprocess.run(
+                ["git", "worktree", "remove", "--force", worktree],
+                cwd=_REPO, capture_output=True,
+            )
+
+    # the src prints things too
+    for line in result.stdout.splitlines():
+        if line.startswith(_RESULT):
+            return json.loads(line[len(_RESULT):])
+
+    raise RuntimeError(f"the baseline run failed:\n{result.stdout}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--frames", type=int, default=50_000)
+    parser.add_argument("--chunk", type=int, default=600)
+    parser.add_argument(
+        "--repeat", type=int, default=5,
+        help="runs per reader, the best one counts"
+    )
+    parser.add_argument(
+        "--baseline", metavar="REV",
+        help="also measure the decoder of this git revision"
+    )
+    parser.add_argument(
+        "--worker", action="store_true",
+        help="(internal) only print the raw events/s of the evdev reader"
+    )
+    args = parser.parse_args()
+
+    trace = mouse_trace(args.frames)
+
+    if args.worker:
+        print(_RESULT + json.dumps(
+            _best_of(args.repeat, False, trace, args.chunk)
+        ))
+        return
+
+    results = {}
+    if args.baseline:
+        results[f"baseline {args.baseline}"] = \
+            _run_baseline(args.baseline, args)
+
+    results["bulk_read=False"] = _best_of(
+        args.repeat, False, trace, args.chunk
+    )
+    results["bulk_read=True"] = _best_of(
+        args.repeat, True, trace, args.chunk
+    )
+
+    first = None
+    for name, raw_per_s in results.items():
+        first = first or raw_per_s
+
+        print(
+            f"{name:<18} "
+            f"{raw_per_s:>10.0f} raw events/s "
+            f"({raw_per_s / first:.2f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
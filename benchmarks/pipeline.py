@@ -0,0 +1,352 @@
+"""
+pushes synthetic (or recorded) evdev streams through the whole pipeline:
+the decoding in the LinuxEventApi, the EventDistributor, an EventQueue
+consumer, hotkey wrappers and the text replacement matching
+
+for every workload it reports
+    decode:   raw events/s through LinuxEventApi.fetch_new_events alone
+    pipeline: events/s through everything, and the latency percentiles
+              from the event timestamp to the callbacks being done
+
+workloads:
+    typing: bursts of typed text
+    mouse:  1 kHz mouse motion
+    mixed:  typing while moving the mouse
+    replay: a recorded stream (--replay), e.g. made with
+            cat /dev/input/event3 > recording
+
+run from the repo root with
+    python -m benchmarks.pipeline --output results.json
+and compare two runs (e.g. from different commits) with
+    python -m benchmarks.pipeline --compare old.json new.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+
+import evdev
+
+from benchmarks._fake_device import INPUT_EVENT, FakeDevice, install_fake_devices
+from src import EventDistributor, EventQueue, Hotkey, Keyboard
+from src.Events import KeyboardEvent, MouseEvent
+from src.LatencyHistogram import LatencyHistogram
+from src.Main.Hotkeys import HotkeyRegistry
+from src.OsAbstractions.Linux.EventApi import LinuxEventApi
+
+TEXT = "the quick brown fox jumps over the lazy dog "
+
+SYN = (evdev.ecodes.EV_SYN, evdev.ecodes.SYN_REPORT, 0)
+
+# a frame is a list of (type, code, value) ending with a SYN_REPORT
+frame_type = list[tuple[int, int, int]]
+
+
+def _key_frames(char: str) -> list[frame_type]:
+    name = "KEY_SPACE" if char == " " else f"KEY_{char.upper()}"
+    vk = evdev.ecodes.ecodes[name]
+    scan = (evdev.ecodes.EV_MSC, evdev.ecodes.MSC_SCAN, vk)
+
+    return [
+        [scan, (evdev.ecodes.EV_KEY, vk, 1), SYN],
+        [scan, (evdev.ecodes.EV_KEY, vk, 0), SYN],
+    ]
+
+
+def _mouse_frame(i: int) -> frame_type:
+    return [
+        (evdev.ecodes.EV_REL, evdev.ecodes.REL_X, (i % 7) - 3),
+        (evdev.ecodes.EV_REL, evdev.ecodes.REL_Y, (i % 5) - 2),
+        SYN,
+    ]
+
+
+def typing_workload(size: int) -> list[frame_type]:
+    frames = []
+    for i in range(size):
+        frames += _key_frames(TEXT[i % len(TEXT)])
+
+    return frames
+
+
+def mouse_workload(size: int) -> list[frame_type]:
+    return [_mouse_frame(i) for i in range(size)]
+
+
+def mixed_workload(size: int) -> list[frame_type]:
+    # ~10 mouse frames per key press, like typing while moving the mouse
+    frames = []
+    for i in range(size):
+        if i % 10 == 0:
+            frames += _key_frames(TEXT[i // 10 % len(TEXT)])
+        else:
+            frames.append(_mouse_frame(i))
+
+    return frames
+
+
+def replay_workload(path: str) -> list[frame_type]:
+    with open(path, "rb") as file:
+        data = file.read()
+
+    data = data[:len(data) - len(data) % INPUT_EVENT.size]
+
+    frames = []
+    frame = []
+    for sec, usec, type_, code, value in INPUT_EVENT.iter_unpack(data):
+        frame.append((type_, code, value))
+
+        if (type_, code) == SYN[:2]:
+            frames.append(frame)
+            frame = []
+
+    return frames
+
+
+def _counted_events(frames: list[frame_type]) -> int:
+    """ the amount of KeyDown, KeyUp and Move events {frames} decode to """
+    count = 0
+    for frame in frames:
+        key_events = sum(
+            type_ == evdev.ecodes.EV_KEY and value != 2
+            for type_, code, value in frame
+        )
+
+        if key_events:
+            count += key_events
+
+        elif any(
+                type_ == evdev.ecodes.EV_REL and code <= 1
+                for type_, code, value in frame
+        ):
+            count += 1
+
+    return count
+
+
+def _bench_decode(frames: list[frame_type], chunk: int = 200) -> float:
+    """ :return: raw events/s through LinuxEventApi.fetch_new_events """
+    device = FakeDevice()
+    install_fake_devices(device)
+    LinuxEventApi.start_listening()
+
+    raw_events = sum(map(len, frames))
+
+    start = time.perf_counter()
+    for i in range(0, len(frames), chunk):
+        for frame in frames[i:i + chunk]:
+            device.send(*frame)
+
+        LinuxEventApi.fetch_new_events(timeout=0)
+        LinuxEventApi.clear_queued_events()
+
+    duration = time.perf_counter() - start
+
+    LinuxEventApi.stop_listening()
+
+    return raw_events / duration
+
+
+async def _bench_pipeline(
+        frames: list[frame_type],
+        burst: int,
+        hotkeys: int,
+        replacements: int,
+) -> dict:
+    device = FakeDevice()
+    install_fake_devices(device)
+
+    expected = _counted_events(frames)
+    latency = LatencyHistogram()
+    counted = 0
+    caught_up = threading.Event()
+    done = asyncio.Event()
+    wanted = 0
+
+    def measure(event):
+        nonlocal counted
+
+        latency.record(time.time() * 10 ** 6 - event.time_ms * 1000)
+        counted += 1
+
+        if counted >= wanted:
+            caught_up.set()
+
+        if counted >= expected:
+            done.set()
+
+    # the macro keys, with ctrl, so they never trigger
+    for i in range(hotkeys):
+        Keyboard.bind_to_hotkey(
+            # a new func each time, the hotkeys repeat
+            lambda: None,
+            Hotkey(183 + i % 4, along_with={evdev.ecodes.KEY_LEFTCTRL}),
+        )
+
+    # they're never typed, so no text is ever replaced
+    for i in range(replacements):
+        Keyboard.add_text_replacement(f"qqz{i}", "replaced")
+
+    consumed = 0
+
+    async def consume():
+        nonlocal consumed
+        with EventQueue(capacity=None) as eq:
+            async for _ in eq:
+                consumed += 1
+
+    consumer = asyncio.create_task(consume())
+
+    EventDistributor.add_callback(
+        measure,
+        KeyboardEvent.KeyDown, KeyboardEvent.KeyUp, MouseEvent.Move
+    )
+    await asyncio.sleep(0.05)
+
+    def produce():
+        nonlocal wanted
+
+        for i in range(0, len(frames), burst):
+            batch = frames[i:i + burst]
+
+            caught_up.clear()
+            wanted += _counted_events(batch)
+
+            for frame in batch:
+                device.send(*frame)
+
+            # wait for the burst to be handled, so that the latency
+            # isn't just the time spent waiting in the pipe
+            caught_up.wait(timeout=5)
+
+    start = time.perf_counter()
+    producer = threading.Thread(target=produce)
+    producer.start()
+
+    if expected:
+        await asyncio.wait_for(done.wait(), timeout=60)
+
+    duration = time.perf_counter() - start
+    producer.join()
+
+    EventDistributor.remove_callback(measure)
+    consumer.cancel()
+    for func, hotkey in HotkeyRegistry.get_bindings():
+        Keyboard.unbind_hotkey(func, hotkey)
+    for text in list(Keyboard._text_type_binds):
+        Keyboard.remove_text_replacement(text)
+
+    await asyncio.sleep(0.05)
+
+    return {
+        "events": counted,
+        # everything the EventQueue got, incl. e.g. KeySends
+        "queued_events": consumed,
+        "events_per_s": counted / duration,
+        "latency_us": latency.summary(),
+    }
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old_path: str, new_path: str):
+    with open(old_path) as file:
+        old = json.load(file)
+    with open(new_path) as file:
+        new = json.load(file)
+
+    print(f"{old['revision']} -> {new['revision']}")
+
+    for name, new_result in new["workloads"].items():
+        old_result = old["workloads"].get(name)
+        if old_result is None:
+            continue
+
+        for label, old_value, new_value in [
+            ("decode/s", old_result["decode_events_per_s"], new_result["decode_events_per_s"]),
+            ("events/s", old_result["events_per_s"], new_result["events_per_s"]),
+            ("p50 us", old_result["latency_us"]["p50"], new_result["latency_us"]["p50"]),
+            ("p99 us", old_result["latency_us"]["p99"], new_result["latency_us"]["p99"]),
+        ]:
+            change = (new_value / old_value - 1) * 100 if old_value else 0
+            print(
+                f"{name:<8} {label:<9} "
+                f"{old_value:>12.1f} -> {new_value:>12.1f} ({change:+.1f}%)"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--size", type=int, default=5_000,
+        help="key presses / mouse frames per workload"
+    )
+    parser.add_argument(
+        "--burst", type=int, default=20,
+        help="frames sent at once, before waiting for them to be handled"
+    )
+    parser.add_argument("--hotkeys", type=int, default=8)
+    parser.add_argument("--replacements", type=int, default=8)
+    parser.add_argument("--replay", help="a recorded stream of input_events")
+    parser.add_argument("--output", help="where to write the results (json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    workloads = {
+        "typing": typing_workload(args.size),
+        "mouse": mouse_workload(args.size),
+        "mixed": mixed_workload(args.size),
+    }
+    if args.replay:
+        workloads["replay"] = replay_workload(args.replay)
+
+    results = {}
+    for name, frames in workloads.items():
+        result = {"decode_events_per_s": _bench_decode(frames)}
+        result.update(asyncio.run(_bench_pipeline(
+            frames, args.burst, args.hotkeys, args.replacements
+        )))
+
+        results[name] = result
+
+        print(
+            f"{name:<8} "
+            f"decode {result['decode_events_per_s']:>10.0f} raw events/s  "
+            f"pipeline {result['events_per_s']:>9.0f} events/s  "
+            f"p50 {result['latency_us']['p50']:>7.1f} us  "
+            f"p99 {result['latency_us']['p99']:>7.1f} us"
+        )
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({
+                "revision": _git_revision(),
+                "time": time.time(),
+                "python": platform.python_version(),
+                "args": vars(args),
+                "workloads": results,
+            }, file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
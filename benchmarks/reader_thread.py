@@ -0,0 +1,109 @@
+"""
+compares the in-loop reading (EventDistributor.mode = "reader")
+with the background reader thread (EventDistributor.mode = "thread")
+
+run from the repo root with
+    python -m benchmarks.reader_thread
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+import evdev
+
+from benchmarks._fake_device import FakeDevice, install_fake_devices, key_press
+from src import EventDistributor
+from src.Events import KeyboardEvent
+
+
+def _percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+async def _run(
+        mode: str,
+        presses: int,
+        handler_cost_us: int,
+        timeout: float,
+) -> dict:
+    device = FakeDevice()
+    install_fake_devices(device)
+
+    EventDistributor.mode = mode
+
+    latencies: list[float] = []
+    done = asyncio.Event()
+
+    def callback(event):
+        if not isinstance(event, KeyboardEvent.KeyDown | KeyboardEvent.KeyUp):
+            return
+
+        latencies.append(time.time() * 1000 - event.time_ms)
+
+        # simulates a cpu heavy handler
+        end = time.perf_counter() + handler_cost_us / 10 ** 6
+        while time.perf_counter() < end:
+            pass
+
+        if len(latencies) == presses * 2:
+            done.set()
+
+    EventDistributor.add_callback(callback)
+    await asyncio.sleep(0.05)
+
+    def produce():
+        for _ in range(presses):
+            # the blocking write throttles us if the reader falls behind
+            device.send(*key_press(evdev.ecodes.KEY_A))
+
+    start = time.perf_counter()
+    producer = threading.Thread(target=produce)
+    producer.start()
+
+    try:
+        await asyncio.wait_for(done.wait(), timeout)
+    except asyncio.TimeoutError:
+        print(f"{mode}: timed out, got {len(latencies)} of {presses * 2} events")
+
+    duration = time.perf_counter() - start
+
+    producer.join()
+    EventDistributor.remove_callback(callback)
+    await asyncio.sleep(0.05)
+
+    return {
+        "mode": mode,
+        "events": len(latencies),
+        "events_per_s": len(latencies) / duration,
+        "p50_ms": _percentile(latencies, 50),
+        "p99_ms": _percentile(latencies, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--presses", type=int, default=20_000)
+    parser.add_argument("--handler-cost-us", type=int, default=0)
+    parser.add_argument(
+        "--timeout", type=float, default=60,
+        help="seconds to wait for the events of a mode"
+    )
+    args = parser.parse_args()
+
+    for mode in ("reader", "thread"):
+        result = asyncio.run(_run(
+            mode, args.presses, args.handler_cost_us, args.timeout
+        ))
+
+        print(
+            f"{result['mode']:<8} "
+            f"{result['events_per_s']:>10.0f} events/s  "
+            f"p50 {result['p50_ms']:.3f} ms  "
+            f"p99 {result['p99_ms']:.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+measures the latency the grab-and-reinject filter pipeline adds,
+i.e. from the kernel timestamp of an event to when it's been
+written to the passthrough device, while typing with the
+macro keys (183 - 186) being consumed
+
+run from the repo root with
+    python -m benchmarks.reinject
+"""
+import argparse
+import time
+
+from benchmarks._fake_device import \
+    FakeDevice, FakePassthrough, install_fake_devices, key_press
+from src.OsAbstractions.Linux import EventApi as linux_event_api
+from src.OsAbstractions.Linux.EventApi import LinuxEventApi
+from src.OsAbstractions.Linux.InputFilter import consume_keys
+
+# a, s, d, f and the macro keys
+KEYS = [30, 31, 32, 33, 183, 184, 185, 186]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--presses", type=int, default=5_000)
+    parser.add_argument(
+        "--interval-us", type=int, default=200,
+        help="the time between the presses"
+    )
+    args = parser.parse_args()
+
+    device = FakeDevice()
+    passthrough = FakePassthrough()
+
+    install_fake_devices(device)
+    linux_event_api.make_passthrough_device = lambda _: passthrough
+
+    LinuxEventApi.start_listening()
+    LinuxEventApi.add_input_filter(consume_keys(183, 184, 185, 186))
+    LinuxEventApi.reinject_latency.reset()
+
+    forwarded = 0
+    for i in range(args.presses):
+        device.send(*key_press(KEYS[i % len(KEYS)]))
+
+        LinuxEventApi.fetch_new_events(timeout=0)
+        LinuxEventApi.clear_queued_events()
+
+        forwarded += len(passthrough.read_forwarded())
+
+        time.sleep(args.interval_us / 10 ** 6)
+
+    LinuxEventApi.stop_listening()
+
+    print(
+        f"{forwarded} events forwarded, "
+        f"{LinuxEventApi.events_consumed} consumed"
+    )
+    print("added latency (us):")
+    for name, value in LinuxEventApi.reinject_latency.summary().items():
+        print(f"  {name:<6} {value:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+import threading
+
 import pexpect
 
 # https://github.com/x2es/bt-dualboot
@@ -10,20 +12,39 @@ from src import Keyboard, Hotkey
 
 class BthConnectHotkey:
     HP_BTH_ADDR = "AC:80:0A:2E:81:6A"
-    HOTKEY = Hotkey(183)
+    HOTKEY = Hotkey(183, trigger="tap", delay_ms=500)
+    DISCONNECT_HOTKEY = Hotkey(183, trigger="hold", delay_ms=500)
 
     def __init__(self):
         self.bth_ctl_instance = pexpect.spawn(
             "bluetoothctl", echo=False
         )
+        # the actions run on separate threads, but share the spawn
+        self.bth_ctl_lock = threading.Lock()
 
-        Keyboard.bind_to_hotkey(self._connect_bth, BthConnectHotkey.HOTKEY)
+        # on a thread, so that the input isn't held up meanwhile
+        Keyboard.bind_to_hotkey(
+            self._connect_bth, BthConnectHotkey.HOTKEY,
+            run="thread"
+        )
+        Keyboard.bind_to_hotkey(
+            self._disconnect_bth, BthConnectHotkey.DISCONNECT_HOTKEY,
+            run="thread"
+        )
 
     def _connect_bth(self):
         print("Connecting to bluetooth headphones...")
-        self.bth_ctl_instance.send(
-            f"connect {BthConnectHotkey.HP_BTH_ADDR}\n"
-        )
+        with self.bth_ctl_lock:
+            self.bth_ctl_instance.send(
+                f"connect {BthConnectHotkey.HP_BTH_ADDR}\n"
+            )
+
+    def _disconnect_bth(self):
+        print("Disconnecting bluetooth headphones...")
+        with self.bth_ctl_lock:
+            self.bth_ctl_instance.send(
+                f"disconnect {BthConnectHotkey.HP_BTH_ADDR}\n"
+            )
 
 
 class SwitchFocusHotkey:
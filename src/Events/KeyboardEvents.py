@@ -1,4 +1,6 @@
+import dataclasses
 from dataclasses import dataclass
+from typing import Callable
 
 from src.AbsVkEnum import KeyData
 from src.Events._BaseEvent import _BaseEvent
@@ -52,6 +54,15 @@ from src.Events._BaseEvent import _BaseEvent
 class _BaseKeyboardEvent(_BaseEvent):
     key_data: KeyData
 
+    # the keys that where pressed right after the event, as a bitmask
+    # (bit n is set if vk n is pressed), None if the backend has none
+    pressed_mask: int | None = dataclasses.field(
+        default=None,
+        compare=False,
+        repr=False,
+        kw_only=True,
+    )
+
 
 @dataclass(frozen=True)
 class KeySend(_BaseKeyboardEvent):
@@ -69,7 +80,29 @@ class KeySend(_BaseKeyboardEvent):
     # ¨ => ""
     # ¨ + ¨ => ¨ (linux)
     # ¨ + ¨ => ¨¨ (windows)
-    chars: str
+
+    # either the chars or a function that calculates them,
+    # since they're only calculated when (if) someone reads .chars.
+    # they're not hashed, so that hashing the event doesn't calculate them
+    chars: str | Callable[[], str] = dataclasses.field(hash=False)
+
+    def _get_chars(self) -> str:
+        if not isinstance(self._chars, str):
+            # cache them
+            object.__setattr__(self, "_chars", self._chars())
+
+        return self._chars
+
+    def _set_chars(self, chars: str | Callable[[], str]):
+        # only called by __init__, it's frozen otherwise
+        object.__setattr__(self, "_chars", chars)
+
+
+# has to be set after the dataclass is made, since it would be taken as
+# the default of the chars otherwise. the generated __init__ sets it
+# through the property, and __eq__, __repr__ and replace() read it
+# through it, so they all see the calculated chars
+KeySend.chars = property(KeySend._get_chars, KeySend._set_chars)
 
 
 @dataclass(frozen=True)
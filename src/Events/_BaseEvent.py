@@ -23,10 +23,22 @@ class _BaseEvent:
     # only for debug
     raw: any = dataclasses.field(compare=False)
 
+    # the event was created programmatically (by us)
+    synthetic: bool = dataclasses.field(
+        default=False,
+        compare=False,
+        kw_only=True,
+    )
+
     def print_event(self):
         x = {
             "event_type": type(self),
-            "event_dict": dict_p_print(self.__dict__, 1),
+            # not __dict__, that has the internals (e.g. the
+            # uncalculated KeySend chars) and not the properties
+            "event_dict": dict_p_print({
+                field.name: getattr(self, field.name)
+                for field in dataclasses.fields(self)
+            }, 1),
             "raw_event_type": type(self.raw),
             "raw_event_dict": dict_p_print(self.raw.__dict__, 1),
         }
@@ -0,0 +1,90 @@
+import math
+
+
+class LatencyHistogram:
+    """
+    a histogram of latencies (in microseconds)
+
+    the buckets are logarithmic, {BUCKETS_PER_DOUBLING} per power of 2,
+    so recording is O(1), the memory is constant and the percentiles
+    are within ~10% of the real value
+    """
+    BUCKETS_PER_DOUBLING = 8
+    # 2 ** 40 us is about 12 days, anything above goes in the last bucket
+    BUCKET_COUNT = 40 * BUCKETS_PER_DOUBLING
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, latency_us: float) -> None:
+        self.count += 1
+        self.total += latency_us
+
+        if latency_us > self.max:
+            self.max = latency_us
+
+        if latency_us < 1:
+            index = 0
+        else:
+            index = min(
+                int(math.log2(latency_us) * self.BUCKETS_PER_DOUBLING),
+                self.BUCKET_COUNT - 1
+            )
+
+        self.counts[index] += 1
+
+    def _bucket_upper_bound(self, index: int) -> float:
+        return 2 ** ((index + 1) / self.BUCKETS_PER_DOUBLING)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """ :return: the latency {percent}% of the recorded ones are under """
+        if not self.count:
+            return 0.0
+
+        wanted = self.count * percent / 100
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= wanted:
+                # the bound can overshoot the real max
+                return min(self._bucket_upper_bound(index), self.max)
+
+        return self.max
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for index, count in enumerate(other.counts):
+            self.counts[index] += count
+
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def reset(self) -> None:
+        self.__init__()
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "max": self.max,
+        }
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}("
+            + ", ".join(
+                f"{name}: {value:.1f}"
+                for name, value in self.summary().items()
+            )
+            + ")"
+        )
@@ -0,0 +1,126 @@
+import time
+
+from src.LatencyHistogram import LatencyHistogram
+
+
+class LatencyTracer:
+    """
+    records how long the events spend in each stage between the kernel
+    timestamp (event.time_ms) and when the callbacks for them are done
+
+    the stages are (each measured from the end of the previous one)
+        read:      the event is read from the device
+        decode:    it's converted to an event
+        queue:     it's added to the event queue
+        dispatch:  the EventDistributor starts on it
+        callbacks: all its callbacks have returned
+        total:     from the kernel timestamp to the end of callbacks
+
+    the batch callbacks aren't included, since they run once per batch
+
+    while disabled the event path only pays for checking {enabled}
+    """
+    STAGES = ("read", "decode", "queue", "dispatch", "callbacks", "total")
+
+    enabled = False
+
+    # {event type name: {stage: histogram}}
+    _histograms: dict[str, dict[str, LatencyHistogram]] = {}
+
+    @classmethod
+    def enable(cls) -> None:
+        cls.enabled = True
+
+    @classmethod
+    def disable(cls) -> None:
+        cls.enabled = False
+
+    @classmethod
+    def reset(cls) -> None:
+        cls._histograms = {}
+
+    @staticmethod
+    def now_us() -> float:
+        # the kernel timestamps are CLOCK_REALTIME
+        return time.time() * 10 ** 6
+
+    @classmethod
+    def stamp_decoded(cls, events, read_us: float) -> None:
+        """ called by the EventApi with the events of one read """
+        decoded_us = cls.now_us()
+
+        for event in events:
+            # the events are frozen, but they're brand new,
+            # so no one has seen them yet
+            object.__setattr__(event, "_trace", [read_us, decoded_us])
+
+    @classmethod
+    def stamp_queued(cls, events) -> None:
+        queued_us = cls.now_us()
+
+        for event in events:
+            trace = getattr(event, "_trace", None)
+
+            if trace is None:
+                # not made by a read (e.g. by a resync)
+                object.__setattr__(event, "_trace", [None, None, queued_us])
+            else:
+                trace.append(queued_us)
+
+    @classmethod
+    def record(cls, event, dispatch_us: float, done_us: float) -> None:
+        trace = getattr(event, "_trace", None)
+        if trace is None or len(trace) < 3:
+            # queued before the tracing was enabled
+            return
+
+        read_us, decoded_us, queued_us = trace
+        kernel_us = event.time_ms * 1000
+
+        name = event.__class__.__name__
+        try:
+            histograms = cls._histograms[name]
+        except KeyError:
+            histograms = cls._histograms[name] = {
+                stage: LatencyHistogram()
+                for stage in cls.STAGES
+            }
+
+        if read_us is not None:
+            histograms["read"].record(read_us - kernel_us)
+            histograms["decode"].record(decoded_us - read_us)
+            histograms["queue"].record(queued_us - decoded_us)
+
+        histograms["dispatch"].record(dispatch_us - queued_us)
+        histograms["callbacks"].record(done_us - dispatch_us)
+        histograms["total"].record(done_us - kernel_us)
+
+    @classmethod
+    def get_histograms(cls) -> dict[str, dict[str, LatencyHistogram]]:
+        """ :return: {event type name: {stage: histogram}} """
+        return cls._histograms
+
+    @classmethod
+    def summary(cls) -> dict[str, dict[str, dict[str, float]]]:
+        """ :return: {event type name: {stage: {statistic: value}}} """
+        return {
+            name: {
+                stage: histogram.summary()
+                for stage, histogram in histograms.items()
+            }
+            for name, histograms in cls._histograms.items()
+        }
+
+    @classmethod
+    def print_summary(cls) -> None:
+        for name, stages in cls.summary().items():
+            print(f"{name} (us)")
+
+            for stage, stats in stages.items():
+                print(
+                    f"    {stage:<10}"
+                    + " ".join(
+                        f"{statistic}: {value:>8.1f}"
+                        for statistic, value in stats.items()
+                    )
+                )
@@ -0,0 +1,205 @@
+import asyncio
+import dataclasses
+import inspect
+from collections import deque
+from typing import Callable, Awaitable, Literal
+
+from src.Events import any_event, MouseEvent
+
+
+class BaseEventQueue:
+    """
+    the queueing of an EventQueue, without where the events come from,
+    so that it can be used without the backend (see EventBusQueue)
+
+    subclasses add the events (with add_event) between _subscribe and
+    _unsubscribe, and pause adding them between _block and _unblock
+
+    at most {capacity} events are queued, when a new event
+    arrives at a full queue the {overflow} policy decides what happens
+        "drop_oldest": the oldest queued event is dropped (the default)
+        "block": no new events are added until the queue has been
+            drained to half its capacity (see _block)
+        "drop_newest": the new event is dropped
+        "coalesce": if both the new and the last queued event are
+            MouseEvent.Move(s) they are merged into one, otherwise
+            the oldest event is dropped
+
+    the amount of dropped / merged events are counted
+    in {dropped} / {coalesced}
+    """
+    def __init__(
+            self,
+            capacity: int | None = 4096,
+            overflow: Literal[
+                "block", "drop_oldest", "drop_newest", "coalesce"
+            ] = "drop_oldest",
+    ):
+        self._in_with = False
+        self._running = False
+        self.queued_events: deque[any_event] = deque()
+
+        self.capacity = capacity
+        self.overflow = overflow
+
+        self.dropped = 0
+        self.coalesced = 0
+
+        # set when an event is added (or the queue is stopped)
+        self._changed = asyncio.Event()
+        self._blocking = False
+
+    def _coalesce(self, event: any_event) -> bool:
+        if not isinstance(event, MouseEvent.Move):
+            return False
+
+        last = self.queued_events[-1]
+        if not isinstance(last, MouseEvent.Move):
+            return False
+
+        self.queued_events[-1] = dataclasses.replace(
+            event,
+            delta=(
+                last.delta[0] + event.delta[0],
+                last.delta[1] + event.delta[1],
+            )
+        )
+        self.coalesced += 1
+
+        return True
+
+    def add_event(self, event: any_event):
+        if self.capacity is not None \
+                and len(self.queued_events) >= self.capacity:
+            if self.overflow == "drop_newest":
+                self.dropped += 1
+                return
+
+            if self.overflow == "coalesce" and self._coalesce(event):
+                return
+
+            if self.overflow == "block":
+                if not self._blocking:
+                    self._blocking = True
+                    self._block()
+
+            else:
+                self.queued_events.popleft()
+                self.dropped += 1
+
+        self.queued_events.append(event)
+        self._changed.set()
+
+    def _subscribe(self):
+        """ starts adding the events """
+        raise NotImplementedError
+
+    def _unsubscribe(self):
+        raise NotImplementedError
+
+    def _block(self):
+        """ stops adding new events, for the "block" overflow """
+        raise NotImplementedError
+
+    def _unblock(self):
+        raise NotImplementedError
+
+    def stop(self):
+        self._running = False
+        self._changed.set()
+
+    def __enter__(self):
+        self._in_with = True
+
+        self._subscribe()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._in_with = False
+
+        self._unsubscribe()
+        if self._blocking:
+            self._unblock()
+
+        if exc_type is StopIteration:
+            return True  # supress exception
+
+    async def __aiter__(self):
+        """
+        Gets the next event, forever. If there's no events queued. Then it
+        waits for an event before yielding.
+
+        # ------------------example------------------
+        # this would print all keyboard keydown events
+
+        with EventStack() as eq:
+            for event in eq:
+                if isinstance(event, KeyboardEvent.KeyDown):
+                    event.print_event()
+        """
+
+        if not self._in_with:
+            raise TypeError("not in protective with statement")
+
+        if self._running:
+            raise TypeError(
+                "event conveyor already running cant start it again"
+            )
+
+        self._running = True
+
+        while True:
+            while True:
+                if not self._running:
+                    return
+
+                if self.queued_events:
+                    break
+
+                self._changed.clear()
+                await self._changed.wait()
+
+            event = self.queued_events.popleft()
+
+            if self._blocking \
+                    and len(self.queued_events) <= self.capacity // 2:
+                self._unblock()
+
+            yield event
+
+    # add a with poling rate
+
+    async def supply_events(
+            self,
+            handler: Callable[[any_event], Awaitable[None] | None]
+    ):
+        """
+        a decorator that makes the supplied func receive
+        all events
+
+        ------------example------------
+        # prints all events
+
+        eq = EventStack()
+        @eq.supply_events
+        async def handle_event(event)
+            print_event(event)
+
+        # to stop it either call eq.stop()
+        # or raise StopIteration (from inside the handler)
+        """
+        is_async = inspect.iscoroutinefunction(handler)
+
+        if is_async:
+            async def wrapper():
+                with self as _eq:
+                    async for _event in _eq:
+                        await handler(_event)
+
+            # noinspection PyAsyncCall
+            asyncio.create_task(wrapper())
+
+        else:
+            with self as eq:
+                async for event in eq:
+                    handler(event)
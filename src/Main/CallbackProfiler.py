@@ -0,0 +1,120 @@
+import time
+from typing import Callable
+
+from src.LatencyHistogram import LatencyHistogram
+
+
+def callback_name(callback: Callable) -> str:
+    module = getattr(callback, "__module__", None)
+    name = getattr(callback, "__qualname__", None) or repr(callback)
+
+    return f"{module}.{name}" if module else name
+
+
+def _print_slow_callback(callback: Callable, event, duration_ms: float):
+    print(
+        f"slow callback: {callback_name(callback)} "
+        f"took {duration_ms:.1f}ms for {event.__class__.__name__}"
+    )
+
+
+class CallbackProfiler:
+    """
+    measures the wall time of every callback the EventDistributor calls
+
+    since the callbacks are called inline, one slow one delays all
+    the events after it, this is for finding that one
+
+    on_slow(callback, event, duration_ms) is called for each call
+    that takes longer than budget_ms (the event is a tuple for
+    batch callbacks)
+    """
+    enabled = False
+
+    budget_ms: float = 5
+    on_slow: Callable[[Callable, any, float], None] = \
+        staticmethod(_print_slow_callback)
+
+    _stats: dict[Callable, LatencyHistogram] = {}
+
+    @classmethod
+    def enable(
+            cls,
+            budget_ms: float | None = None,
+            on_slow: Callable[[Callable, any, float], None] | None = None,
+    ) -> None:
+        if budget_ms is not None:
+            cls.budget_ms = budget_ms
+
+        if on_slow is not None:
+            cls.on_slow = staticmethod(on_slow)
+
+        cls.enabled = True
+
+    @classmethod
+    def disable(cls) -> None:
+        cls.enabled = False
+
+    @classmethod
+    def reset(cls) -> None:
+        cls._stats = {}
+
+    @classmethod
+    def call(cls, callback: Callable, event, with_event: bool = True) -> None:
+        """
+        calls callback(event) and records how long it took, callback()
+        if not {with_event} (e.g. a hotkey func, called for the event)
+        """
+        start = time.perf_counter_ns()
+
+        try:
+            if with_event:
+                callback(event)
+            else:
+                callback()
+        finally:
+            duration_us = (time.perf_counter_ns() - start) / 1000
+
+            try:
+                histogram = cls._stats[callback]
+            except KeyError:
+                histogram = cls._stats[callback] = LatencyHistogram()
+
+            histogram.record(duration_us)
+
+            if duration_us > cls.budget_ms * 1000:
+                cls.on_slow(callback, event, duration_us / 1000)
+
+    @classmethod
+    def get_stats(cls) -> dict[str, dict[str, float]]:
+        """
+        :return: {callback name: {count, mean, p50, p90, p99, max}}
+            the times are in microseconds, slowest (p99) first
+        """
+        stats = {}
+        for callback, histogram in cls._stats.items():
+            name = callback_name(callback)
+
+            if name in stats:
+                # e.g. the same method of another instance
+                owner = getattr(callback, "__self__", callback)
+                name = f"{name} at {hex(id(owner))}"
+
+            stats[name] = histogram.summary()
+
+        return dict(sorted(
+            stats.items(),
+            key=lambda item: item[1]["p99"],
+            reverse=True
+        ))
+
+    @classmethod
+    def print_stats(cls) -> None:
+        for name, stats in cls.get_stats().items():
+            print(
+                f"{name}: "
+                f"count: {stats['count']} "
+                f"mean: {stats['mean']:.1f}us "
+                f"p99: {stats['p99']:.1f}us "
+                f"max: {stats['max']:.1f}us"
+            )
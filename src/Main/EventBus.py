@@ -0,0 +1,185 @@
+import asyncio
+import os
+import socket
+
+from src.Events import any_event
+from src.Main.EventBusProtocol import (
+    DEFAULT_SOCKET_PATH, EVENT_TYPES, MessageReader, encode_event, pack
+)
+from src.Main.EventQueue import EventDistributor
+
+
+class _Subscriber(asyncio.Protocol):
+    def __init__(self, broadcaster: "EventBroadcaster"):
+        self._broadcaster = broadcaster
+        self._reader = MessageReader()
+
+        self.transport: asyncio.Transport | None = None
+
+        # None until it has subscribed, () means all events
+        self.event_types: tuple[type, ...] | None = None
+
+        # batches that where dropped since it was too slow
+        self.dropped = 0
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        try:
+            for names in self._reader.feed(data):
+                self.event_types = tuple(EVENT_TYPES[name] for name in names)
+        except (ValueError, KeyError, TypeError):
+            self.transport.close()
+            return
+
+        self._broadcaster._update_subscription()
+
+    def connection_lost(self, exc):
+        self._broadcaster._subscribers.discard(self)
+        self._broadcaster._update_subscription()
+
+
+class EventBroadcaster:
+    """
+    reads (and decodes) the events once and publishes them to other
+    processes over a unix socket, so that they don't all have to open
+    the devices (and be root) themselves
+
+    the subscribers (see EventBusQueue) tell it what event types they
+    want, so the filtering happens here, and the devices are only read
+    while someone is subscribed
+
+    a subscriber that can't keep up (has more than {max_buffer} bytes
+    waiting to be sent) misses batches instead of slowing down the
+    others, counted in its {dropped}
+
+    the socket is made with {mode} so that it can be
+    made accessible to e.g. a group of (non root) users
+
+    ------------example------------
+    broadcaster = EventBroadcaster()
+    await broadcaster.start()
+    await broadcaster.serve_forever()
+    """
+    def __init__(
+            self,
+            path: str = DEFAULT_SOCKET_PATH,
+            mode: int = 0o660,
+            max_buffer: int = 2 ** 20,
+    ):
+        self.path = path
+        self.mode = mode
+        self.max_buffer = max_buffer
+
+        self._server: asyncio.AbstractServer | None = None
+        self._subscribers: set[_Subscriber] = set()
+        self._subscribed = False
+
+    def _make_subscriber(self) -> _Subscriber:
+        subscriber = _Subscriber(self)
+        self._subscribers.add(subscriber)
+
+        return subscriber
+
+    def _is_live(self) -> bool:
+        """ if another broadcaster is listening on {path} """
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                sock.connect(self.path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                return False
+
+        return True
+
+    async def start(self) -> None:
+        """ :raises: OSError if another broadcaster is using {path} """
+        if self._is_live():
+            raise OSError(
+                f"another event broadcaster is listening on {self.path}"
+            )
+
+        if os.path.exists(self.path):
+            # left over from a broadcaster that didn't exit cleanly
+            os.unlink(self.path)
+
+        self._server = await asyncio.get_running_loop().create_unix_server(
+            self._make_subscriber, self.path
+        )
+        os.chmod(self.path, self.mode)
+
+    async def serve_forever(self) -> None:
+        await self._server.serve_forever()
+
+    def close(self) -> None:
+        for subscriber in tuple(self._subscribers):
+            subscriber.transport.close()
+
+        self._subscribers = set()
+        self._update_subscription()
+
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+            os.unlink(self.path)
+
+    def _update_subscription(self):
+        """ only asks the EventDistributor for what's wanted """
+        wanted = [
+            subscriber.event_types
+            for subscriber in self._subscribers
+            if subscriber.event_types is not None
+        ]
+
+        if not wanted:
+            if self._subscribed:
+                self._subscribed = False
+                EventDistributor.remove_batch_callback(self._publish)
+            return
+
+        if any(not event_types for event_types in wanted):
+            # someone wants everything
+            event_types = ()
+        else:
+            event_types = tuple({
+                event_type
+                for event_types in wanted
+                for event_type in event_types
+            })
+
+        self._subscribed = True
+        EventDistributor.add_batch_callback(self._publish, *event_types)
+
+    def _publish(self, batch: tuple[any_event, ...]):
+        # subscribers that want the same types share the message
+        messages: dict[tuple[type, ...], bytes | None] = {}
+
+        for subscriber in tuple(self._subscribers):
+            event_types = subscriber.event_types
+            if event_types is None:
+                continue
+
+            try:
+                message = messages[event_types]
+            except KeyError:
+                wanted = batch if not event_types else tuple(
+                    event
+                    for event in batch
+                    if isinstance(event, event_types)
+                )
+
+                message = messages[event_types] = (
+                    pack([encode_event(event) for event in wanted])
+                    if wanted else None
+                )
+
+            if message is None:
+                continue
+
+            transport = subscriber.transport
+            if transport.get_write_buffer_size() > self.max_buffer:
+                subscriber.dropped += 1
+                continue
+
+            transport.write(message)
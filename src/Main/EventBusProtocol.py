@@ -0,0 +1,124 @@
+"""
+the wire format of the event bus, shared by the EventBroadcaster
+and the EventBusQueue, so it can't import the backend
+
+every message is a length prefixed json document, the subscriber
+sends the names of the event types it wants, the broadcaster sends
+lists of events, each a dict of its type (name) and fields. only
+the plain fields are sent, not the raw / traced internals
+"""
+import json
+import struct
+import typing
+
+from src.AbsVkEnum import KeyData
+from src.Events import any_event, KeyboardEvent, MouseEvent
+
+DEFAULT_SOCKET_PATH = "/run/inputmgr.sock"
+
+# every message is prefixed with its length
+_LENGTH = struct.Struct("!I")
+
+# the event types subscribers can ask for, by name
+EVENT_TYPES: dict[str, type] = {
+    "KeySend": KeyboardEvent.KeySend,
+    "KeyDown": KeyboardEvent.KeyDown,
+    "KeyUp": KeyboardEvent.KeyUp,
+    "Move": MouseEvent.Move,
+    "Click": MouseEvent.Click,
+    "UnClick": MouseEvent.UnClick,
+    "Scroll": MouseEvent.Scroll,
+}
+
+
+def event_type_names(event_types) -> list[str]:
+    """ KeyDown, MouseEvent.event_types (unions) etc. to names """
+    names = []
+    for event_type in event_types:
+        args = typing.get_args(event_type)
+        if args:
+            names += event_type_names(args)
+        else:
+            names.append(event_type.__name__)
+
+    return names
+
+
+def pack(message) -> bytes:
+    data = json.dumps(message, separators=(",", ":")).encode()
+    return _LENGTH.pack(len(data)) + data
+
+
+def encode_event(event: any_event) -> dict:
+    data = {
+        "type": type(event).__name__,
+        "time_ms": event.time_ms,
+        "synthetic": event.synthetic,
+    }
+
+    if isinstance(event, KeyboardEvent.event_types):
+        data["vk"] = event.key_data.vk
+        data["char"] = event.key_data.char
+        data["dead"] = event.key_data.is_dead
+
+        if isinstance(event, KeyboardEvent.KeySend):
+            # only worked out now, when someone wants them
+            data["chars"] = event.chars
+
+        return data
+
+    data["pos"] = event.pos
+
+    if isinstance(event, MouseEvent.Move):
+        data["delta"] = event.delta
+    elif isinstance(event, MouseEvent.Scroll):
+        data["dy"] = event.dy
+        data["dx"] = event.dx
+    else:
+        data["button"] = event.button
+
+    return data
+
+
+def decode_event(data: dict) -> any_event:
+    """ :raises: KeyError / TypeError / ValueError if {data} isn't an event """
+    event_type = EVENT_TYPES[data.pop("type")]
+
+    if issubclass(event_type, KeyboardEvent.event_types):
+        key_data = KeyData(data.pop("vk"), data.pop("char"))
+        key_data.is_dead = data.pop("dead")
+
+        data["key_data"] = key_data
+
+    else:
+        data["pos"] = tuple(data["pos"])
+
+        if "delta" in data:
+            data["delta"] = tuple(data["delta"])
+
+    return event_type(raw=None, **data)
+
+
+class MessageReader:
+    """ splits a byte stream into the (decoded) length prefixed messages """
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> list:
+        """ :raises: ValueError if a message isn't valid json """
+        self._buffer += data
+
+        messages = []
+        offset = 0
+        while len(self._buffer) - offset >= _LENGTH.size:
+            length, = _LENGTH.unpack_from(self._buffer, offset)
+            end = offset + _LENGTH.size + length
+
+            if len(self._buffer) < end:
+                break
+
+            messages.append(json.loads(self._buffer[offset + _LENGTH.size:end]))
+            offset = end
+
+        del self._buffer[:offset]
+        return messages
@@ -0,0 +1,110 @@
+import asyncio
+from typing import Literal
+
+from src.Main.BaseEventQueue import BaseEventQueue
+from src.Main.EventBusProtocol import (
+    DEFAULT_SOCKET_PATH, MessageReader, decode_event, event_type_names, pack
+)
+
+
+class _Connection(asyncio.Protocol):
+    def __init__(self, queue: "EventBusQueue"):
+        self._queue = queue
+        self._reader = MessageReader()
+
+    def connection_made(self, transport):
+        self._transport = transport
+
+    def data_received(self, data):
+        try:
+            for events in self._reader.feed(data):
+                for event in events:
+                    self._queue.add_event(decode_event(event))
+
+        except (ValueError, KeyError, TypeError) as e:
+            # not a broadcaster we understand
+            print(f"invalid message from the event bus: {e!r}")
+            self._transport.close()
+
+    def connection_lost(self, exc):
+        self._queue.stop()
+
+
+class EventBusQueue(BaseEventQueue):
+    """
+    an EventQueue that gets its events from an EventBroadcaster
+    (possibly in another process) instead of reading them itself
+
+    it doesn't need the backend, so the process using it doesn't need
+    access to the devices (or root), import it from here and not from
+    src, which would load the backend
+
+    only the {event_types} (all if none are given) are sent to it,
+    the events have no raw event
+
+    the "block" overflow stops reading from the socket, so it's the
+    broadcaster that gets backed up (and drops batches for us)
+
+    ------------example------------
+    from src.Main.EventBusQueue import EventBusQueue
+
+    with EventBusQueue(KeyboardEvent.KeyDown) as eq:
+        async for event in eq:
+            print_event(event)
+    """
+    def __init__(
+            self,
+            *event_types: type,
+            path: str = DEFAULT_SOCKET_PATH,
+            capacity: int | None = 4096,
+            overflow: Literal[
+                "block", "drop_oldest", "drop_newest", "coalesce"
+            ] = "block",
+    ):
+        super().__init__(capacity=capacity, overflow=overflow)
+
+        self.path = path
+        self.event_type_names = event_type_names(event_types)
+
+        self._transport: asyncio.Transport | None = None
+        self._connecting: asyncio.Task | None = None
+
+    async def _connect(self):
+        transport, _ = await asyncio.get_running_loop().create_unix_connection(
+            lambda: _Connection(self), self.path
+        )
+        transport.write(pack(self.event_type_names))
+
+        if self._blocking:
+            transport.pause_reading()
+
+        self._transport = transport
+
+    def _on_connected(self, task: asyncio.Task):
+        if not task.cancelled() and task.exception() is not None:
+            # e.g. there's no broadcaster
+            print(f"couldn't connect to the event bus: {task.exception()}")
+            self.stop()
+
+    def _subscribe(self):
+        self._connecting = asyncio.get_running_loop().create_task(
+            self._connect()
+        )
+        self._connecting.add_done_callback(self._on_connected)
+
+    def _unsubscribe(self):
+        self._connecting.cancel()
+
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    def _block(self):
+        if self._transport is not None:
+            self._transport.pause_reading()
+
+    def _unblock(self):
+        self._blocking = False
+
+        if self._transport is not None:
+            self._transport.resume_reading()
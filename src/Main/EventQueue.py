@@ -1,9 +1,11 @@
 import asyncio
 import atexit
-import inspect
-from typing import Callable, Awaitable
+from typing import Callable, Literal
 
 from src.Events import any_event
+from src.LatencyTracer import LatencyTracer
+from src.Main.BaseEventQueue import BaseEventQueue
+from src.Main.CallbackProfiler import CallbackProfiler
 from src.OsAbstractions import get_backend
 
 _event_api = get_backend().EventApi
@@ -11,9 +13,251 @@ _event_api = get_backend().EventApi
 
 class EventDistributor:
     # _running_sub_stacks = set()
-    _event_callbacks = set()
+
+    # {callback: event_types}, empty event_types means all events
+    _event_callbacks: dict[Callable[[any_event], None], tuple[type, ...]] = {}
+
+    # {callback: event_types}, called once per read
+    # with all the (wanted) events from that read
+    _batch_callbacks: dict[
+        Callable[[tuple[any_event, ...]], None], tuple[type, ...]
+    ] = {}
+
+    # {event class: callbacks that want it}
+    # built lazily and cleared whenever the callbacks change
+    _dispatch_table: dict[type, tuple[Callable[[any_event], None], ...]] = {}
 
     running = False
+    _task: asyncio.Task | None = None
+
+    # how the distributor waits for new events
+    #   "reader": the event loop wakes it up when a device has data,
+    #       (loop.add_reader) so nothing runs while there's no input
+    #   "poll": checks for new events every {poll_interval} seconds
+    #   "thread": the backend reads the events on a thread of its own,
+    #       and wakes the loop up once per batch of them, they're still
+    #       converted on the loop. keeps cpu heavy callbacks from
+    #       overrunning the kernel buffers
+    #
+    # falls back to "poll" if the backend can't do the selected mode
+    mode: Literal["reader", "poll", "thread"] = "reader"
+    poll_interval = 0.001
+
+    # set when the callbacks change, so that a sleeping
+    # distributor can check if it should stop
+    _callbacks_changed: asyncio.Event | None = None
+
+    # the things that currently want the reading paused (backpressure)
+    # the events wait in the kernel (or reader thread) buffer meanwhile
+    _paused_by: set = set()
+    # the fds that are registered with loop.add_reader in "reader" mode
+    _reader_fds: list[int] = []
+
+    @classmethod
+    def pause_reading(cls, owner):
+        """
+        stops reading new events until resume_reading({owner})
+        is called, used by slow consumers to apply backpressure
+        """
+        was_paused = bool(cls._paused_by)
+        cls._paused_by.add(owner)
+
+        if not was_paused and cls._reader_fds:
+            loop = asyncio.get_running_loop()
+            for fd in cls._reader_fds:
+                loop.remove_reader(fd)
+
+    @classmethod
+    def resume_reading(cls, owner):
+        if owner not in cls._paused_by:
+            return
+
+        cls._paused_by.remove(owner)
+        if cls._paused_by:
+            return
+
+        if cls._reader_fds:
+            loop = asyncio.get_running_loop()
+            for fd in cls._reader_fds:
+                loop.add_reader(fd, cls._on_readable, fd)
+
+        if cls.running and cls.mode == "thread":
+            # the reader thread kept buffering while we where paused
+            cls._on_reader_thread_batch()
+
+    @classmethod
+    def _callbacks_for(cls, event_class: type) \
+            -> tuple[Callable[[any_event], None], ...]:
+        callbacks = tuple(
+            callback
+            for callback, event_types in cls._event_callbacks.items()
+            if not event_types or issubclass(event_class, event_types)
+        )
+
+        cls._dispatch_table[event_class] = callbacks
+        return callbacks
+
+    @classmethod
+    def _distribute_queued_events(cls):
+        events = _event_api.event_queue
+        _event_api.event_queue = []
+
+        if not events:
+            return
+
+        # the table is replaced (not changed) when the callbacks change
+        # so callbacks can add / remove callbacks
+        table = cls._dispatch_table
+
+        if LatencyTracer.enabled or CallbackProfiler.enabled:
+            cls._distribute_instrumented(events, table)
+
+        else:
+            for event in events:
+                try:
+                    callbacks = table[event.__class__]
+                except KeyError:
+                    callbacks = cls._callbacks_for(event.__class__)
+
+                for callback in callbacks:
+                    callback(event)
+
+        if cls._batch_callbacks:
+            cls._distribute_batch(tuple(events))
+
+    @classmethod
+    def _distribute_instrumented(cls, events: list[any_event], table: dict):
+        """
+        _distribute_queued_events, but for the LatencyTracer
+        and / or the CallbackProfiler
+        """
+        tracing = LatencyTracer.enabled
+        profiling = CallbackProfiler.enabled
+
+        for event in events:
+            if tracing:
+                dispatch_us = LatencyTracer.now_us()
+
+            try:
+                callbacks = table[event.__class__]
+            except KeyError:
+                callbacks = cls._callbacks_for(event.__class__)
+
+            for callback in callbacks:
+                if profiling:
+                    CallbackProfiler.call(callback, event)
+                else:
+                    callback(event)
+
+            if tracing:
+                LatencyTracer.record(event, dispatch_us, LatencyTracer.now_us())
+
+    @classmethod
+    def _distribute_batch(cls, batch: tuple[any_event, ...]):
+        call = CallbackProfiler.call if CallbackProfiler.enabled else None
+
+        for callback, event_types in tuple(cls._batch_callbacks.items()):
+            if event_types:
+                wanted = tuple(
+                    event
+                    for event in batch
+                    if isinstance(event, event_types)
+                )
+            else:
+                wanted = batch
+
+            if not wanted:
+                continue
+
+            if call is None:
+                callback(wanted)
+            else:
+                call(callback, wanted)
+
+    @classmethod
+    def _has_callbacks(cls) -> bool:
+        return bool(cls._event_callbacks or cls._batch_callbacks)
+
+    @classmethod
+    async def _wait_for_no_callbacks(cls):
+        while cls._has_callbacks():
+            cls._callbacks_changed.clear()
+            await cls._callbacks_changed.wait()
+
+    @classmethod
+    async def _run_polling(cls):
+        while cls._has_callbacks():
+            cls._distribute_queued_events()
+
+            if not cls._paused_by:
+                _event_api.fetch_new_events(timeout=0)
+
+            await asyncio.sleep(cls.poll_interval)
+
+    @classmethod
+    def _on_readable(cls, fd: int):
+        _event_api.read_events(fd)
+        cls._distribute_queued_events()
+
+    @classmethod
+    def _on_fd_added(cls, fd: int):
+        cls._reader_fds.append(fd)
+
+        if not cls._paused_by:
+            asyncio.get_running_loop().add_reader(fd, cls._on_readable, fd)
+
+    @classmethod
+    def _on_fd_removed(cls, fd: int):
+        if fd not in cls._reader_fds:
+            return
+
+        cls._reader_fds.remove(fd)
+        asyncio.get_running_loop().remove_reader(fd)
+
+    @classmethod
+    async def _run_with_readers(cls, fds: list[int]):
+        loop = asyncio.get_running_loop()
+
+        cls._reader_fds = list(fds)
+        if not cls._paused_by:
+            for fd in fds:
+                loop.add_reader(fd, cls._on_readable, fd)
+
+        # devices can be plugged in / removed while we're running
+        _event_api.set_fd_watchers(cls._on_fd_added, cls._on_fd_removed)
+
+        try:
+            # all the work is done in _on_readable
+            # so just wait until there's no one listening
+            await cls._wait_for_no_callbacks()
+        finally:
+            _event_api.set_fd_watchers(None, None)
+
+            for fd in cls._reader_fds:
+                loop.remove_reader(fd)
+            cls._reader_fds = []
+
+    @classmethod
+    def _on_reader_thread_batch(cls):
+        # leave the events in the reader threads buffer while paused
+        if cls._paused_by:
+            return
+
+        _event_api.drain_reader_thread()
+        cls._distribute_queued_events()
+
+    @classmethod
+    def _setup_reader_thread(cls) -> bool:
+        loop = asyncio.get_running_loop()
+
+        try:
+            _event_api.use_reader_thread(
+                lambda: loop.call_soon_threadsafe(cls._on_reader_thread_batch)
+            )
+        except NotImplementedError:
+            return False
+
+        return True
 
     @classmethod
     async def run_event_distributor(cls):
@@ -23,44 +267,131 @@ class EventDistributor:
             )
 
         cls.running = True
+        cls._callbacks_changed = asyncio.Event()
+
+        # has to be set up before we start listening
+        use_thread = cls.mode == "thread" and cls._setup_reader_thread()
 
         # some added safety for debugging
         _event_api.start_listening()
 
         print("started")
 
-        while True:
-            if not cls._event_callbacks:
-                _event_api.stop_listening()
-                cls.running = False
-                break
+        try:
+            fds = None
+            if use_thread:
+                # the backend does the reading, we just have to wait
+                await cls._wait_for_no_callbacks()
+                return
+
+            if cls.mode == "reader":
+                try:
+                    fds = _event_api.get_fds()
+                except NotImplementedError:
+                    pass
+
+            if fds is None:
+                await cls._run_polling()
+            else:
+                await cls._run_with_readers(fds)
+        finally:
+            _event_api.stop_listening()
+
+            if use_thread:
+                _event_api.use_reader_thread(None)
 
-            for event in _event_api.event_queue:
-                for callback in cls._event_callbacks:
-                    callback(event)
-            _event_api.event_queue = []
+            cls.running = False
 
-            _event_api.fetch_new_events()
+    @classmethod
+    def add_callback(
+            cls,
+            callback: Callable[[any_event], None],
+            *event_types: type,
+    ):
+        """
+        makes {callback} get called with all events that are
+        instances of one of {event_types}, or all events if
+        no {event_types} are given
 
-            await asyncio.sleep(0.001)
+        ------------example------------
+        # only gets the key downs
+        EventDistributor.add_callback(func, KeyboardEvent.KeyDown)
+        """
+        cls._event_callbacks[callback] = event_types
+        cls._dispatch_table = {}
+
+        cls._update_wanted_event_types()
+        cls._ensure_running()
+
+    @classmethod
+    def remove_callback(cls, callback: Callable[[any_event], None]):
+        del cls._event_callbacks[callback]
+        cls._dispatch_table = {}
 
-    # add a with poling rate
+        cls._notify_callbacks_changed()
 
     @classmethod
-    def add_callback(cls, callback: Callable[[any_event], None]):
-        cls._event_callbacks.add(callback)
+    def add_batch_callback(
+            cls,
+            callback: Callable[[tuple[any_event, ...]], None],
+            *event_types: type,
+    ):
+        """
+        makes {callback} get called once per read, with a tuple of
+        all the events from that read (that are instances of one of
+        {event_types}, if given)
+
+        lets heavy consumers (recorders, forwarders, ...) spread
+        their per call overhead over many events
 
-        if not cls.running:
-            asyncio.create_task(
+        ------------example------------
+        # gets all mouse events, a batch at a time
+        EventDistributor.add_batch_callback(func, MouseEvent.event_types)
+        """
+        cls._batch_callbacks[callback] = event_types
+
+        cls._update_wanted_event_types()
+        cls._ensure_running()
+
+    @classmethod
+    def remove_batch_callback(
+            cls,
+            callback: Callable[[tuple[any_event, ...]], None]
+    ):
+        del cls._batch_callbacks[callback]
+
+        cls._notify_callbacks_changed()
+
+    @classmethod
+    def _update_wanted_event_types(cls):
+        wanted = []
+        for event_types in (
+                *cls._event_callbacks.values(),
+                *cls._batch_callbacks.values(),
+        ):
+            if not event_types:
+                # someone wants everything
+                _event_api.wanted_event_types = None
+                return
+
+            wanted += event_types
+
+        _event_api.wanted_event_types = tuple(wanted)
+
+    @classmethod
+    def _ensure_running(cls):
+        # several callbacks can be added before the task gets to run
+        if cls._task is None or cls._task.done():
+            cls._task = asyncio.create_task(
                 cls.run_event_distributor()
             )
 
     @classmethod
-    def remove_callback(cls, callback: Callable[[any_event], None]):
-        cls._event_callbacks.remove(callback)
+    def _notify_callbacks_changed(cls):
+        cls._update_wanted_event_types()
 
-        if not cls._event_callbacks:
-            cls.running = False
+        if cls._callbacks_changed is not None:
+            cls._callbacks_changed.set()
 
 # class EventDistributor:
 #     _event_callbacks = set()
@@ -113,114 +444,49 @@ def _event_listening_cleanup():
     _event_api.stop_listening()
 
 
-class EventQueue:
+class EventQueue(BaseEventQueue):
     """
     a queue of all events
 
     avents are added to it when detected by the event handlers
     removed when read
+
+    at most {capacity} events are queued, when a new event
+    arrives at a full queue the {overflow} policy decides what happens
+        "drop_oldest": the oldest queued event is dropped (the default)
+        "block": the event distributor stops reading new events
+            until the queue has been drained to half its capacity.
+            (the events of the current read are still queued)
+            that pauses everything else too (e.g. the hotkeys), so
+            only use it for consumers that are sure to keep up
+        "drop_newest": the new event is dropped
+        "coalesce": if both the new and the last queued event are
+            MouseEvent.Move(s) they are merged into one, otherwise
+            the oldest event is dropped
+
+    the amount of dropped / merged events are counted
+    in {dropped} / {coalesced}
     """
     def __init__(
             self,
+            capacity: int | None = 4096,
+            overflow: Literal[
+                "block", "drop_oldest", "drop_newest", "coalesce"
+            ] = "drop_oldest",
             # event_distributor: EventDistributor = None
     ):
         # self._event_distributor = event_distributor or EventDistributor()
-        self._in_with = False
-        self._running = False
-        self.queued_events = []
-
-    def add_event(self, event: any_event):
-        self.queued_events.append(event)
-
-    def stop(self):
-        self._running = False
-
-    def __enter__(self):
-        self._in_with = True
+        super().__init__(capacity=capacity, overflow=overflow)
 
+    def _subscribe(self):
         EventDistributor.add_callback(self.add_event)
-        return self
-
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self._in_with = False
-
-        if exc_type is None:
-            EventDistributor.add_callback(self.add_event)
-            return
-
-        if exc_type is StopIteration:
-            EventDistributor.remove_callback(self.add_event)
-            return True  # supress exception
-
-    async def __aiter__(self):
-        """
-        Gets the next event, forever. If there's no events queued. Then it
-        waits for an event before yielding.
-
-        # ------------------example------------------
-        # this would print all keyboard keydown events
-
-        with EventStack() as eq:
-            for event in eq:
-                if isinstance(event, KeyboardEvent.KeyDown):
-                    event.print_event()
-        """
-
-        if not self._in_with:
-            raise TypeError("not in protective with statement")
-
-        if self._running:
-            raise TypeError(
-                "event conveyor already running cant start it again"
-            )
 
-        self._running = True
+    def _unsubscribe(self):
+        EventDistributor.remove_callback(self.add_event)
 
-        while True:
-            while True:
-                if not self._running:
-                    raise StopIteration  # todo or maybe StopAsyncIteration
+    def _block(self):
+        EventDistributor.pause_reading(self)
 
-                if self.queued_events:
-                    break
-
-                await asyncio.sleep(0.001)
-
-            yield self.queued_events.pop(0)
-
-    # add a with poling rate
-
-    async def supply_events(
-            self,
-            handler: Callable[[any_event], Awaitable[None] | None]
-    ):
-        """
-        a decorator that makes the supplied func receive
-        all events
-
-        ------------example------------
-        # prints all events
-
-        eq = EventStack()
-        @eq.supply_events
-        async def handle_event(event)
-            print_event(event)
-
-        # to stop it either call eq.stop()
-        # or raise StopIteration (from inside the handler)
-        """
-        is_async = inspect.iscoroutinefunction(handler)
-
-        if is_async:
-            async def wrapper():
-                with self as _eq:
-                    async for _event in _eq:
-                        await handler(_event)
-
-            # noinspection PyAsyncCall
-            asyncio.create_task(wrapper())
-
-        else:
-            with self as eq:
-                async for event in eq:
-                    handler(event)
+    def _unblock(self):
+        self._blocking = False
+        EventDistributor.resume_reading(self)
@@ -0,0 +1,156 @@
+import asyncio
+import inspect
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Literal
+
+run_type = Literal["inline", "task", "thread", "process"]
+busy_type = Literal["drop", "queue", "coalesce"]
+
+
+class HotkeyAction:
+    """
+    runs a hotkey func without making the listener wait for it
+
+    how it's ran ({run}):
+        "inline":  called directly by the listener (the default for
+            normal functions), only for things that are quick
+        "task":    as an asyncio task (the default, and only option,
+            for coroutine functions)
+        "thread":  in a shared thread pool
+        "process": in a shared process pool, the func has to be
+            picklable (e.g. not a method of something with an open pipe)
+
+    at most {max_running} runs are going at once, when it's triggered
+    while at the limit {when_busy} decides what happens
+        "drop":     the new run is dropped
+        "queue":    it's ran once one of the running ones is done
+        "coalesce": like "queue", but at most one run waits,
+            later ones are dropped
+
+    the amount of dropped runs are counted in {dropped}
+    """
+    thread_pool_size: int | None = None
+    process_pool_size: int | None = None
+
+    _thread_pool: ThreadPoolExecutor | None = None
+    _process_pool: ProcessPoolExecutor | None = None
+
+    def __init__(
+            self,
+            func: Callable,
+            run: Literal["task", "thread", "process"],
+            max_running: int = 1,
+            when_busy: busy_type = "drop",
+    ):
+        """ use wrap, inline funcs aren't wrapped """
+        if max_running < 1:
+            raise ValueError("max_running has to be at least 1")
+
+        self.func = func
+        self.run = run
+        self.max_running = max_running
+        self.when_busy = when_busy
+
+        self.running = 0
+        self.waiting = 0
+        self.dropped = 0
+
+        self._tasks: set[asyncio.Task] = set()
+
+    @classmethod
+    def wrap(
+            cls,
+            func: Callable,
+            run: run_type | None = None,
+            max_running: int = 1,
+            when_busy: busy_type = "drop",
+    ) -> Callable[[], None]:
+        """ :return: what the listener should call for {func} """
+        is_coroutine_function = inspect.iscoroutinefunction(func)
+
+        if run is None:
+            run = "task" if is_coroutine_function else "inline"
+
+        if (run == "task") != is_coroutine_function:
+            raise TypeError(
+                "coroutine functions have to, and only they can, run as tasks"
+            )
+
+        if run == "inline":
+            # nothing to keep track of
+            return func
+
+        return cls(func, run, max_running, when_busy)
+
+    @classmethod
+    def _get_executor(cls, run: run_type) -> Executor:
+        if run == "thread":
+            if cls._thread_pool is None:
+                cls._thread_pool = ThreadPoolExecutor(
+                    cls.thread_pool_size, thread_name_prefix="hotkey"
+                )
+
+            return cls._thread_pool
+
+        if cls._process_pool is None:
+            cls._process_pool = ProcessPoolExecutor(cls.process_pool_size)
+
+        return cls._process_pool
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """ stops the pools, the running funcs are still waited for """
+        for pool in (cls._thread_pool, cls._process_pool):
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        cls._thread_pool = None
+        cls._process_pool = None
+
+    def __call__(self):
+        if self.running < self.max_running:
+            self._start()
+
+        elif self.when_busy == "queue" \
+                or (self.when_busy == "coalesce" and not self.waiting):
+            self.waiting += 1
+
+        else:
+            self.dropped += 1
+
+    def _start(self):
+        self.running += 1
+
+        loop = asyncio.get_running_loop()
+
+        if self.run == "task":
+            future = loop.create_task(self.func())
+            self._tasks.add(future)
+        else:
+            future = loop.run_in_executor(
+                self._get_executor(self.run), self.func
+            )
+
+        future.add_done_callback(self._on_done)
+
+    def _on_done(self, future: asyncio.Future):
+        self.running -= 1
+        self._tasks.discard(future)
+
+        if not future.cancelled() and future.exception() is not None:
+            future.get_loop().call_exception_handler({
+                "message": f"hotkey func {self.func!r} failed",
+                "exception": future.exception(),
+                "future": future,
+            })
+
+        if self.waiting:
+            self.waiting -= 1
+            self._start()
+
+    def cancel(self):
+        """ drops the waiting runs and cancels the running tasks """
+        self.waiting = 0
+
+        for task in tuple(self._tasks):
+            task.cancel()
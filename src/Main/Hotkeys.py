@@ -0,0 +1,710 @@
+import asyncio
+from typing import Callable, Literal
+
+from src.Events import KeyboardEvent
+from src.Main.CallbackProfiler import CallbackProfiler
+from src.Main.EventQueue import EventDistributor
+from src.OsAbstractions import get_backend
+from src.OsAbstractions.Abstract.KeyMask import vks_to_mask
+
+_backend = get_backend()
+_keyboard = _backend.Keyboard
+_mouse = _backend.Mouse
+
+trigger_type = Literal["press", "release", "tap", "hold", "double_tap"]
+
+
+class Hotkey:
+    """
+    {press} while {along_with} are held
+
+    when it fires depends on the {trigger}:
+        press:      when {press} is pressed
+        release:    when {press} is released
+        tap:        when {press} is released within {delay_ms}
+        hold:       when {press} has been held for {delay_ms}
+        double_tap: when {press} is pressed again within {delay_ms}
+
+    the held keys are always checked when {press} is pressed
+
+    if a key has both tap and double_tap hotkeys, the tap waits to
+    see if it's a double tap, and a double tap isn't a tap
+    """
+    def __init__(
+            self,
+            press,
+            along_with: set[int] = None,
+            exclusive: bool = True,
+            ignore_mouse: bool = True,
+            trigger: trigger_type = "press",
+            delay_ms: float = 300,
+    ):
+        self.press: int = press
+        self.along_with: set[int] = along_with or set()
+        self.exclusive: bool = exclusive
+        self.ignore_mouse: bool = ignore_mouse
+        self.trigger: trigger_type = trigger
+        self.delay_ms: float = delay_ms
+
+    def _key(self):
+        return (
+            self.press,
+            frozenset(self.along_with),
+            self.exclusive,
+            self.ignore_mouse,
+            self.trigger,
+            self.delay_ms,
+        )
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __eq__(self, other):
+        if not isinstance(other, Hotkey):
+            return NotImplemented
+
+        return self._key() == other._key()
+
+
+class _Binding:
+    """ a hotkey, precompiled into what the pressed keys are compared to """
+    __slots__ = (
+        "func", "mask", "exclusive", "ignore_mouse", "trigger", "delay_ms"
+    )
+
+    def __init__(self, func: Callable[[], None] | None, hotkey: Hotkey):
+        # set to None when it's unbound, since
+        # the timers can still have a reference to it
+        self.func = func
+
+        # the press key is pressed too when the KeyDown is handled
+        self.mask = vks_to_mask({hotkey.press, *hotkey.along_with})
+        self.exclusive = hotkey.exclusive
+        self.ignore_mouse = hotkey.ignore_mouse
+
+        self.trigger = hotkey.trigger
+        self.delay_ms = hotkey.delay_ms
+
+    def matches(self, pressed: int, pressed_without_mouse: int) -> bool:
+        state = pressed_without_mouse if self.ignore_mouse else pressed
+
+        if self.exclusive:
+            return state == self.mask
+
+        return self.mask & ~state == 0
+
+    def call(self):
+        if self.func is not None:
+            self.func()
+
+    def profile(self, event):
+        """ call, timed by the CallbackProfiler like a callback for {event} """
+        if self.func is not None:
+            CallbackProfiler.call(self.func, event, with_event=False)
+
+
+class _KeyPress:
+    """ a held key, with the timed bindings that matched when it was pressed """
+    __slots__ = ("time_ms", "bindings", "hold_handles", "held", "double_tap")
+
+    def __init__(self, time_ms: float, bindings: list[_Binding]):
+        self.time_ms = time_ms
+        self.bindings = bindings
+
+        self.hold_handles: list[asyncio.TimerHandle] = []
+
+        # if a hold binding fired, then it's not a tap
+        self.held = False
+
+        # if it was the second press of a double tap
+        self.double_tap = False
+
+    def cancel(self):
+        for handle in self.hold_handles:
+            handle.cancel()
+
+
+_mouse_mask = vks_to_mask(_mouse.button_vks)
+
+
+def _pressed_masks(event: KeyboardEvent.KeyDown) -> tuple[int, int]:
+    """ :return: the pressed keys, with and without the mouse buttons """
+    # the keys pressed when the event happened, not when it's
+    # handled, they can differ if many events are read at once
+    pressed = event.pressed_mask
+    if pressed is None:
+        pressed = _keyboard.get_pressed_mask()
+
+    return pressed, pressed & ~_mouse_mask
+
+
+class HotkeyRegistry:
+    """
+    all the hotkeys, behind one EventDistributor callback
+
+    the bindings are indexed by their press key, so a KeyDown
+    only looks at the hotkeys for that key, and the pressed keys
+    are compared to them as bitmasks
+
+    the hotkeys with other triggers than "press" are timed with
+    loop.call_later handles, that are cancelled when the key is
+    released, so nothing has to look through the pending timers
+    """
+    # {press vk: {(func, hotkey): binding}}
+    _bindings: dict[int, dict[tuple[Callable, Hotkey], _Binding]] = {}
+    _binding_count = 0
+
+    # the same for the other triggers, they need the KeyUps too
+    _timed_bindings: dict[int, dict[tuple[Callable, Hotkey], _Binding]] = {}
+    _timed_count = 0
+
+    # {vk: its press}, for the held keys that matched a timed binding
+    _presses: dict[int, _KeyPress] = {}
+
+    # {vk: when it was pressed}, for the keys that can be double tapped
+    _last_presses: dict[int, float] = {}
+
+    # {vk: the taps waiting to see if it's a double tap}
+    _pending_taps: dict[int, asyncio.TimerHandle] = {}
+
+    @classmethod
+    def _on_key_down(cls, event: KeyboardEvent.KeyDown):
+        if event.synthetic:
+            # what we type ourselves (LinuxEventApi.synthetic_events
+            # = "tag") shouldn't trigger the hotkeys, it could loop
+            return
+
+        vk = event.key_data.vk
+
+        bindings = cls._bindings.get(vk)
+        if not bindings and vk not in cls._timed_bindings:
+            return
+
+        pressed, pressed_without_mouse = _pressed_masks(event)
+
+        # the funcs are allowed to (un)bind hotkeys
+        if bindings:
+            # each hotkey on its own, instead of all of them
+            # together as the time of this callback
+            profiling = CallbackProfiler.enabled
+
+            for binding in tuple(bindings.values()):
+                if not binding.matches(pressed, pressed_without_mouse):
+                    continue
+
+                if profiling:
+                    binding.profile(event)
+                else:
+                    binding.call()
+
+        timed = cls._timed_bindings.get(vk)
+        if timed:
+            cls._on_timed_key_down(vk, event.time_ms, [
+                binding
+                for binding in timed.values()
+                if binding.matches(pressed, pressed_without_mouse)
+            ])
+
+    @classmethod
+    def _on_timed_key_down(cls, vk: int, time_ms: float, matched: list):
+        old_press = cls._presses.pop(vk, None)
+        if old_press is not None:
+            # e.g. the KeyUp was missed
+            old_press.cancel()
+
+        if not matched:
+            return
+
+        press = _KeyPress(time_ms, matched)
+        cls._presses[vk] = press
+
+        loop = asyncio.get_running_loop()
+        last_press = cls._last_presses.pop(vk, None)
+
+        double_taps = []
+        can_double_tap = False
+        for binding in matched:
+            if binding.trigger == "hold":
+                press.hold_handles.append(loop.call_later(
+                    binding.delay_ms / 1000,
+                    cls._on_hold, press, binding
+                ))
+
+            elif binding.trigger == "double_tap":
+                can_double_tap = True
+
+                if last_press is not None \
+                        and time_ms - last_press <= binding.delay_ms:
+                    double_taps.append(binding)
+
+        if double_taps:
+            press.double_tap = True
+
+            pending_taps = cls._pending_taps.pop(vk, None)
+            if pending_taps is not None:
+                pending_taps.cancel()
+
+            for binding in double_taps:
+                binding.call()
+
+        elif can_double_tap:
+            # a third press starts over
+            cls._last_presses[vk] = time_ms
+
+    @classmethod
+    def _on_hold(cls, press: _KeyPress, binding: _Binding):
+        press.held = True
+        binding.call()
+
+    @classmethod
+    def _on_key_up(cls, event: KeyboardEvent.KeyUp):
+        if event.synthetic:
+            return
+
+        vk = event.key_data.vk
+
+        press = cls._presses.pop(vk, None)
+        if press is None:
+            return
+
+        press.cancel()
+
+        duration_ms = event.time_ms - press.time_ms
+
+        taps = []
+        for binding in press.bindings:
+            if binding.trigger == "release":
+                binding.call()
+
+            elif binding.trigger == "tap" \
+                    and not press.held \
+                    and not press.double_tap \
+                    and duration_ms < binding.delay_ms:
+                taps.append(binding)
+
+        if not taps:
+            return
+
+        if vk not in cls._last_presses:
+            for binding in taps:
+                binding.call()
+            return
+
+        # wait for the double tap window to pass
+        wait_ms = max(
+            binding.delay_ms
+            for binding in press.bindings
+            if binding.trigger == "double_tap"
+        ) - duration_ms
+
+        cls._pending_taps[vk] = asyncio.get_running_loop().call_later(
+            max(wait_ms, 0) / 1000,
+            cls._on_taps, vk, taps
+        )
+
+    @classmethod
+    def _on_taps(cls, vk: int, taps: list[_Binding]):
+        del cls._pending_taps[vk]
+
+        for binding in taps:
+            binding.call()
+
+    @classmethod
+    def _reset_timed(cls):
+        for press in cls._presses.values():
+            press.cancel()
+
+        for handle in cls._pending_taps.values():
+            handle.cancel()
+
+        cls._presses = {}
+        cls._last_presses = {}
+        cls._pending_taps = {}
+
+    @classmethod
+    def bind(
+            cls,
+            func: Callable[[], None],
+            hotkey: Hotkey,
+            action: Callable[[], None] | None = None,
+    ):
+        """ {action} is what's called instead of {func}, if given """
+        timed = hotkey.trigger != "press"
+        registry = cls._timed_bindings if timed else cls._bindings
+
+        try:
+            bindings = registry[hotkey.press]
+        except KeyError:
+            bindings = registry[hotkey.press] = {}
+
+        if (func, hotkey) in bindings:
+            raise TypeError("func already bound to said hotkey")
+
+        bindings[(func, hotkey)] = _Binding(action or func, hotkey)
+        cls._binding_count += 1
+
+        if cls._binding_count == 1:
+            EventDistributor.add_callback(
+                cls._on_key_down,
+                KeyboardEvent.KeyDown,
+            )
+
+        if timed:
+            cls._timed_count += 1
+
+            if cls._timed_count == 1:
+                EventDistributor.add_callback(
+                    cls._on_key_up,
+                    KeyboardEvent.KeyUp,
+                )
+
+    @classmethod
+    def unbind(
+            cls,
+            func: Callable[[], None],
+            hotkey: Hotkey,
+    ) -> Callable[[], None]:
+        """ :return: what was called for {func} """
+        timed = hotkey.trigger != "press"
+        registry = cls._timed_bindings if timed else cls._bindings
+
+        try:
+            bindings = registry[hotkey.press]
+            binding = bindings.pop((func, hotkey))
+        except KeyError:
+            raise TypeError("no func bound to said hotkey")
+
+        action = binding.func
+        binding.func = None
+
+        if not bindings:
+            del registry[hotkey.press]
+
+        cls._binding_count -= 1
+
+        if cls._binding_count == 0:
+            EventDistributor.remove_callback(cls._on_key_down)
+
+        if timed:
+            cls._timed_count -= 1
+
+            if cls._timed_count == 0:
+                cls._reset_timed()
+                EventDistributor.remove_callback(cls._on_key_up)
+
+        return action
+
+    @classmethod
+    def get_bindings(cls) -> list[tuple[Callable[[], None], Hotkey]]:
+        return [
+            key
+            for registry in (cls._bindings, cls._timed_bindings)
+            for bindings in registry.values()
+            for key in bindings
+        ]
+
+
+class HotkeySequence:
+    """
+    hotkeys that have to be pressed one after another,
+    e.g. ctrl+k then ctrl+c (like in emacs)
+
+    each step has to come within {timeout_ms} of the previous one.
+    pressing a key that's part of a step (e.g. ctrl) doesn't break the
+    sequence, any other key that doesn't continue it does
+
+    a step can be given as just the press key, i.e. Hotkey(press)
+    """
+    def __init__(self, *steps: Hotkey | int, timeout_ms: float = 1000):
+        if not steps:
+            raise TypeError("a sequence needs at least one step")
+
+        self.steps: tuple[Hotkey, ...] = tuple(
+            step if isinstance(step, Hotkey) else Hotkey(step)
+            for step in steps
+        )
+
+        if any(step.trigger != "press" for step in self.steps):
+            raise TypeError("the steps of a sequence fire on press")
+        self.timeout_ms: float = timeout_ms
+
+    def _key(self):
+        return self.steps, self.timeout_ms
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __eq__(self, other):
+        if not isinstance(other, HotkeySequence):
+            return NotImplemented
+
+        return self._key() == other._key()
+
+
+class _SequenceNode:
+    """ a step in the trie of sequences, shared by all that start the same """
+    __slots__ = ("parent", "step", "binding", "children", "funcs", "timeouts")
+
+    def __init__(self, parent: "_SequenceNode | None", step: Hotkey | None):
+        self.parent = parent
+        self.step = step
+        self.binding = None if step is None else _Binding(None, step)
+
+        # {press vk: {step: node}}
+        self.children: dict[int, dict[Hotkey, _SequenceNode]] = {}
+
+        # {(func, sequence): what's called}, for the sequences that end here
+        self.funcs: dict[tuple[Callable, HotkeySequence], Callable] = {}
+
+        # {timeout: how many sequences continue from here with it}
+        self.timeouts: dict[float, int] = {}
+
+    def get_timeout_ms(self) -> float:
+        """ how long to wait for the next step """
+        return max(self.timeouts)
+
+
+class SequenceRegistry:
+    """
+    all the sequences, compiled into a trie of their steps
+
+    the partial matches are the nodes that are waiting for their next
+    step, each with a loop.call_later handle that drops it when it times
+    out, so a KeyDown only looks at those (and the sequences that start
+    with said key), not at all the sequences
+    """
+    _root = _SequenceNode(None, None)
+    _binding_count = 0
+
+    # {node: its timeout}
+    _active: dict[_SequenceNode, asyncio.TimerHandle] = {}
+
+    # {active node: (when it was reached, the longest gap between the
+    # steps that got there)}. it waits for the longest timeout of the
+    # sequences that continue from it, this is what the shorter ones
+    # are checked against
+    _progress: dict[_SequenceNode, tuple[float, float]] = {}
+
+    # {vk: in how many steps it's held}, these don't break a sequence
+    _chord_keys: dict[int, int] = {}
+    _chord_mask = 0
+
+    @classmethod
+    def _expire(cls, node: _SequenceNode):
+        cls._active.pop(node, None)
+        cls._progress.pop(node, None)
+
+    @classmethod
+    def _reset(cls):
+        for handle in cls._active.values():
+            handle.cancel()
+
+        cls._active = {}
+        cls._progress = {}
+
+    @staticmethod
+    def _reach(
+            nodes,
+            vk: int,
+            pressed: int,
+            pressed_without_mouse: int,
+    ) -> list[_SequenceNode]:
+        """ :return: the children of {nodes} a press of {vk} gets to """
+        return [
+            child
+            for node in nodes
+            for child in node.children.get(vk, {}).values()
+            if child.binding.matches(pressed, pressed_without_mouse)
+        ]
+
+    @staticmethod
+    def _in_time(node: _SequenceNode, gap_ms: float) -> bool:
+        """ if a sequence through {node} allows steps {gap_ms} apart """
+        return (
+            bool(node.timeouts) and gap_ms <= node.get_timeout_ms()
+            or any(
+                gap_ms <= sequence.timeout_ms
+                for func, sequence in node.funcs
+            )
+        )
+
+    @classmethod
+    def _on_key_down(cls, event: KeyboardEvent.KeyDown):
+        if event.synthetic:
+            # see HotkeyRegistry._on_key_down
+            return
+
+        vk = event.key_data.vk
+
+        if not cls._active and vk not in cls._root.children:
+            return
+
+        pressed, pressed_without_mouse = _pressed_masks(event)
+        now_ms = event.time_ms
+
+        # [(node, the longest gap between its steps)]
+        reached = []
+        for node in cls._active:
+            reached_ms, gap_ms = cls._progress[node]
+            gap_ms = max(gap_ms, now_ms - reached_ms)
+
+            reached += [
+                (child, gap_ms)
+                for child in cls._reach(
+                    (node, ), vk, pressed, pressed_without_mouse
+                )
+                if cls._in_time(child, gap_ms)
+            ]
+
+        if not reached:
+            # a press that continues a sequence doesn't also start one,
+            # e.g. the 3rd a of "a a a" only starts the next "a a"
+            reached = [
+                (child, 0)
+                for child in cls._reach(
+                    (cls._root, ), vk, pressed, pressed_without_mouse
+                )
+            ]
+
+        if not reached and cls._chord_mask >> vk & 1:
+            # e.g. pressing ctrl for the next step
+            return
+
+        # the partial matches either continued or are broken
+        cls._reset()
+
+        loop = asyncio.get_running_loop()
+        for node, gap_ms in reached:
+            if node.timeouts and gap_ms <= node.get_timeout_ms():
+                cls._active[node] = loop.call_later(
+                    node.get_timeout_ms() / 1000,
+                    cls._expire, node
+                )
+                cls._progress[node] = (now_ms, gap_ms)
+
+        # the funcs are allowed to (un)bind sequences
+        for node, gap_ms in reached:
+            for (func, sequence), action in tuple(node.funcs.items()):
+                # the sequences sharing the node can have shorter timeouts
+                if gap_ms <= sequence.timeout_ms:
+                    action()
+
+    @classmethod
+    def _update_chord_keys(cls, sequence: HotkeySequence, change: int):
+        for step in sequence.steps:
+            for vk in step.along_with:
+                count = cls._chord_keys.get(vk, 0) + change
+
+                if count:
+                    cls._chord_keys[vk] = count
+                else:
+                    del cls._chord_keys[vk]
+
+        cls._chord_mask = vks_to_mask(cls._chord_keys)
+
+    @classmethod
+    def bind(
+            cls,
+            func: Callable[[], None],
+            sequence: HotkeySequence,
+            action: Callable[[], None] | None = None,
+    ):
+        """ {action} is what's called instead of {func}, if given """
+        nodes = []
+        node = cls._root
+        for step in sequence.steps:
+            nodes.append(node)
+
+            try:
+                steps = node.children[step.press]
+            except KeyError:
+                steps = node.children[step.press] = {}
+
+            try:
+                node = steps[step]
+            except KeyError:
+                node = steps[step] = _SequenceNode(node, step)
+
+        if (func, sequence) in node.funcs:
+            raise TypeError("func already bound to said sequence")
+
+        node.funcs[(func, sequence)] = action or func
+
+        timeout = sequence.timeout_ms
+        for prefix in nodes:
+            prefix.timeouts[timeout] = prefix.timeouts.get(timeout, 0) + 1
+
+        cls._update_chord_keys(sequence, 1)
+        cls._binding_count += 1
+
+        if cls._binding_count == 1:
+            EventDistributor.add_callback(
+                cls._on_key_down,
+                KeyboardEvent.KeyDown,
+            )
+
+    @classmethod
+    def unbind(
+            cls,
+            func: Callable[[], None],
+            sequence: HotkeySequence,
+    ) -> Callable[[], None]:
+        """ :return: what was called for {func} """
+        node = cls._root
+        try:
+            for step in sequence.steps:
+                node = node.children[step.press][step]
+
+            action = node.funcs.pop((func, sequence))
+        except KeyError:
+            raise TypeError("no func bound to said sequence")
+
+        # go back up, removing the nodes that nothing uses anymore
+        timeout = sequence.timeout_ms
+        while node.parent is not None:
+            parent = node.parent
+
+            count = parent.timeouts[timeout] - 1
+            if count:
+                parent.timeouts[timeout] = count
+            else:
+                del parent.timeouts[timeout]
+
+            if not node.children and not node.funcs:
+                steps = parent.children[node.step.press]
+                del steps[node.step]
+
+                if not steps:
+                    del parent.children[node.step.press]
+
+            if not node.children:
+                handle = cls._active.pop(node, None)
+                if handle is not None:
+                    handle.cancel()
+
+                cls._progress.pop(node, None)
+
+            node = parent
+
+        cls._update_chord_keys(sequence, -1)
+        cls._binding_count -= 1
+
+        if cls._binding_count == 0:
+            cls._reset()
+            EventDistributor.remove_callback(cls._on_key_down)
+
+        return action
+
+    @classmethod
+    def get_bindings(cls) -> list[tuple[Callable[[], None], HotkeySequence]]:
+        bindings = []
+
+        nodes = [cls._root]
+        while nodes:
+            node = nodes.pop()
+            bindings += node.funcs
+
+            for steps in node.children.values():
+                nodes += steps.values()
+
+        return bindings
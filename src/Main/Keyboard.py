@@ -1,9 +1,14 @@
+import asyncio
 from typing import Callable
 
 from src.AbsVkEnum import KeyData
-from src.Events import KeyboardEvent, any_event
+from src.Events import KeyboardEvent
 from src.Main import TypeWriter
 from src.Main.EventQueue import EventQueue, EventDistributor
+from src.Main.HotkeyActions import HotkeyAction, busy_type, run_type
+from src.Main.Hotkeys import (
+    Hotkey, HotkeyRegistry, HotkeySequence, SequenceRegistry
+)
 from src.OsAbstractions import get_backend, get_backend_type
 
 _backend_type = get_backend_type()
@@ -14,28 +19,6 @@ _event_api = _backend.EventApi
 _mouse = _backend.Mouse
 
 
-class Hotkey:
-    def __init__(
-            self,
-            press,
-            along_with: set[int] = None,
-            exclusive: bool = True,
-            ignore_mouse: bool = True
-    ):
-        self.press: int = press
-        self.along_with: set[int] = along_with or set()
-        self.exclusive: bool = exclusive
-        self.ignore_mouse: bool = ignore_mouse
-
-    def __hash__(self):
-        return hash((
-            self.press,
-            sorted(list(self.along_with)),
-            self.exclusive,
-            self.ignore_mouse
-        ))
-
-
 class Keyboard:
     @classmethod
     def is_pressed(cls, *keys: KeyData):
@@ -57,7 +40,8 @@ class Keyboard:
         with EventQueue() as eq:
             async for event in eq:
 
-                if not isinstance(event, KeyboardEvent.KeySend):
+                if not isinstance(event, KeyboardEvent.KeySend) \
+                        or event.synthetic:
                     continue
 
                 for char in event.chars:
@@ -131,8 +115,10 @@ class Keyboard:
     _text_type_binds: dict = {}
 
     @classmethod
-    def _listening_for_text_callback(cls, event: any_event):
-        if not isinstance(event, KeyboardEvent.KeySend):
+    def _listening_for_text_callback(cls, event: KeyboardEvent.KeySend):
+        if event.synthetic:
+            # our own typing (e.g. the replacements) shouldn't
+            # be able to trigger a replacement
             return
 
         for char in event.chars:
@@ -158,13 +144,14 @@ class Keyboard:
 
     @classmethod
     def add_text_replacement(cls, text, replacement):
-        if cls._text_type_binds[text]:
+        if text in cls._text_type_binds:
             raise TypeError(f"a replacement already exist for \"{text}\"")
 
         cls._text_type_binds[text] = (replacement, 0)
         if len(cls._text_type_binds) == 1:
             EventDistributor.add_callback(
-                cls._listening_for_text_callback
+                cls._listening_for_text_callback,
+                KeyboardEvent.KeySend,
             )
 
     @classmethod
@@ -181,61 +168,69 @@ class Keyboard:
 
     @staticmethod
     async def wait_for_hotkey(hotkey: Hotkey):
-        with EventQueue() as eq:
-            async for event in eq:
-                if not isinstance(event, KeyboardEvent.KeyDown):
-                    continue
+        pressed = asyncio.get_running_loop().create_future()
 
-                if event.vk != hotkey.press:
-                    continue
-
-                pressed = _keyboard.get_pressed_keys()
-                if hotkey.ignore_mouse:
-                    pressed -= _mouse.button_vks
+        def func():
+            if not pressed.done():
+                pressed.set_result(None)
 
-                if hotkey.exclusive:
-                    if pressed == hotkey.along_with:
-                        break
-                elif pressed.issuperset(hotkey.along_with):
-                    break
-
-    _hotkey_binds = {}
+        HotkeyRegistry.bind(func, hotkey)
+        try:
+            await pressed
+        finally:
+            HotkeyRegistry.unbind(func, hotkey)
 
     @classmethod
     def bind_to_hotkey(
             cls,
-            func: Callable[[], None],
+            func: Callable,
             hotkey: Hotkey,
+            run: run_type | None = None,
+            max_running: int = 1,
+            when_busy: busy_type = "drop",
     ):
-        def wrapper(event):
-            if not isinstance(event, KeyboardEvent.KeyDown):
-                return
-
-            if event.vk != hotkey.press:
-                return
+        """
+        {func} can be a coroutine function, for how it's
+        ran ({run}, {max_running}, {when_busy}) see HotkeyAction
+        """
+        HotkeyRegistry.bind(
+            func, hotkey,
+            HotkeyAction.wrap(func, run, max_running, when_busy)
+        )
 
-            pressed = _keyboard.get_pressed_keys()
-            if hotkey.ignore_mouse:
-                pressed -= _mouse.button_vks
+    @classmethod
+    def unbind_hotkey(
+            cls,
+            func: Callable,
+            hotkey: Hotkey,
+    ):
+        action = HotkeyRegistry.unbind(func, hotkey)
 
-            if hotkey.exclusive:
-                if pressed == hotkey.along_with:
-                    func()
-            elif pressed.issuperset(hotkey.along_with):
-                func()
+        if isinstance(action, HotkeyAction):
+            action.cancel()
 
-        cls._hotkey_binds[(func, hotkey)] = wrapper
-        EventDistributor.add_callback(wrapper)
+    @classmethod
+    def bind_to_sequence(
+            cls,
+            func: Callable,
+            sequence: HotkeySequence,
+            run: run_type | None = None,
+            max_running: int = 1,
+            when_busy: busy_type = "drop",
+    ):
+        """ like bind_to_hotkey, but for a sequence of hotkeys """
+        SequenceRegistry.bind(
+            func, sequence,
+            HotkeyAction.wrap(func, run, max_running, when_busy)
+        )
 
     @classmethod
-    def unbind_hotkey(
+    def unbind_sequence(
             cls,
-            func: Callable[[], None],
-            hotkey: Hotkey,
+            func: Callable,
+            sequence: HotkeySequence,
     ):
-        try:
-            wrapper = cls._hotkey_binds[(func, hotkey)]
-        except KeyError:
-            raise TypeError("no func bound to said hotkey")
+        action = SequenceRegistry.unbind(func, sequence)
 
-        EventDistributor.remove_callback(wrapper)
+        if isinstance(action, HotkeyAction):
+            action.cancel()
@@ -67,6 +67,10 @@ class _StateData:
 class _TypeWriter:
     @classmethod
     def _dispatch_block(cls, vk: int, press: bool):
+        if _event_api.identifies_own_events:
+            # the backend already knows that they're ours
+            return
+
         event_class = KeyboardEvent.KeyDown if press else KeyboardEvent.KeyUp
 
         # btw blocking a KeyData blocks that button,
@@ -1,11 +1,35 @@
+import time
 from abc import ABC, abstractmethod
+from collections import deque
+from typing import Callable
 
 from src.Events import any_event, KeyboardEvent
+from src.LatencyTracer import LatencyTracer
 
 
 class EventApi(ABC):
     # used to block events that where created programmatically
-    _blocked_events: set[any_event] = set()
+    # {block key: expiry times (time.monotonic()) of the blocks for it}
+    # one expiry time per block, so the length is the reference count
+    _blocked_events: dict[tuple, deque[float]] = {}
+
+    # how long a block waits for its event before it expires
+    block_ttl_ms: float = 1000
+
+    # stats for the blocks
+    blocks_added = 0
+    blocks_matched = 0
+    # blocks that never saw their event, if this grows
+    # then the programmatically generated input (probably) failed
+    blocks_expired = 0
+
+    _next_block_sweep = 0.0
+
+    # True if the backend can tell our own (programmatically generated)
+    # events apart by where they come from, then they don't have to be
+    # blocked (see dispatch_event_block)
+    identifies_own_events = False
+
     event_queue = []
     # store the current state of the keyboard
     # vk_code: is_down
@@ -14,6 +38,15 @@ class EventApi(ABC):
     # is the EventApi inited and listening
     _active = False
 
+    # the event classes that someone wants, None means all of them
+    # lets the backend skip making events that no one would get
+    wanted_event_types: tuple[type, ...] | None = None
+
+    @classmethod
+    def is_wanted(cls, event_class: type) -> bool:
+        return cls.wanted_event_types is None \
+            or issubclass(event_class, cls.wanted_event_types)
+
     # maybe
     # todo add a check to make sure that you've started listening before
     #   using meth::fetch_new_events
@@ -21,35 +54,83 @@ class EventApi(ABC):
     def __init__(self):
         raise TypeError("you are not ment to make instances of this class")
 
+    @staticmethod
+    def _block_key(event: any_event) -> tuple:
+        if isinstance(event, KeyboardEvent.event_types):
+            # When dispatching blocks for keyboards
+            # we block a specific key/button.
+            # So don't compare the full thing since the
+            # state is impossible to calculate.
+            return event.__class__, event.key_data.vk
+
+        return event.__class__, event
+
     @classmethod
     def dispatch_event_block(cls, event: any_event) -> None:
-        """ makes it so that the next event that is dispatched with the {}"""
+        """
+        makes it so that the next event that is dispatched that matches
+        {event} is dropped, unless it doesn't come within block_ttl_ms
+        """
+        now = time.monotonic()
+
+        key = cls._block_key(event)
+        try:
+            expiry_times = cls._blocked_events[key]
+        except KeyError:
+            expiry_times = cls._blocked_events[key] = deque()
+
+        expiry_times.append(now + cls.block_ttl_ms / 1000)
+        cls.blocks_added += 1
 
-        # todo: add some warning for if a event stys blocked for too long
-        #   since that would mean that the programmatically generated user
-        #   input (probably) failed.
-        cls._blocked_events.add(event)
+        cls._sweep_expired_blocks(now)
+
+    @classmethod
+    def _sweep_expired_blocks(cls, now: float):
+        """
+        removes the expired blocks for all keys, so that
+        blocks for keys that never come back don't pile up
+
+        only actually does it once per block_ttl_ms
+        """
+        if now < cls._next_block_sweep:
+            return
+
+        cls._next_block_sweep = now + cls.block_ttl_ms / 1000
+
+        for key, expiry_times in tuple(cls._blocked_events.items()):
+            while expiry_times and expiry_times[0] <= now:
+                expiry_times.popleft()
+                cls.blocks_expired += 1
+
+            if not expiry_times:
+                del cls._blocked_events[key]
 
     @classmethod
     def _is_event_blocked(cls, event: any_event) -> bool:
-        # check if event is blocked
-        for blocked_event in cls._blocked_events:
-            if event.__class__ == blocked_event.__class__:
-                if isinstance(event, KeyboardEvent.event_types):
-                    # When dispatching blocks for keyboards
-                    # we block a specific key/button.
-                    # So don't compare the full thing since the
-                    # state is impossible to calculate.
-                    if event.key_data.vk == blocked_event.key_data.vk:
-                        return True
-
-                if event == blocked_event:
-                    # todo make it so that a block sent at eg ms 100
-                    #  only can block events after that
-                    cls._blocked_events.remove(blocked_event)
-                    return True
-
-        return False
+        """ checks if the event is blocked, and if so uses up the block """
+        key = cls._block_key(event)
+
+        try:
+            expiry_times = cls._blocked_events[key]
+        except KeyError:
+            return False
+
+        now = time.monotonic()
+        while expiry_times and expiry_times[0] <= now:
+            expiry_times.popleft()
+            cls.blocks_expired += 1
+
+        blocked = bool(expiry_times)
+        if blocked:
+            # todo make it so that a block sent at eg ms 100
+            #  only can block events after that
+            expiry_times.popleft()
+            cls.blocks_matched += 1
+
+        if not expiry_times:
+            del cls._blocked_events[key]
+
+        return blocked
 
     @classmethod
     def dispatch_event(cls, *event: any_event) -> None:
@@ -71,11 +152,20 @@ class EventApi(ABC):
         # if isinstance(event, KeyboardEvent.KeyUp):
         #     cls._key_states[event.key_data] = False
 
+        if cls._blocked_events:
+            event = tuple(
+                e for e in event
+                if not cls._is_event_blocked(e)
+            )
+
+        if LatencyTracer.enabled:
+            LatencyTracer.stamp_queued(event)
+
         cls.event_queue += event
 
     @classmethod
     def clear_blocked_events(cls):
-        cls._blocked_events = set()
+        cls._blocked_events = {}
 
     @classmethod
     def clear_queued_events(cls):
@@ -83,8 +173,68 @@ class EventApi(ABC):
 
     @classmethod
     @abstractmethod
-    def fetch_new_events(cls) -> None:
-        """ called to add waiting events to the queue """
+    def fetch_new_events(cls, timeout: float | None = None) -> None:
+        """
+        called to add waiting events to the queue
+
+        waits at most {timeout} seconds for new events,
+        None waits until there are events
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def get_fds(cls) -> list[int]:
+        """
+        the file descriptors that become readable when new events
+        are waiting, used to let the event loop wake the event
+        distributor up instead of polling for events
+
+        raises NotImplementedError if the backend can't provide them
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def read_events(cls, fd: int) -> None:
+        """
+        adds the events waiting on {fd} (one of get_fds()) to the queue
+
+        must never block
+        """
+        raise NotImplementedError
+
+    # called with the fd when one is added to / removed from get_fds()
+    # while listening (e.g. when a device is plugged in)
+    _fd_added: Callable[[int], None] | None = None
+    _fd_removed: Callable[[int], None] | None = None
+
+    @classmethod
+    def set_fd_watchers(
+            cls,
+            added: Callable[[int], None] | None,
+            removed: Callable[[int], None] | None,
+    ) -> None:
+        """ makes {added} / {removed} get called when get_fds() changes """
+        cls._fd_added = added
+        cls._fd_removed = removed
+
+    @classmethod
+    def use_reader_thread(cls, wakeup: Callable[[], None] | None) -> None:
+        """
+        makes start_listening read (and convert) the events on a
+        background thread, that calls {wakeup} from that thread
+        once per batch of new events
+
+        the batches are moved into the queue by drain_reader_thread()
+
+        None goes back to reading on the calling thread
+
+        raises NotImplementedError if the backend can't do this
+        """
+        raise NotImplementedError
+
+    @classmethod
+    def drain_reader_thread(cls) -> None:
+        """ adds the events read by the reader thread to the queue """
         raise NotImplementedError
 
     @classmethod
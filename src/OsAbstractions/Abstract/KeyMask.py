@@ -0,0 +1,76 @@
+from collections.abc import Set
+from typing import Iterable, Iterator
+
+
+def vks_to_mask(vks: Iterable[int]) -> int:
+    """ a set of vks as an int, where bit n is set if vk n is in it """
+    mask = 0
+    for vk in vks:
+        mask |= 1 << vk
+
+    return mask
+
+
+class KeyMaskView(Set):
+    """
+    a read-only set of vks, backed by a bitmask (see vks_to_mask)
+
+    ints are immutable, so a view is a snapshot that's free to keep.
+    the set operations with other views are done on the masks
+    """
+    __slots__ = ("mask", )
+
+    def __init__(self, mask: int = 0):
+        self.mask = mask
+
+    @classmethod
+    def _from_iterable(cls, vks: Iterable[int]) -> "KeyMaskView":
+        return cls(vks_to_mask(vks))
+
+    def __contains__(self, vk) -> bool:
+        return isinstance(vk, int) and vk >= 0 and self.mask >> vk & 1 == 1
+
+    def __iter__(self) -> Iterator[int]:
+        mask = self.mask
+        while mask:
+            lowest = mask & -mask
+            yield lowest.bit_length() - 1
+            mask ^= lowest
+
+    def __len__(self) -> int:
+        return self.mask.bit_count()
+
+    def __and__(self, other):
+        if isinstance(other, KeyMaskView):
+            return KeyMaskView(self.mask & other.mask)
+
+        return super().__and__(other)
+
+    def __or__(self, other):
+        if isinstance(other, KeyMaskView):
+            return KeyMaskView(self.mask | other.mask)
+
+        return super().__or__(other)
+
+    def __sub__(self, other):
+        if isinstance(other, KeyMaskView):
+            return KeyMaskView(self.mask & ~other.mask)
+
+        return super().__sub__(other)
+
+    def __xor__(self, other):
+        if isinstance(other, KeyMaskView):
+            return KeyMaskView(self.mask ^ other.mask)
+
+        return super().__xor__(other)
+
+    def __eq__(self, other):
+        if isinstance(other, KeyMaskView):
+            return self.mask == other.mask
+
+        return super().__eq__(other)
+
+    __hash__ = Set._hash
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({set(self)})"
@@ -1,8 +1,9 @@
 """ abstract representation for a keyboard """
 from abc import ABC, abstractmethod
-from typing import Self
+from typing import Self, Callable
 
 from src.AbsVkEnum import KeyData
+from src.OsAbstractions.Abstract.KeyMask import vks_to_mask
 
 
 class InvalidKeyException(Exception):
@@ -101,6 +102,11 @@ class AbsKeyboard(ABC):
     def key_pressed(cls, key: int) -> bool:
         raise NotImplementedError
 
+    @classmethod
+    def get_pressed_mask(cls) -> int:
+        """ the pressed keys as a bitmask, see KeyMask.vks_to_mask """
+        return vks_to_mask(cls.get_pressed_keys())
+
     @classmethod
     @abstractmethod
     def queue_press(cls, vk_code: int, down: bool) -> None:
@@ -206,3 +212,17 @@ class AbsKeyboard(ABC):
 
         this works using the KeySend events
         """
+
+    @classmethod
+    def defer_resulting_chars_for_button(
+            cls,
+            key_data: KeyData,
+    ) -> str | Callable[[], str]:
+        """
+        same as calc_resulting_chars_for_button, but may return a
+        function that calculates the chars instead, if that's expensive
+
+        the press buffer has to be updated right away though, so that
+        the result doesn't depend on when the function is called
+        """
+        return cls.calc_resulting_chars_for_button(key_data)
@@ -0,0 +1,102 @@
+import ctypes
+import ctypes.util
+import os
+import struct
+
+# from sys/inotify.h
+IN_ATTRIB = 0x00000004
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+
+# struct inotify_event {
+#     int      wd;
+#     uint32_t mask;
+#     uint32_t cookie;
+#     uint32_t len;
+#     char     name[];  (len bytes, null padded)
+# }
+_INOTIFY_EVENT = struct.Struct("iIII")
+
+_libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+
+
+def _check(result: int) -> int:
+    if result < 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+    return result
+
+
+class InotifyDeviceMonitor:
+    """
+    watches a directory (/dev/input) for input devices being
+    added or removed using inotify
+
+    {fd} becomes readable when something changed, so it can be
+    waited on together with the devices themselves
+    """
+
+    def __init__(self, directory: str = "/dev/input", prefix: str = "event"):
+        self.directory = directory
+        self.prefix = prefix
+
+        self.fd = _check(_libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC))
+
+        try:
+            _check(_libc.inotify_add_watch(
+                self.fd,
+                os.fsencode(directory),
+                # udev usually creates the node before it's allowed to
+                # be opened, so we also need to know when that changes
+                IN_CREATE | IN_ATTRIB | IN_DELETE,
+            ))
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def read_changes(self) -> tuple[set[str], set[str]]:
+        """
+        :return: (the paths of the devices that where added (or changed),
+            the paths of the devices that where removed)
+        """
+        chunks = []
+        while True:
+            try:
+                chunks.append(os.read(self.fd, 4096))
+            except BlockingIOError:
+                break
+
+        return self.parse_changes(b"".join(chunks))
+
+    def parse_changes(self, data: bytes) -> tuple[set[str], set[str]]:
+        """ like read_changes, for {data} that was read from {fd} already """
+        added: set[str] = set()
+        removed: set[str] = set()
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, cookie, length = _INOTIFY_EVENT.unpack_from(
+                data, offset
+            )
+            offset += _INOTIFY_EVENT.size
+
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if not name.startswith(self.prefix):
+                continue
+
+            path = os.path.join(self.directory, name)
+
+            if mask & IN_DELETE:
+                added.discard(path)
+                removed.add(path)
+            else:
+                removed.discard(path)
+                added.add(path)
+
+        return added, removed
+
+    def close(self):
+        os.close(self.fd)
@@ -0,0 +1,196 @@
+import os
+from dataclasses import dataclass
+
+import evdev
+
+from src.OsAbstractions.Linux.VirtualDevices import is_own_virtual_device
+
+_LETTER_KEYS = frozenset(
+    evdev.ecodes.ecodes[f"KEY_{letter}"]
+    for letter in "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+)
+
+# the keys of the power / sleep buttons, webcams and the (acpi) video bus,
+# the devices with only these are left out of the DEFAULT_FILTERS
+_SYSTEM_KEYS = frozenset(
+    evdev.ecodes.ecodes[name]
+    for name in (
+        "KEY_POWER", "KEY_POWER2", "KEY_SLEEP", "KEY_WAKEUP", "KEY_SUSPEND",
+        "KEY_CAMERA",
+        "KEY_BRIGHTNESSDOWN", "KEY_BRIGHTNESSUP", "KEY_BRIGHTNESS_CYCLE",
+        "KEY_BRIGHTNESS_ZERO", "KEY_DISPLAY_OFF", "KEY_SWITCHVIDEOMODE",
+        "KEY_VIDEO_NEXT", "KEY_VIDEO_PREV",
+    )
+)
+
+
+@dataclass(frozen=True)
+class DeviceInfo:
+    """ what we know about an input device, without holding it open """
+    path: str
+    name: str
+    phys: str
+    vendor: int
+    product: int
+
+    # EV_KEY (keyboards, macro pads, media keys, mouse buttons etc.)
+    # other than only system keys
+    keys: bool
+    # EV_KEY with only system keys (power / sleep buttons, webcams,
+    # brightness keys), see _SYSTEM_KEYS
+    system_keys: bool
+    # EV_KEY with (all) the letter keys
+    keyboard: bool
+    # EV_REL (mice, scroll wheels)
+    relative: bool
+    # EV_ABS (touchpads, tablets, touchscreens), not accelerometers
+    absolute: bool
+
+    own: bool
+
+    @classmethod
+    def from_device(cls, device: evdev.InputDevice) -> "DeviceInfo":
+        capabilities = device.capabilities(absinfo=False)
+        key_codes = frozenset(capabilities.get(evdev.ecodes.EV_KEY, ()))
+
+        absolute = (
+            evdev.ecodes.EV_ABS in capabilities
+            and evdev.ecodes.INPUT_PROP_ACCELEROMETER
+            not in device.input_props()
+        )
+
+        return cls(
+            path=device.path,
+            name=device.name,
+            phys=device.phys or "",
+            vendor=device.info.vendor,
+            product=device.info.product,
+            keys=bool(key_codes - _SYSTEM_KEYS),
+            system_keys=bool(key_codes) and key_codes <= _SYSTEM_KEYS,
+            keyboard=_LETTER_KEYS.issubset(key_codes),
+            relative=evdev.ecodes.EV_REL in capabilities,
+            absolute=absolute,
+            own=is_own_virtual_device(device),
+        )
+
+
+@dataclass(frozen=True)
+class DeviceFilter:
+    """
+    selects the devices that have at least one of the wanted
+    capabilities (any if none are wanted) and match all the
+    other given fields
+
+    e.g.
+        DeviceFilter(keys=True)
+        DeviceFilter(keys=True, system_keys=True)
+        DeviceFilter(keyboard=True, name="Logitech")
+        DeviceFilter(vendor=0x046d, product=0xc52b)
+        DeviceFilter(path="/dev/input/event3")
+    """
+    keys: bool = False
+    system_keys: bool = False
+    keyboard: bool = False
+    relative: bool = False
+    absolute: bool = False
+
+    # part of the name, case insensitive
+    name: str | None = None
+    vendor: int | None = None
+    product: int | None = None
+    path: str | None = None
+
+    def matches(self, info: DeviceInfo) -> bool:
+        if self.keys or self.system_keys or self.keyboard \
+                or self.relative or self.absolute:
+            if not (
+                    self.keys and info.keys
+                    or self.system_keys and info.system_keys
+                    or self.keyboard and info.keyboard
+                    or self.relative and info.relative
+                    or self.absolute and info.absolute
+            ):
+                return False
+
+        if self.name is not None \
+                and self.name.lower() not in info.name.lower():
+            return False
+
+        if self.vendor is not None and self.vendor != info.vendor:
+            return False
+
+        if self.product is not None and self.product != info.product:
+            return False
+
+        if self.path is not None and self.path != info.path:
+            return False
+
+        return True
+
+
+# everything with keys / buttons or that moves the pointer, so also
+# macro pads and the separate media key devices of keyboards, but no
+# lid switches, accelerometers, power buttons, webcams or video buses
+DEFAULT_FILTERS = (
+    DeviceFilter(keys=True, relative=True, absolute=True),
+)
+
+
+class DeviceIndex:
+    """
+    caches the DeviceInfo of every device node we've seen
+
+    opening a device to read its capabilities takes a few syscalls,
+    and for the devices we don't want that would be all we use it for.
+    the entries are keyed by path and checked against the nodes
+    ctime, so that a different device reusing the path is re-indexed
+    """
+    _infos: dict[str, tuple[int, DeviceInfo]] = {}
+
+    @classmethod
+    def _stamp(cls, path: str) -> int | None:
+        try:
+            return os.stat(path).st_ctime_ns
+        except OSError:
+            return None
+
+    @classmethod
+    def get_cached(cls, path: str) -> DeviceInfo | None:
+        entry = cls._infos.get(path)
+        if entry is None:
+            return None
+
+        stamp, info = entry
+        if stamp != cls._stamp(path):
+            del cls._infos[path]
+            return None
+
+        return info
+
+    @classmethod
+    def index(cls, device: evdev.InputDevice) -> DeviceInfo:
+        info = DeviceInfo.from_device(device)
+        cls._infos[device.path] = (cls._stamp(device.path), info)
+
+        return info
+
+    @classmethod
+    def get(cls, path: str) -> DeviceInfo | None:
+        """ :return: the info of the device at {path}, None if it can't be opened """
+        info = cls.get_cached(path)
+        if info is not None:
+            return info
+
+        try:
+            device = evdev.InputDevice(path)
+        except OSError:
+            return None
+
+        try:
+            return cls.index(device)
+        finally:
+            device.close()
+
+    @classmethod
+    def forget(cls, path: str) -> None:
+        cls._infos.pop(path, None)
@@ -1,38 +1,59 @@
+import errno
+import os
+import struct
+import time
 from select import select
+from typing import Callable, Iterable, Iterator, Literal, Mapping, Sequence
 
 import evdev
 
 from src.Events import KeyboardEvent, any_event, MouseEvent
+from src.LatencyHistogram import LatencyHistogram
+from src.LatencyTracer import LatencyTracer
 from src.OsAbstractions.Abstract import EventApi
-
+from src.OsAbstractions.Abstract.KeyMask import KeyMaskView, vks_to_mask
+from src.OsAbstractions.Linux.DeviceMonitor import InotifyDeviceMonitor
+from src.OsAbstractions.Linux.DeviceSelection import \
+    DEFAULT_FILTERS, DeviceFilter, DeviceIndex, DeviceInfo
+from src.OsAbstractions.Linux.InputFilter import \
+    CONSUME, input_filter_type
 from src.OsAbstractions.Linux.Keyboard import LinuxKeyboard
+from src.OsAbstractions.Linux.KeyRemapper import KeyRemapper, RemapTable
 from src.OsAbstractions.Linux.LinuxVk import LinuxKeyData, LinuxKeyEnum, LinuxLayout
 from src.OsAbstractions.Linux.LinuxVk.LinuxKeyEnum import LINUX_VK_MODIFIER_MAP
-from src.OsAbstractions.Linux.Mouse import LinuxMouse
+from src.OsAbstractions.Linux.Mouse.PointerTracker import PointerTracker
+from src.OsAbstractions.Linux.ReaderThread import EventReaderThread
+from src.OsAbstractions.Linux.VirtualDevices import \
+    is_own_virtual_device, is_passthrough_device, make_passthrough_device
+
+# struct input_event {
+#     struct timeval time;  (long sec, long usec)
+#     __u16 type;
+#     __u16 code;
+#     __s32 value;
+# }
+# https://www.kernel.org/doc/Documentation/input/input.txt
+INPUT_EVENT = struct.Struct("llHHi")
+
+raw_event_type = tuple[int, int, int, int, int]
 
-DEVICE_PATHS = []
-SUPPRESS = False
+# the vks of the modifiers
+_MODIFIER_MASK = vks_to_mask(LINUX_VK_MODIFIER_MAP)
 
+# {pressed modifier vks (as a mask): the modifiers they make up}
+_modifier_cache: dict[int, frozenset[LinuxKeyData]] = {}
 
-# todo make into args
-#   somehow make into args for the platform
-#   instead of consts
-#   probably by adding functions
-#     eg:
-#     def supress(),
-#     def un_supress()
-#     def set_device_paths()
 
 class LinuxInputEvent:
-    def __init__(self, event: evdev.InputEvent):
-        #: Time in seconds since epoch at which event occurred.
-        self.time_ms = event.timestamp() * 1000
+    def __init__(self, sec: int, usec: int, type_: int, code: int, value: int):
+        #: Time in milliseconds since epoch at which event occurred.
+        self.time_ms = sec * 1000 + usec / 1000
 
-        self.type = event.type
+        self.type = type_
 
-        self.code = event.code
+        self.code = code
 
-        self.value = event.value
+        self.value = value
 
     def __str__(self):
         return \
@@ -45,46 +66,548 @@ class LinuxInputEvent:
     __repr__ = __str__
 
 
+class _FrameState:
+    """ the decoded part of the unfinished frame of a device """
+    __slots__ = ("events", "delta", "move_event")
+
+    def __init__(self):
+        self.events: list[any_event] = []
+
+        # the relative movement so far, the axes are sent as separate
+        # events, so they're summed up until the frame ends (SYN_REPORT)
+        # then sent as one Move
+        self.delta: list[int] = [0, 0]
+
+        # the last move event of the frame, the raw (sec, usec, ...) tuple
+        # if it came from the bulk reader, it's only made into a
+        # LinuxInputEvent once the Move is made
+        self.move_event: LinuxInputEvent | raw_event_type | None = None
+
+
 class LinuxEventApi(EventApi):
     _devices: dict[str, evdev.InputDevice] = {}
     # _pressed_keys: set[LinuxKeyData] = set()
 
+    # the devices to listen to, see select_devices()
+    device_filters: tuple[DeviceFilter, ...] = DEFAULT_FILTERS
+
+    # grab the devices, so that their events only go to us
+    _suppress = False
+
+    _listening = False
+
+    @classmethod
+    def _is_selected(cls, info: DeviceInfo) -> bool:
+        # our own devices are handled by synthetic_events instead
+        return info.own or any(
+            device_filter.matches(info)
+            for device_filter in cls.device_filters
+        )
+
+    @classmethod
+    def _open_device(cls, path: str) -> evdev.InputDevice | None:
+        """ :return: the device at {path} if it's selected """
+        info = DeviceIndex.get_cached(path)
+        if info is not None and not cls._is_selected(info):
+            # no need to even open it
+            return None
+
+        device = evdev.InputDevice(path)
+
+        if cls._is_selected(DeviceIndex.index(device)):
+            return device
+
+        device.close()
+        return None
+
     @classmethod
     def _get_devices(cls, paths):
-        """Attempts to load a readable keyboard device.
+        """
+        opens the selected devices
 
         :param paths: A list of paths.
 
-        :return: a compatible device
+        :return: {fd: device}
         """
-        # originally this had some try/catching for os errors
-        # and just ignored them
-        # if problems occur we might have to re add it
-        devices = map(evdev.InputDevice, paths)
-        devices = {dev.fd: dev for dev in devices}
+        devices = {}
 
-        if not devices:
-            raise OSError('no devices found')
+        for path in paths:
+            try:
+                device = cls._open_device(path)
+            except OSError:
+                # e.g. removed since it was listed
+                continue
+
+            if device is not None:
+                devices[device.fd] = device
 
         return devices
 
     @classmethod
-    def start_listening(cls) -> None:
-        cls._devices = cls._get_devices(
-            DEVICE_PATHS or evdev.list_devices()
+    def list_devices(cls) -> list[DeviceInfo]:
+        """ :return: all the devices we can open, selected or not """
+        infos = map(DeviceIndex.get, evdev.list_devices())
+        return [info for info in infos if info is not None]
+
+    @classmethod
+    def get_selected_devices(cls) -> list[DeviceInfo]:
+        return [
+            info
+            for info in cls.list_devices()
+            if not info.own and cls._is_selected(info)
+        ]
+
+    @classmethod
+    def select_devices(cls, *filters: DeviceFilter) -> list[DeviceInfo]:
+        """
+        makes us only listen to the devices that match any of {filters}
+
+        without filters it goes back to DEFAULT_FILTERS, i.e. all
+        keyboards, mice, touchpads etc.
+
+        can be called while listening
+
+        :return: the selected devices
+        """
+        cls.device_filters = filters or DEFAULT_FILTERS
+
+        if cls._listening:
+            cls._update_devices()
+
+        return cls.get_selected_devices()
+
+    @classmethod
+    def set_device_paths(cls, *paths: str) -> list[DeviceInfo]:
+        """ only listens to the devices at {paths} """
+        return cls.select_devices(
+            *(DeviceFilter(path=path) for path in paths)
+        )
+
+    @classmethod
+    def _update_devices(cls) -> None:
+        """ opens / closes devices to match the device_filters """
+        out = []
+
+        for fd, device in tuple(cls._devices.items()):
+            info = DeviceIndex.get_cached(device.path)
+            if info is None or not cls._is_selected(info):
+                out += cls._remove_device(fd)
+
+        open_paths = {device.path for device in cls._devices.values()}
+
+        new_paths = [
+            path
+            for path in evdev.list_devices()
+            if path not in open_paths
+        ]
+
+        for device in cls._get_devices(new_paths).values():
+            cls._add_device(device)
+
+        cls.dispatch_event(*out)
+
+    # see InputFilter.py
+    _input_filters: list[input_filter_type] = []
+
+    # the devices we've grabbed, and the uinput copies of them
+    # the events that pass the input filters are reinjected into
+    _grabbed: set[int] = set()
+    _passthroughs: dict[int, evdev.UInput] = {}
+
+    # from the kernel timestamp of the (first) event of a read,
+    # to when it's been reinjected, i.e. the latency we add
+    reinject_latency = LatencyHistogram()
+    events_consumed = 0
+
+    @classmethod
+    def suppress(cls) -> None:
+        """ grabs the devices, so that their events only go to us """
+        cls._suppress = True
+        cls._update_grabs()
+
+    @classmethod
+    def un_suppress(cls) -> None:
+        cls._suppress = False
+        cls._update_grabs()
+
+    @classmethod
+    def add_input_filter(cls, input_filter: input_filter_type) -> None:
+        """
+        grabs the devices and reinjects their events, after passing
+        them through {input_filter}, which can forward, change or
+        consume them. see InputFilter.py
+
+        the filters don't affect the events we get, only the
+        ones the rest of the system gets
+
+        (does nothing while suppressing, since then nothing is forwarded)
+        """
+        cls._input_filters = [*cls._input_filters, input_filter]
+        cls._update_grabs()
+
+    @classmethod
+    def remove_input_filter(cls, input_filter: input_filter_type) -> None:
+        cls._input_filters = [
+            other
+            for other in cls._input_filters
+            if other != input_filter
+        ]
+        cls._update_grabs()
+
+    @classmethod
+    def set_key_remap(
+            cls,
+            remap: RemapTable | Mapping[int, int | Sequence[int]] | None
+    ) -> None:
+        """
+        remaps the keys of the grabbed devices for the rest of the
+        system (we still get the original ones), see RemapTable
+
+        can be changed at any time, without reopening anything,
+        None removes the remapping
+        """
+        if remap is not None and not isinstance(remap, RemapTable):
+            remap = RemapTable(remap)
+
+        KeyRemapper.set_table(remap)
+
+        remapping = KeyRemapper.input_filter in cls._input_filters
+        if remap is not None and not remapping:
+            # remap before the other filters see the events
+            cls._input_filters = [
+                KeyRemapper.input_filter,
+                *cls._input_filters
+            ]
+            cls._update_grabs()
+
+        elif remap is None and remapping:
+            cls.remove_input_filter(KeyRemapper.input_filter)
+
+    @classmethod
+    def _update_grabs(cls) -> None:
+        for fd, device in cls._devices.items():
+            # grabbing our own devices would keep what
+            # we type from reaching anyone else
+            if fd not in cls._own_fds:
+                cls._update_grab(fd, device)
+
+    @classmethod
+    def _update_grab(cls, fd: int, device: evdev.InputDevice) -> None:
+        grab = cls._suppress or bool(cls._input_filters)
+        reinject = grab and not cls._suppress
+
+        # make the passthrough before grabbing, so nothing gets lost
+        if reinject and fd not in cls._passthroughs:
+            cls._passthroughs[fd] = make_passthrough_device(device)
+
+        elif not reinject and fd in cls._passthroughs:
+            cls._passthroughs.pop(fd).close()
+
+        if grab and fd not in cls._grabbed:
+            device.grab()  # mine!
+            cls._grabbed.add(fd)
+
+        elif not grab and fd in cls._grabbed:
+            device.ungrab()
+            cls._grabbed.discard(fd)
+
+    @classmethod
+    def _reinject(
+            cls,
+            passthrough: evdev.UInput,
+            raw_events: Iterable[raw_event_type],
+    ) -> list[raw_event_type]:
+        """
+        forwards the {raw_events} that pass the input filters
+
+        :return: all the {raw_events}, for decoding
+        """
+        raw_events = list(raw_events)
+        if not raw_events:
+            return raw_events
+
+        pack = INPUT_EVENT.pack
+        input_filters = cls._input_filters
+        syn_dropped = evdev.ecodes.SYN_DROPPED
+
+        chunks = []
+        for sec, usec, type_, code, value in raw_events:
+            # the kernel makes its own when it's needed
+            if type_ == evdev.ecodes.EV_SYN and code == syn_dropped:
+                continue
+
+            event = (type_, code, value)
+            for input_filter in input_filters:
+                result = input_filter(*event)
+
+                if result is None:
+                    continue
+
+                if result is CONSUME:
+                    event = None
+                    cls.events_consumed += 1
+                    break
+
+                event = result
+
+                if event.__class__ is list:
+                    break
+
+            if event is None:
+                continue
+
+            # uinput ignores the timestamp
+            if event.__class__ is list:
+                chunks += [pack(sec, usec, *part) for part in event]
+            else:
+                chunks.append(pack(sec, usec, *event))
+
+        # one write for the whole read, uinput takes many events at once
+        if chunks:
+            os.write(passthrough.fd, b"".join(chunks))
+
+        sec, usec = raw_events[0][:2]
+        cls.reinject_latency.record(
+            time.time() * 10 ** 6 - (sec * 10 ** 6 + usec)
         )
-        # todo add support to supress individual devices
-        if SUPPRESS:
-            for device in cls._devices.values():
-                device.grab()  # mine!
+
+        return raw_events
+
+    # what to do with the events of our own virtual devices
+    # (e.g. the one the LinuxKeyboard types with)
+    #   "skip": don't listen to those devices at all
+    #   "tag": listen to them, but mark their events as synthetic
+    #       (the hotkeys and text replacements ignore those)
+    synthetic_events: Literal["skip", "tag"] = "skip"
+
+    identifies_own_events = True
+
+    # the fds of our own virtual devices (when tagging)
+    _own_fds: set[int] = set()
+
+    # watch /dev/input for devices that are plugged in / removed
+    # while listening
+    hotplug = True
+    _monitor: InotifyDeviceMonitor | None = None
+
+    @classmethod
+    def _add_device(cls, device: evdev.InputDevice) -> bool:
+        """
+        starts listening to {device}
+
+        :return: if it was added, it's closed otherwise
+        """
+        if is_passthrough_device(device):
+            # we already get these events from the grabbed device
+            device.close()
+            return False
+
+        if is_own_virtual_device(device):
+            if cls.synthetic_events == "skip":
+                device.close()
+                return False
+
+            cls._own_fds.add(device.fd)
+
+        else:
+            cls._update_grab(device.fd, device)
+
+        cls._devices[device.fd] = device
+
+        if cls._fd_added is not None:
+            cls._fd_added(device.fd)
+
+        if cls._reader_thread is not None:
+            cls._reader_thread.fds_changed()
+
+        return True
+
+    @classmethod
+    def _remove_device(cls, fd: int) -> list[any_event]:
+        """
+        stops listening to the device with {fd}
+
+        :return: KeyUp events for the keys that are no longer pressed
+            now that the device is gone
+        """
+        device = cls._devices.pop(fd, None)
+        if device is None:
+            return []
+
+        if cls._fd_removed is not None:
+            cls._fd_removed(fd)
+
+        cls._own_fds.discard(fd)
+        cls._dropping.discard(fd)
+        cls._frames.pop(fd, None)
+        cls._gone.discard(fd)
+        cls._grabbed.discard(fd)
+
+        if fd in cls._passthroughs:
+            cls._passthroughs.pop(fd).close()
+
+        try:
+            device.close()
+        except OSError:
+            # it's probably already gone
+            pass
+
+        if cls._reader_thread is not None:
+            cls._reader_thread.forget(fd)
+
+        # the keys that where held on it would be stuck otherwise
+        return cls._resync_key_state()
+
+    @classmethod
+    def _handle_device_changes(
+            cls,
+            changes: tuple[set[str], set[str]] | None = None
+    ) -> list[any_event]:
+        """ {changes} are read from the monitor if not given """
+        added, removed = changes or cls._monitor.read_changes()
+
+        out = []
+
+        open_paths = {
+            device.path: fd
+            for fd, device in cls._devices.items()
+        }
+
+        for path in removed:
+            DeviceIndex.forget(path)
+
+            if path in open_paths:
+                out += cls._remove_device(open_paths[path])
+
+        for path in added:
+            if path in open_paths:
+                continue
+
+            try:
+                device = cls._open_device(path)
+            except OSError:
+                # udev probably hasn't given us access yet
+                # we get another event (IN_ATTRIB) when it has
+                continue
+
+            if device is not None:
+                cls._add_device(device)
+
+        return out + cls._remove_gone_devices()
+
+    @classmethod
+    def start_listening(cls) -> None:
+        cls._devices = {}
+        cls._own_fds = set()
+
+        devices = cls._get_devices(evdev.list_devices())
+        if not devices:
+            raise OSError('no devices found')
+
+        for device in devices.values():
+            cls._add_device(device)
+
+        cls._listening = True
+
+        # we won't read our own presses back, so they have
+        # to be added to the pressed keys when they're made
+        LinuxKeyboard.track_own_presses = cls.synthetic_events == "skip"
+
+        if cls.hotplug:
+            try:
+                cls._monitor = InotifyDeviceMonitor()
+            except OSError as e:
+                # not the end of the world, we just won't see new devices
+                print(f"not watching for new devices: {e}")
+
+        if cls._reader_thread_wakeup is not None:
+            cls._reader_thread = EventReaderThread(
+                get_fds=cls.get_fds,
+                wakeup=cls._reader_thread_wakeup,
+                capacity=cls.reader_thread_capacity * INPUT_EVENT.size,
+                read_size=cls.reader_thread_read_size * INPUT_EVENT.size,
+            )
+            cls._reader_thread.start()
 
     @classmethod
     def stop_listening(cls) -> None:
+        # stop the thread before closing the devices it reads from
+        if cls._reader_thread is not None:
+            cls._reader_thread.stop()
+            cls._reader_thread = None
+
+        if cls._monitor is not None:
+            cls._monitor.close()
+            cls._monitor = None
+
+        for passthrough in cls._passthroughs.values():
+            passthrough.close()
+
         for device in cls._devices.values():
             device.close()
 
+        cls._passthroughs = {}
+        cls._grabbed = set()
+        KeyRemapper.reset()
+
+        cls._devices = {}
+        cls._frames = {}
+        cls._gone = set()
+        cls._listening = False
+
+    # the amount of events the reader thread buffers before it
+    # waits for them to be handled (they're never dropped)
+    reader_thread_capacity = 4096
+
+    # the amount of events the reader thread reads at once
+    reader_thread_read_size = 512
+
+    _reader_thread_wakeup: Callable[[], None] | None = None
+    _reader_thread: EventReaderThread | None = None
+
     @classmethod
-    def _get_active_modifiers(cls) -> set[LinuxKeyData]:
+    def use_reader_thread(cls, wakeup: Callable[[], None] | None) -> None:
+        if cls._reader_thread is not None:
+            raise TypeError(
+                "cant change the reader thread while listening"
+            )
+
+        cls._reader_thread_wakeup = wakeup
+
+    @classmethod
+    def drain_reader_thread(cls) -> None:
+        if cls._reader_thread is None:
+            return
+
+        out = []
+        for fd, data, read_us in cls._reader_thread.drain():
+            if cls._monitor is not None and fd == cls._monitor.fd:
+                if not isinstance(data, OSError):
+                    out += cls._handle_device_changes(
+                        cls._monitor.parse_changes(data)
+                    )
+                continue
+
+            if fd not in cls._devices:
+                # removed since it was read
+                continue
+
+            out += cls._decode_events(
+                fd, cls._iter_chunk(data), read_us=read_us
+            )
+
+        cls.dispatch_event(*out)
+
+    @staticmethod
+    def _iter_chunk(data: bytes | OSError) -> Iterator[Iterable[raw_event_type]]:
+        """ the reads of a chunk from the reader thread, see _iter_reads """
+        if isinstance(data, OSError):
+            raise data
+
+        yield INPUT_EVENT.iter_unpack(data)
+
+    @classmethod
+    def _get_active_modifiers(cls) -> frozenset[LinuxKeyData]:
         """
         returns a set of modifier keys that would equate to
         the current modifier state
@@ -94,16 +617,19 @@ class LinuxEventApi(EventApi):
         """
         # todo probably move this to the "LinuxLayout" or "LinuxStateMgr"
 
-        modifier_keys: set[LinuxKeyData | None] = {None}
-        for key in LinuxKeyboard.get_pressed_keys():
-            modifier_keys.add(
-                LINUX_VK_MODIFIER_MAP.get(
-                    key, None
-                )
-            )
+        pressed_modifiers = LinuxKeyboard.get_pressed_mask() & _MODIFIER_MASK
+
+        try:
+            return _modifier_cache[pressed_modifiers]
+        except KeyError:
+            pass
 
-        modifier_keys.remove(None)
+        modifier_keys = frozenset(
+            LINUX_VK_MODIFIER_MAP[vk]
+            for vk in KeyMaskView(pressed_modifiers)
+        )
 
+        _modifier_cache[pressed_modifiers] = modifier_keys
         return modifier_keys
 
     @classmethod
@@ -169,7 +695,7 @@ class LinuxEventApi(EventApi):
             "raw": event,
             "time_ms": event.time_ms,
             "key_data": key,
-
+            "pressed_mask": LinuxKeyboard.get_pressed_mask(),
         }
 
         out = []
@@ -185,38 +711,81 @@ class LinuxEventApi(EventApi):
             )
 
         if dc in (KeyboardEvent.KeyDown, KeyboardEvent.KeySend):
-            out.append(
-                KeyboardEvent.KeySend(**{
-                    **args,
-                    "chars": LinuxKeyboard.calc_resulting_chars_for_button(key)
-                }),
-            )
+            # has to be done even if no one wants the KeySend
+            # to keep the dead key state right
+            chars = LinuxKeyboard.defer_resulting_chars_for_button(key)
+
+            if cls.is_wanted(KeyboardEvent.KeySend):
+                out.append(
+                    KeyboardEvent.KeySend(**{
+                        **args,
+                        "chars": chars,
+                    }),
+                )
 
         return tuple(out)
 
-    @classmethod
-    def _convert_mouse_move_event(cls, event: LinuxInputEvent) \
-            -> tuple[MouseEvent.event_types, ...]:
-        dx, dy = 0, 0
-
+    # {fd: its unfinished frame}
+    # evdev only hands complete frames to readers, but the reader thread
+    # can hand over a frame in several chunks, so a frame can continue
+    # in a later call. it's kept per device, so that the SYN_REPORT of
+    # another device doesn't end it
+    _frames: dict[int, _FrameState] = {}
+
+    @staticmethod
+    def _add_mouse_move(
+            frame: _FrameState,
+            code: int,
+            value: int,
+            event: LinuxInputEvent | raw_event_type
+    ):
         # dx move
-        if event.code == 0:
+        if code == 0:
             # val = pixels moved
             # val < 0: move left
             # val > 0: move right
-            dx = event.value
+            frame.delta[0] += value
 
         # dy move
-        if event.code == 1:
+        if code == 1:
             # val = pixels moved
             # val < 0: move up
             # val > 0: move down
-            dy = event.value
+            frame.delta[1] += value
+
+        frame.move_event = event
+
+    @classmethod
+    def _convert_mouse_move_event(
+            cls,
+            event: LinuxInputEvent,
+            frame: _FrameState,
+    ) -> tuple[MouseEvent.event_types, ...]:
+        cls._add_mouse_move(frame, event.code, event.value, event)
+
+        return ()
+
+    @staticmethod
+    def _flush_mouse_move(
+            frame: _FrameState
+    ) -> tuple[MouseEvent.event_types, ...]:
+        """ the Move for the relative movement of {frame} (if any) """
+        event = frame.move_event
+        if event is None:
+            return ()
+
+        if isinstance(event, tuple):
+            event = LinuxInputEvent(*event)
+
+        dx, dy = frame.delta
+
+        frame.move_event = None
+        frame.delta = [0, 0]
 
         return (MouseEvent.Move(
             time_ms=event.time_ms,
             raw=event,
-            pos=LinuxMouse.get_pos(),
+            pos=PointerTracker.move(dx, dy),
             delta=(dx, dy)
         ), )
 
@@ -239,26 +808,31 @@ class LinuxEventApi(EventApi):
             return (MouseEvent.Scroll(
                 time_ms=event.time_ms,
                 raw=event,
-                pos=LinuxMouse.get_pos(),
+                pos=PointerTracker.get_pos(),
                 dy=-event.value,
                 dx=0  # no current support for sideways scroll
             ), )
 
     @classmethod
-    def _convert_raw_event_to_event(cls, event: evdev.InputEvent) \
-            -> tuple[any_event, ...]:
-        event = LinuxInputEvent(event)
-
+    def _convert_raw_event_to_event(
+            cls,
+            event: LinuxInputEvent,
+            frame: _FrameState,
+    ) -> tuple[any_event, ...]:
+        """ {frame} is the unfinished frame of the device of {event} """
         # sync event
         if event.type == 0:
-            # no real purpose (probably)
+            # end of a frame
+            if event.code == 0:
+                return cls._flush_mouse_move(frame)
+
             return ()
 
         # rel event
         # mouse move, scroll
         if event.type == 2:
             if event.code in (0, 1):
-                return cls._convert_mouse_move_event(event)
+                return cls._convert_mouse_move_event(event, frame)
 
             if event.code in (8, 11):
                 return cls._convert_scroll_event(event)
@@ -339,14 +913,273 @@ class LinuxEventApi(EventApi):
         return ()
 
     @classmethod
-    def fetch_new_events(cls) -> None:
+    def get_fds(cls) -> list[int]:
+        fds = list(cls._devices)
+
+        if cls._monitor is not None:
+            fds.append(cls._monitor.fd)
+
+        return fds
+
+    # the fds of the devices that overran their kernel buffer (SYN_DROPPED)
+    # all their events up to the next SYN_REPORT are invalid
+    _dropping: set[int] = set()
+
+    @classmethod
+    def _undo_key_side_effects(cls, frame: list[any_event]):
+        """ reverts the pressed keys changes of a discarded frame """
+        for event in reversed(frame):
+            if isinstance(event, KeyboardEvent.KeyDown):
+                LinuxKeyboard.remove_pressed_keys(event.key_data.vk)
+
+            elif isinstance(event, KeyboardEvent.KeyUp):
+                LinuxKeyboard.add_pressed_keys(event.key_data.vk)
+
+    # the fds of the devices that turned out to be gone when resyncing,
+    # they're removed once the current read is done
+    _gone: set[int] = set()
+
+    @classmethod
+    def _remove_gone_devices(cls) -> list[any_event]:
+        out = []
+        while cls._gone:
+            # removing one resyncs, which can find more
+            out += cls._remove_device(cls._gone.pop())
+
+        return out
+
+    @classmethod
+    def _resync_key_state(cls) -> list[any_event]:
+        """
+        queries the actually pressed keys from the devices (EVIOCGKEY)
+        instead of guessing them from the events, after some got dropped
+
+        :return: KeyUp events for the keys that where released while
+            the events where dropped
+        """
+        actual = 0
+        for fd, device in cls._devices.items():
+            if fd in cls._gone:
+                continue
+
+            try:
+                actual |= vks_to_mask(device.active_keys())
+            except OSError:
+                # e.g. unplugged together with the device that's being
+                # removed (ENODEV), its keys count as released
+                cls._gone.add(fd)
+
+        if LinuxKeyboard.track_own_presses:
+            # we don't listen to the device they're pressed on
+            actual |= vks_to_mask(LinuxKeyboard.get_own_pressed_keys())
+
+        released = KeyMaskView(LinuxKeyboard.get_pressed_mask() & ~actual)
+        LinuxKeyboard.add_pressed_keys(*KeyMaskView(actual))
+
+        # the dead key (if any) might have been combined
+        # with a dropped key
+        LinuxKeyboard.clear_key_press_buffer()
+
+        out = []
+        now = time.time()
+        for vk in released:
+            out += cls._convert_raw_keyboard_event(LinuxInputEvent(
+                int(now), int(now % 1 * 10 ** 6),
+                evdev.ecodes.EV_KEY, vk, 0
+            ))
+
+        return out
+
+    # read the input_event structs straight from the fd into a
+    # preallocated buffer, and unpack them from there. Instead of going
+    # through an evdev.InputEvent per event
+    bulk_read = True
+
+    _read_buffer = bytearray(INPUT_EVENT.size * 256)
+
+    # how many reads (of up to 256 events) _read_events does per call
+    max_reads_per_wakeup = 4
+    _read_view = memoryview(_read_buffer)
+
+    @classmethod
+    def _read_raw_events(cls, fd: int) -> Iterable[raw_event_type]:
+        """
+        one read of the (sec, usec, type, code, value) events on {fd}
+
+        the devices are opened as non-blocking
+        so this raises BlockingIOError instead of waiting
+        if there's nothing to read
+        """
+        if cls.bulk_read:
+            size = os.readv(fd, (cls._read_buffer, ))
+            return INPUT_EVENT.iter_unpack(cls._read_view[:size])
+
+        return (
+            (event.sec, event.usec, event.type, event.code, event.value)
+            for event in cls._devices[fd].read()
+        )
+
+    @classmethod
+    def _iter_reads(cls, fd: int) -> Iterator[Iterable[raw_event_type]]:
+        """ the reads of {fd}, until there's nothing left """
+        while True:
+            try:
+                yield cls._read_raw_events(fd)
+            except BlockingIOError:
+                return
+
+    @classmethod
+    def _read_events(cls, fd: int) -> list[any_event]:
+        """ reads and converts the events waiting on {fd} """
+        if cls._monitor is not None and fd == cls._monitor.fd:
+            return cls._handle_device_changes()
+
+        if fd not in cls._devices:
+            # removed since the fd was selected
+            return []
+
+        return cls._decode_events(
+            fd, cls._iter_reads(fd), cls.max_reads_per_wakeup
+        )
+
+    @classmethod
+    def _decode_events(
+            cls,
+            fd: int,
+            reads: Iterator[Iterable[raw_event_type]],
+            max_reads: int | None = None,
+            read_us: float | None = None,
+    ) -> list[any_event]:
+        """
+        converts the raw events of {fd}, {reads} raises the OSError
+        if reading failed (e.g. ENODEV when the device is unplugged)
+
+        {read_us} is when they where read, for the LatencyTracer,
+        if they weren't read just now (i.e. by the reader thread)
+
+        the events are decoded a frame (up to a SYN_REPORT) at a time,
+        and only returned once the whole frame is decoded. the
+        unfinished frame is kept (see _frames) until a later call
+
+        stops after {max_reads} reads, at the end of a frame, even
+        if there's more to read
+        """
+        ev_syn = evdev.ecodes.EV_SYN
+        syn_report = evdev.ecodes.SYN_REPORT
+        syn_dropped = evdev.ecodes.SYN_DROPPED
+        ev_msc = evdev.ecodes.EV_MSC
+        ev_rel = evdev.ecodes.EV_REL
+
+        passthrough = cls._passthroughs.get(fd)
+
+        state = cls._frames.get(fd)
+        if state is None:
+            state = cls._frames[fd] = _FrameState()
+
+        out = []
+        frame = state.events
+        read_count = 0
+
+        try:
+            # read until the device is empty, so that we get the whole
+            # frame even if it's bigger than one read.
+            for raw_events in reads:
+                if LatencyTracer.enabled and read_us is None:
+                    read_us = LatencyTracer.now_us()
+
+                if passthrough is not None:
+                    # forward them before spending any time on decoding
+                    raw_events = cls._reinject(passthrough, raw_events)
+
+                for raw in raw_events:
+                    sec, usec, type_, code, value = raw
+
+                    if type_ == ev_syn:
+                        if code == syn_dropped:
+                            # the kernel buffer overran, so the
+                            # current frame is incomplete
+                            cls._undo_key_side_effects(frame)
+                            frame = []
+                            state.move_event = None
+                            state.delta = [0, 0]
+
+                            cls._dropping.add(fd)
+                            continue
+
+                        if code == syn_report and fd in cls._dropping:
+                            cls._dropping.remove(fd)
+                            out += cls._resync_key_state()
+                            continue
+
+                    if fd in cls._dropping:
+                        continue
+
+                    # the most common events by far are handled here,
+                    # so that we don't have to allocate anything for them
+                    # see _convert_raw_event_to_event for the general case
+                    if type_ == ev_syn and code == syn_report:
+                        frame += cls._flush_mouse_move(state)
+
+                        out += frame
+                        frame = []
+                        continue
+
+                    if type_ == ev_rel and code <= 1:
+                        cls._add_mouse_move(state, code, value, raw)
+                        continue
+
+                    # the scan codes
+                    if type_ == ev_msc and code == 4:
+                        continue
+
+                    frame += cls._convert_raw_event_to_event(
+                        LinuxInputEvent(*raw), state
+                    )
+
+                read_count += 1
+                if max_reads is not None \
+                        and read_count >= max_reads \
+                        and not frame \
+                        and state.move_event is None:
+                    # between frames, so nothing is left half decoded.
+                    # leave the rest for the next wake up, so that a
+                    # busy device can't keep the loop to itself
+                    break
+
+        except OSError as e:
+            if e.errno != errno.ENODEV:
+                raise
+
+            # the device was unplugged, the rest of the frame
+            # is never coming, so drop it like on SYN_DROPPED
+            cls._undo_key_side_effects(frame)
+            frame = []
+
+            out += cls._remove_device(fd)
+
+        else:
+            # the rest of the frame comes with a later read (e.g. the
+            # reader thread cut it in the middle), keep it for then
+            state.events = frame
+
+        if fd in cls._own_fds:
+            for event in out:
+                # the events are brand new, no one else has seen them yet
+                object.__setattr__(event, "synthetic", True)
+
+        if read_us is not None:
+            LatencyTracer.stamp_decoded(out, read_us)
+
+        return out + cls._remove_gone_devices()
+
+    @classmethod
+    def read_events(cls, fd: int) -> None:
+        cls.dispatch_event(*cls._read_events(fd))
+
+    @classmethod
+    def fetch_new_events(cls, timeout: float | None = None) -> None:
         """ called to add waiting events to the queue """
-        r, w, x = select(cls._devices, [], [])
+        r, w, x = select(cls.get_fds(), [], [], timeout)
 
         for file_device in r:
-            for raw_event in cls._devices[file_device].read():
-                events = cls._convert_raw_event_to_event(raw_event)
-
-                # print(raw_event)
-                # print(event)
-                cls.dispatch_event(*events)
+            cls.read_events(file_device)
@@ -0,0 +1,39 @@
+from typing import Callable
+
+import evdev
+
+# returned by an input filter to swallow the event
+CONSUME = False
+
+# called with the (type, code, value) of every raw event of the grabbed
+# devices, before it's reinjected (forwarded) to the rest of the system
+#   None: forward it unchanged
+#   CONSUME: don't forward it
+#   (type, code, value): forward that instead
+#   [(type, code, value), ...]: forward those instead
+#       (the later filters don't see these)
+# they run in the read loop, so they should be fast
+input_filter_type = Callable[
+    [int, int, int],
+    None | bool | tuple[int, int, int] | list[tuple[int, int, int]]
+]
+
+
+def consume_keys(*codes: int) -> input_filter_type:
+    """
+    :return: an input filter that swallows the presses,
+        repeats and releases of the keys with {codes}
+
+    e.g. to keep the macro keys to ourselves:
+        LinuxEventApi.add_input_filter(consume_keys(183, 184, 185, 186))
+    """
+    codes = frozenset(codes)
+    ev_key = evdev.ecodes.EV_KEY
+
+    def input_filter(type_: int, code: int, value: int):
+        if type_ == ev_key and code in codes:
+            return CONSUME
+
+        return None
+
+    return input_filter
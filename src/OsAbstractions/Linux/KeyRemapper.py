@@ -0,0 +1,110 @@
+from typing import Mapping, Sequence
+
+import evdev
+
+from src.OsAbstractions.Linux.InputFilter import CONSUME
+
+_EV_KEY = evdev.ecodes.EV_KEY
+_SYN_REPORT = (evdev.ecodes.EV_SYN, evdev.ecodes.SYN_REPORT, 0)
+
+
+class RemapTable:
+    """
+    a precompiled vk -> vk / vk -> sequence mapping
+
+    {mapping} maps the (linux) vk of a key to either
+        another vk: the key acts like that one instead
+        a sequence of vks: they're tapped, in order, when
+            the key is pressed (the repeats and release are consumed)
+
+    e.g. RemapTable({58: 1, 183: [35, 18, 38, 38, 24]})
+    caps lock -> escape, macro key 1 -> types "hello"
+
+    the targets have to be keys the (passthrough of the) device has,
+    the kernel drops the rest
+
+    the table is a list indexed by vk, where each entry is indexed
+    by the event value (0: release, 1: press, 2: repeat) and holds
+    what the input filter should return for it, so that a lookup
+    doesn't do any work
+    """
+
+    def __init__(self, mapping: Mapping[int, int | Sequence[int]]):
+        self.mapping = dict(mapping)
+
+        self._table: list[tuple | None] = [None] * evdev.ecodes.KEY_CNT
+
+        for vk, target in self.mapping.items():
+            if isinstance(target, int):
+                target = (target, )
+
+            target = tuple(target)
+
+            if len(target) == 1:
+                self._table[vk] = (
+                    (_EV_KEY, target[0], 0),
+                    (_EV_KEY, target[0], 1),
+                    (_EV_KEY, target[0], 2),
+                )
+                continue
+
+            taps = []
+            for target_vk in target:
+                taps += [
+                    (_EV_KEY, target_vk, 1),
+                    _SYN_REPORT,
+                    (_EV_KEY, target_vk, 0),
+                    _SYN_REPORT,
+                ]
+
+            self._table[vk] = (CONSUME, taps, CONSUME)
+
+
+class KeyRemapper:
+    """
+    an input filter (see InputFilter.py) that applies a RemapTable
+
+    the table can be swapped at any time, a key that's held while it's
+    swapped keeps the mapping it had when it was pressed, so that it
+    doesn't get stuck
+    """
+    _table: list[tuple | None] = [None] * evdev.ecodes.KEY_CNT
+
+    # {vk: the table entry it was pressed with}
+    _held: dict[int, tuple] = {}
+
+    @classmethod
+    def set_table(cls, table: RemapTable | None) -> None:
+        cls._table = (
+            [None] * evdev.ecodes.KEY_CNT
+            if table is None
+            else table._table
+        )
+
+    @classmethod
+    def reset(cls) -> None:
+        cls._held = {}
+
+    @classmethod
+    def input_filter(cls, type_: int, code: int, value: int):
+        if type_ != _EV_KEY:
+            return None
+
+        if value == 1:
+            entry = cls._table[code]
+            if entry is None:
+                return None
+
+            cls._held[code] = entry
+
+        elif value == 0:
+            entry = cls._held.pop(code, None)
+            if entry is None:
+                return None
+
+        else:
+            entry = cls._held.get(code)
+            if entry is None:
+                return None
+
+        return entry[value]
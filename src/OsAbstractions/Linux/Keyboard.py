@@ -1,15 +1,17 @@
-from typing import Literal
+from typing import Literal, Callable
 
 import evdev
 
 from src.OsAbstractions.Abstract import AbsKeyboard
 from src.OsAbstractions.Abstract.Keyboard import InvalidKeyException, StateData
+from src.OsAbstractions.Abstract.KeyMask import KeyMaskView
 from src.OsAbstractions.Linux.LinuxVk import (
     LinuxKeyData,
     LinuxLayout,
     LinuxKeyEnum
 )
 from src.OsAbstractions.Linux.LinuxVk.LinuxKeyEnum import LINUX_VK_MODIFIER_MAP
+from src.OsAbstractions.Linux.VirtualDevices import make_virtual_device
 
 
 PLATFORM: Literal["web", "other"] = "other"
@@ -24,25 +26,44 @@ NON_CHARS_TERMINATE_DEAD = True if "other" else False
 
 
 class LinuxKeyboard(AbsKeyboard):
-    _pressed_keys: set[int] = set()
+    # the pressed keys, bit n is set if vk n is pressed
+    _pressed_mask: int = 0
 
     @classmethod
-    def get_pressed_keys(cls) -> set[int]:
-        return cls._pressed_keys
+    def get_pressed_mask(cls) -> int:
+        return cls._pressed_mask
+
+    @classmethod
+    def get_pressed_keys(cls) -> KeyMaskView:
+        return KeyMaskView(cls._pressed_mask)
 
     @classmethod
     def key_pressed(cls, vk: int) -> bool:
-        return vk in cls._pressed_keys
+        return cls._pressed_mask >> vk & 1 == 1
 
     @classmethod
     def add_pressed_keys(cls, *vks: int):
-        cls._pressed_keys.update(vks)
+        for vk in vks:
+            cls._pressed_mask |= 1 << vk
 
     @classmethod
     def remove_pressed_keys(cls, *vks: int):
-        cls._pressed_keys -= set(vks)
+        for vk in vks:
+            cls._pressed_mask &= ~(1 << vk)
+
+    _dev = make_virtual_device("keyboard")
+
+    # the keys that we've pressed (through _dev)
+    _own_pressed_keys: set[int] = set()
+
+    # set when the listener doesn't read our own presses back
+    # (see LinuxEventApi.synthetic_events), then the pressed keys
+    # are updated directly instead
+    track_own_presses = False
 
-    _dev = evdev.UInput()
+    @classmethod
+    def get_own_pressed_keys(cls) -> set[int]:
+        return cls._own_pressed_keys
 
     @classmethod
     def queue_press(cls, vk: int, is_press: bool) -> None:
@@ -56,6 +77,17 @@ class LinuxKeyboard(AbsKeyboard):
         """
         cls._dev.write(evdev.ecodes.EV_KEY, vk, int(is_press))
 
+        if is_press:
+            cls._own_pressed_keys.add(vk)
+        else:
+            cls._own_pressed_keys.discard(vk)
+
+        if cls.track_own_presses:
+            if is_press:
+                cls.add_pressed_keys(vk)
+            else:
+                cls.remove_pressed_keys(vk)
+
     @classmethod
     def send_queued_presses(cls):
         cls._dev.syn()
@@ -215,6 +247,26 @@ class LinuxKeyboard(AbsKeyboard):
         one press can result in multiple characters like
         "¨" + "¨" => "¨¨"  (windows)
         """
+        chars = cls.defer_resulting_chars_for_button(key_data)
+
+        if isinstance(chars, str):
+            return chars
+
+        return chars()
+
+    @classmethod
+    def defer_resulting_chars_for_button(
+            cls,
+            key_data: LinuxKeyData,
+    ) -> str | Callable[[], str]:
+        """
+        same as calc_resulting_chars_for_button, but if calculating the
+        chars is expensive (combining a dead key) a function that
+        calculates them is returned instead
+
+        the press buffer is always updated right away, so the chars
+        are the same no matter when (or if) the function is called
+        """
         if key_data is None:
             return ""
 
@@ -243,11 +295,11 @@ class LinuxKeyboard(AbsKeyboard):
                 if NON_CHARS_TERMINATE_DEAD:
                     return ""
                 else:
-                    return combine_data.join(
+                    return lambda: combine_data.join(
                         LinuxKeyData.from_char(" ")
                     )
 
-            return combine_data.join(key_data)
+            return lambda: combine_data.join(key_data)
 
         raise TypeError(
             f"cls._key_press_buffer_type has a invalid value "
@@ -0,0 +1,156 @@
+import time
+
+from src.OsAbstractions.Linux.Mouse import LinuxMouse
+
+
+class PointerTracker:
+    """
+    keeps track of the pointer position by adding up the relative
+    mouse movement (dead reckoning), instead of asking X for it on
+    every event (which is 2 round trips)
+
+    the position drifts from the real one (pointer acceleration,
+    absolute devices like tablets, etc.), so it's resynced with X
+        every {resync_interval_ms} ms
+        every {resync_events} move events
+        when the position had to be clamped to the screen
+            (the pointer stops at the edge, so the deltas stop adding up)
+            at most every {min_resync_interval_ms} ms, since a pointer
+            pushed against the edge is clamped on every move
+        when the pointer was moved with LinuxMouse.set_pos
+
+    if the error found when resyncing is larger than {max_drift} pixels,
+    the interval is halved (down to {min_resync_interval_ms}), otherwise
+    it grows back to {resync_interval_ms}
+    """
+    enabled = True
+
+    # None disables that resync
+    resync_interval_ms: float | None = 50
+    min_resync_interval_ms: float = 5
+    resync_events: int | None = None
+    resync_on_clamp = True
+
+    max_drift = 5
+
+    # multiplied with the deltas, can be used to approximate
+    # a (flat) pointer acceleration
+    scale = 1.0
+
+    # stats
+    resyncs = 0
+    # the (max of the x and y) error found at the last resync
+    last_error = 0
+    max_error = 0
+
+    _x: float = 0
+    _y: float = 0
+    _width = 0
+    _height = 0
+
+    _last_resync = float("-inf")
+    _events_since_resync = 0
+    # the resync interval is resync_interval_ms * this
+    _interval_factor = 1.0
+    _set_pos_count = -1
+
+    @classmethod
+    def _since_resync_ms(cls) -> float:
+        return (time.monotonic() - cls._last_resync) * 1000
+
+    @classmethod
+    def _needs_resync(cls) -> bool:
+        if cls._set_pos_count != LinuxMouse.set_pos_count:
+            return True
+
+        if cls.resync_events is not None \
+                and cls._events_since_resync >= cls.resync_events:
+            return True
+
+        if cls.resync_interval_ms is None:
+            return False
+
+        interval_ms = max(
+            cls.min_resync_interval_ms,
+            cls.resync_interval_ms * cls._interval_factor
+        )
+
+        return cls._since_resync_ms() >= interval_ms
+
+    @classmethod
+    def _resync(cls, predicted: (float, float) = None):
+        x, y = LinuxMouse.get_pos()
+
+        if predicted is not None:
+            error = max(abs(x - predicted[0]), abs(y - predicted[1]))
+
+            cls.last_error = error
+            cls.max_error = max(cls.max_error, error)
+
+            if error > cls.max_drift:
+                cls._interval_factor /= 2
+            else:
+                cls._interval_factor = min(1.0, cls._interval_factor * 2)
+
+        cls._x, cls._y = x, y
+        cls._width, cls._height = LinuxMouse.get_screen_size()
+
+        cls._last_resync = time.monotonic()
+        cls._events_since_resync = 0
+        cls._set_pos_count = LinuxMouse.set_pos_count
+        cls.resyncs += 1
+
+    @classmethod
+    def reset(cls):
+        """ forgets the position, so that it's resynced on the next use """
+        cls._last_resync = float("-inf")
+        cls._set_pos_count = -1
+        cls._interval_factor = 1.0
+
+    @classmethod
+    def get_pos(cls) -> (int, int):
+        if not cls.enabled:
+            return LinuxMouse.get_pos()
+
+        if cls._needs_resync():
+            cls._resync()
+
+        return round(cls._x), round(cls._y)
+
+    @classmethod
+    def move(cls, dx: int, dy: int) -> (int, int):
+        """
+        moves the tracked position with the relative movement
+        of a mouse event
+
+        :return: the new position
+        """
+        if not cls.enabled:
+            return LinuxMouse.get_pos()
+
+        if cls._set_pos_count != LinuxMouse.set_pos_count:
+            # the pointer jumped, the deltas are relative to something
+            # we don't know
+            cls._resync()
+            return round(cls._x), round(cls._y)
+
+        x = cls._x + dx * cls.scale
+        y = cls._y + dy * cls.scale
+
+        clamped_x = min(max(x, 0), cls._width - 1)
+        clamped_y = min(max(y, 0), cls._height - 1)
+
+        cls._events_since_resync += 1
+
+        resync_on_clamp = (
+            cls.resync_on_clamp
+            and (clamped_x != x or clamped_y != y)
+            and cls._since_resync_ms() >= cls.min_resync_interval_ms
+        )
+
+        if cls._needs_resync() or resync_on_clamp:
+            cls._resync(predicted=(clamped_x, clamped_y))
+        else:
+            cls._x, cls._y = clamped_x, clamped_y
+
+        return round(cls._x), round(cls._y)
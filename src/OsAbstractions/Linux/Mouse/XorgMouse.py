@@ -85,6 +85,10 @@ class LinuxXLibMouse(AbsMouse):
         else:
             return tuple(int(p) for p in args)
 
+    # incremented on every set_pos, so that things that keep track of
+    # the position on their own know that it jumped
+    set_pos_count = 0
+
     @classmethod
     def set_pos(cls, x: int, y: int):
         px, py = cls._check_bounds(x, y)
@@ -96,12 +100,19 @@ class LinuxXLibMouse(AbsMouse):
                 y=py
             )
 
+        cls.set_pos_count += 1
+
     @classmethod
     def get_pos(cls) -> (int, int):
         with display_manager(cls._display) as dm:
             qp = dm.screen().root.query_pointer()
             return qp.root_x, qp.root_y
 
+    @classmethod
+    def get_screen_size(cls) -> (int, int):
+        screen = cls._display.screen()
+        return screen.width_in_pixels, screen.height_in_pixels
+
     @classmethod
     def _press_button(cls, button: int, down: bool):
         """
@@ -0,0 +1,182 @@
+import os
+import threading
+from select import select
+from typing import Callable
+
+from src.LatencyTracer import LatencyTracer
+
+
+class EventReaderThread(threading.Thread):
+    """
+    owns the select / read loop of the LinuxEventApi
+
+    it only reads the raw bytes off the fds (so that the kernel buffers
+    don't overrun while the consumer is busy), decoding them is left to
+    the consumer, since that uses state (the pressed keys, the dead
+    keys, the x display) that isn't thread safe
+
+    the (fd, data, read_us) chunks are buffered, one batch per select()
+    wake up, and {wakeup} is called once per batch (not per chunk) to
+    tell the consumer to drain it. read_us is when the data was read,
+    for the LatencyTracer (None while it's disabled)
+
+    nothing is ever dropped, if the consumer falls behind (more than
+    {capacity} bytes are buffered) the thread waits for it to drain
+    the buffer, and the events wait in the kernel buffer meanwhile
+
+    if reading an fd fails (e.g. the device was unplugged) the error
+    is buffered in place of the data, and the fd isn't read again
+    until it's forgotten (see forget)
+
+    {read_size} has to be a multiple of the size of the records on the
+    fds (e.g. the input_event struct), the kernel only hands out whole
+    ones, so a read that isn't filled means the fd is empty
+    """
+
+    def __init__(
+            self,
+            get_fds: Callable[[], list[int]],
+            wakeup: Callable[[], None],
+            capacity: int = 2 ** 17,
+            read_size: int = 24 * 2 ** 9,
+    ):
+        super().__init__(name="EventReaderThread", daemon=True)
+
+        self._get_fds = get_fds
+        self._wakeup = wakeup
+
+        self.capacity = capacity
+        self.read_size = read_size
+
+        self._buffer: list[tuple[int, bytes | OSError, float | None]] = []
+        self._buffered = 0
+        self._drained = threading.Condition()
+
+        # the fds that failed, and shouldn't be selected anymore
+        self._failed: set[int] = set()
+
+        # only wake the consumer if it hasn't been woken already
+        self._wakeup_pending = False
+
+        self._stopping = False
+
+        # written to, to interrupt the select() when
+        # stopping, or when the fds have changed
+        self._interrupt_r, self._interrupt_w = os.pipe()
+
+    def run(self):
+        while not self._stopping:
+            fds = [
+                fd
+                for fd in self._get_fds()
+                if fd not in self._failed
+            ]
+
+            try:
+                r, w, x = select([self._interrupt_r, *fds], [], [])
+            except (OSError, ValueError):
+                # an fd was closed under us, get the new ones
+                continue
+
+            if self._interrupt_r in r:
+                os.read(self._interrupt_r, 1024)
+                r.remove(self._interrupt_r)
+
+            batch = []
+            for fd in r:
+                try:
+                    data, read_us = self._read(fd)
+                except OSError as e:
+                    self._failed.add(fd)
+                    batch.append((fd, e, None))
+                    continue
+
+                if data:
+                    batch.append((fd, data, read_us))
+
+            if batch:
+                self._push(batch)
+
+    def _read(self, fd: int) -> tuple[bytes, float | None]:
+        """ reads everything that's waiting on {fd}, and when it was read """
+        read_us = None
+        chunks = []
+        while True:
+            try:
+                data = os.read(fd, self.read_size)
+            except BlockingIOError:
+                break
+
+            if not data:
+                break
+
+            if LatencyTracer.enabled and read_us is None:
+                read_us = LatencyTracer.now_us()
+
+            chunks.append(data)
+
+            if len(data) < self.read_size:
+                break
+
+        return b"".join(chunks), read_us
+
+    def _push(self, batch: list[tuple[int, bytes | OSError, float | None]]):
+        size = sum(
+            len(data)
+            for fd, data, read_us in batch
+            if not isinstance(data, OSError)
+        )
+
+        with self._drained:
+            # let the consumer catch up, instead of dropping anything
+            while self._buffered >= self.capacity and not self._stopping:
+                self._drained.wait()
+
+            self._buffer += batch
+            self._buffered += size
+
+            wakeup = not self._wakeup_pending
+            self._wakeup_pending = True
+
+        if wakeup:
+            self._wakeup()
+
+    def drain(self) -> list[tuple[int, bytes | OSError, float | None]]:
+        """
+        takes all the buffered (fd, data, read_us) chunks, in the order
+        they where read. data is the error instead if reading the fd failed
+
+        meant to be called by the consumer when it's been woken up
+        """
+        with self._drained:
+            # cleared while holding the lock, so that a batch pushed
+            # after this wakes us up again instead of getting stuck
+            self._wakeup_pending = False
+
+            chunks = self._buffer
+            self._buffer = []
+            self._buffered = 0
+
+            self._drained.notify()
+
+        return chunks
+
+    def forget(self, fd: int):
+        """ {fd} is closed, it might be reused for another device """
+        self._failed.discard(fd)
+        self.fds_changed()
+
+    def fds_changed(self):
+        """ makes the thread select() the new fds """
+        os.write(self._interrupt_w, b"\0")
+
+    def stop(self):
+        with self._drained:
+            self._stopping = True
+            self._drained.notify()
+
+        os.write(self._interrupt_w, b"\0")
+        self.join()
+
+        os.close(self._interrupt_r)
+        os.close(self._interrupt_w)
@@ -0,0 +1,41 @@
+import os
+
+import evdev
+
+# the phys of all virtual (uinput) devices we make starts with this
+# so that the listener can tell them apart from the real ones.
+# it's unique per process, so the virtual devices of other
+# processes are treated like any other device
+VIRTUAL_PHYS_PREFIX = f"inputmgr-{os.getpid()}"
+
+
+def make_virtual_device(name: str, **kwargs) -> evdev.UInput:
+    """ makes a uinput device that is_own_virtual_device recognises """
+    return evdev.UInput(
+        name=f"InputMgr {name}",
+        phys=f"{VIRTUAL_PHYS_PREFIX}/{name}",
+        **kwargs
+    )
+
+
+def is_own_virtual_device(device: evdev.InputDevice) -> bool:
+    return (device.phys or "").startswith(VIRTUAL_PHYS_PREFIX)
+
+
+PASSTHROUGH_PHYS = f"{VIRTUAL_PHYS_PREFIX}/passthrough"
+
+
+def make_passthrough_device(device: evdev.InputDevice) -> evdev.UInput:
+    """
+    makes a uinput copy of {device}, to reinject
+    the events of it into when it's grabbed
+    """
+    return evdev.UInput.from_device(
+        device,
+        name=f"InputMgr passthrough {device.name}",
+        phys=PASSTHROUGH_PHYS,
+    )
+
+
+def is_passthrough_device(device: evdev.InputDevice) -> bool:
+    return (device.phys or "") == PASSTHROUGH_PHYS
@@ -2,6 +2,7 @@ import os
 
 from src.OsAbstractions import AbsBackend
 
+from src.OsAbstractions.Linux.DeviceSelection import DeviceFilter, DeviceInfo
 from src.OsAbstractions.Linux.EventApi import LinuxEventApi
 from src.OsAbstractions.Linux.Keyboard import LinuxKeyboard
 from src.OsAbstractions.Linux.Mouse import LinuxMouse
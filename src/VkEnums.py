@@ -0,0 +1,7 @@
+from src.OsAbstractions.Linux.LinuxVk import LinuxKeyEnum
+
+
+# we need to make the user explicitly select a vkEnum
+# so that the ide can correctly infer the typehints
+class Vk:
+    Linux = LinuxKeyEnum
@@ -1,15 +1,50 @@
+import importlib
+from typing import TYPE_CHECKING
+
 from src.Events import KeyboardEvents, MouseEvents, any_event
+from src.LatencyTracer import LatencyTracer
+
+from src.Main.EventBusQueue import EventBusQueue
+
+if TYPE_CHECKING:
+    from src.Main.CallbackProfiler import CallbackProfiler
+    from src.Main.EventBus import EventBroadcaster
+    from src.Main.EventPrinting import print_event, print_events
+    from src.Main.EventQueue import EventQueue, EventDistributor
+    from src.Main.Keyboard import Keyboard, Hotkey, HotkeySequence
+    from src.Main.Mouse import Mouse
+    from src.Main.Recorder import Recorder
+
+    from src.OsAbstractions.Linux.LinuxVk import LinuxKeyEnum
+    from src.VkEnums import Vk
 
-from src.Main.EventPrinting import print_event, print_events
-from src.Main.EventQueue import EventQueue, EventDistributor
-from src.Main.Keyboard import Keyboard, Hotkey
-from src.Main.Mouse import Mouse
-from src.Main.Recorder import Recorder
+# the rest needs the backend (uinput, the display and so root), so it's
+# only imported when it's first used. that way the event bus subscribers
+# (EventBusQueue) can import src without it
+_LAZY = {
+    "CallbackProfiler": "src.Main.CallbackProfiler",
+    "EventBroadcaster": "src.Main.EventBus",
+    "print_event": "src.Main.EventPrinting",
+    "print_events": "src.Main.EventPrinting",
+    "EventQueue": "src.Main.EventQueue",
+    "EventDistributor": "src.Main.EventQueue",
+    "Keyboard": "src.Main.Keyboard",
+    "Hotkey": "src.Main.Keyboard",
+    "HotkeySequence": "src.Main.Keyboard",
+    "Mouse": "src.Main.Mouse",
+    "Recorder": "src.Main.Recorder",
+    "LinuxKeyEnum": "src.OsAbstractions.Linux.LinuxVk",
+    "Vk": "src.VkEnums",
+}
 
-from src.OsAbstractions.Linux.LinuxVk import LinuxKeyEnum
 
+def __getattr__(name: str):
+    try:
+        module = _LAZY[name]
+    except KeyError:
+        raise AttributeError(
+            f"module {__name__!r} has no attribute {name!r}"
+        ) from None
 
-# we need to make the user explicitly select a vkEnum
-# so that the ide can correctly infer the typehints
-class Vk:
-    Linux = LinuxKeyEnum
+    value = globals()[name] = getattr(importlib.import_module(module), name)
+    return value
@@ -0,0 +1,55 @@
+"""
+the tests run without input devices, uinput or an x display
+
+uinput and the display are replaced before src is imported, and the
+LinuxEventApi listens to FakeDevices (see benchmarks/_fake_device.py)
+"""
+import fcntl
+
+import evdev
+import pytest
+
+# before src, see install_fake_backend
+from benchmarks._fake_device import FakeDevice, install_fake_devices
+from src.OsAbstractions.Linux.EventApi import LinuxEventApi
+from src.OsAbstractions.Linux.Keyboard import LinuxKeyboard
+
+
+class FakeKeyboard(FakeDevice):
+    """ a FakeDevice with letter keys, that reports {active} as held """
+    def __init__(self, name="fake-keyboard", path="/dev/input/fake"):
+        super().__init__(name, path)
+
+        self.active: set[int] = set()
+
+        # so that a test can send more than the (small) default fits
+        fcntl.fcntl(self._write_fd, fcntl.F_SETPIPE_SZ, 2 ** 20)
+
+    def active_keys(self):
+        return list(self.active)
+
+    def capabilities(self, absinfo=True):
+        return {evdev.ecodes.EV_KEY: list(range(1, 256))}
+
+    def input_props(self):
+        return []
+
+    class info:
+        vendor = 0
+        product = 0
+
+
+@pytest.fixture
+def keyboard():
+    """ the one device the LinuxEventApi listens to """
+    device = FakeKeyboard()
+    install_fake_devices(device)
+
+    yield device
+
+    if LinuxEventApi._listening:
+        LinuxEventApi.stop_listening()
+
+    LinuxEventApi.clear_queued_events()
+    LinuxKeyboard.remove_pressed_keys(*LinuxKeyboard.get_pressed_keys())
+    LinuxKeyboard.clear_key_press_buffer()
@@ -0,0 +1,86 @@
+import evdev
+
+from src.OsAbstractions.Linux.DeviceSelection import (
+    DEFAULT_FILTERS, DeviceFilter, DeviceInfo
+)
+
+ecodes = evdev.ecodes
+
+
+class FakeInputDevice:
+    """ just what DeviceInfo.from_device looks at """
+    def __init__(self, name: str, capabilities: dict, props=()):
+        self.path = f"/dev/input/{name}"
+        self.name = name
+        self.phys = ""
+        self._capabilities = capabilities
+        self._props = list(props)
+
+    def capabilities(self, absinfo=True):
+        return self._capabilities
+
+    def input_props(self):
+        return self._props
+
+    class info:
+        vendor = 0
+        product = 0
+
+
+def keys(*names: str) -> dict:
+    return {ecodes.EV_KEY: [ecodes.ecodes[name] for name in names]}
+
+
+DEVICES = [
+    FakeInputDevice("keyboard", {
+        ecodes.EV_KEY: list(range(1, 128)), ecodes.EV_LED: [0, 1, 2]
+    }),
+    FakeInputDevice("media keys", keys(
+        "KEY_VOLUMEUP", "KEY_VOLUMEDOWN", "KEY_MUTE", "KEY_POWER"
+    )),
+    FakeInputDevice("mouse", {
+        **keys("BTN_LEFT", "BTN_RIGHT"), ecodes.EV_REL: [0, 1, 8]
+    }),
+    FakeInputDevice("touchpad", {
+        **keys("BTN_TOUCH"), ecodes.EV_ABS: [0, 1]
+    }),
+
+    FakeInputDevice("Power Button", keys("KEY_POWER")),
+    FakeInputDevice("Sleep Button", keys("KEY_SLEEP")),
+    FakeInputDevice("webcam", keys("KEY_CAMERA")),
+    FakeInputDevice("Video Bus", keys(
+        "KEY_BRIGHTNESSDOWN", "KEY_BRIGHTNESSUP", "KEY_BRIGHTNESS_CYCLE",
+        "KEY_BRIGHTNESS_ZERO", "KEY_DISPLAY_OFF", "KEY_SWITCHVIDEOMODE",
+    )),
+    FakeInputDevice("Lid Switch", {ecodes.EV_SW: [ecodes.SW_LID]}),
+    FakeInputDevice(
+        "accelerometer", {ecodes.EV_ABS: [0, 1, 2]},
+        props=[ecodes.INPUT_PROP_ACCELEROMETER],
+    ),
+]
+
+
+def selected(*filters: DeviceFilter) -> list[str]:
+    infos = [DeviceInfo.from_device(device) for device in DEVICES]
+
+    return [
+        info.name
+        for info in infos
+        if any(device_filter.matches(info) for device_filter in filters)
+    ]
+
+
+def test_the_default_selection_is_the_input_devices():
+    assert selected(*DEFAULT_FILTERS) == [
+        "keyboard", "media keys", "mouse", "touchpad"
+    ]
+
+
+def test_the_system_keys_can_be_selected():
+    assert selected(DeviceFilter(system_keys=True)) == [
+        "Power Button", "Sleep Button", "webcam", "Video Bus"
+    ]
+    assert selected(DeviceFilter(keyboard=True)) == ["keyboard"]
+    assert selected(DeviceFilter(name="button")) == [
+        "Power Button", "Sleep Button"
+    ]
@@ -0,0 +1,219 @@
+import errno
+import threading
+import time
+
+import evdev
+
+from benchmarks._fake_device import INPUT_EVENT, install_fake_devices
+from src.Events import KeyboardEvent, MouseEvent
+from src.LatencyTracer import LatencyTracer
+from src.OsAbstractions.Linux.DeviceMonitor import InotifyDeviceMonitor
+from src.OsAbstractions.Linux.EventApi import LinuxEventApi
+from src.OsAbstractions.Linux.Keyboard import LinuxKeyboard
+from tests.conftest import FakeKeyboard
+
+EV_KEY = evdev.ecodes.EV_KEY
+EV_REL = evdev.ecodes.EV_REL
+SYN = (evdev.ecodes.EV_SYN, evdev.ecodes.SYN_REPORT, 0)
+SYN_DROPPED = (evdev.ecodes.EV_SYN, evdev.ecodes.SYN_DROPPED, 0)
+
+SHIFT = evdev.ecodes.KEY_LEFTSHIFT
+A = evdev.ecodes.KEY_A
+S = evdev.ecodes.KEY_S
+D = evdev.ecodes.KEY_D
+
+
+def keys(events) -> list[tuple[str, int]]:
+    """ the KeyDown / KeyUp events as (name, vk) """
+    return [
+        (type(event).__name__, event.key_data.vk)
+        for event in events
+        if isinstance(event, KeyboardEvent.KeyDown | KeyboardEvent.KeyUp)
+    ]
+
+
+def test_syn_dropped_discards_the_frame_and_resyncs(keyboard):
+    LinuxEventApi.start_listening()
+
+    keyboard.send((EV_KEY, SHIFT, 1), SYN, (EV_KEY, A, 1), SYN)
+    assert keys(LinuxEventApi._read_events(keyboard.fd)) == [
+        ("KeyDown", SHIFT), ("KeyDown", A)
+    ]
+
+    # shift was released while the events where dropped
+    keyboard.active = {A}
+    keyboard.send(
+        (EV_KEY, S, 1), SYN_DROPPED,
+        (EV_KEY, SHIFT, 0), SYN,
+        (EV_KEY, D, 1), SYN,
+    )
+
+    assert keys(LinuxEventApi._read_events(keyboard.fd)) == [
+        ("KeyUp", SHIFT), ("KeyDown", D)
+    ]
+    assert set(LinuxKeyboard.get_pressed_keys()) == {A, D}
+
+
+def test_a_busy_device_is_read_whole_frames_at_a_time(keyboard):
+    mouse = FakeKeyboard(name="fake-mouse", path="/dev/input/fake-mouse")
+    install_fake_devices(keyboard, mouse)
+    LinuxEventApi.start_listening()
+
+    for _ in range(3000):
+        mouse.send((EV_REL, 0, 1), (EV_REL, 1, 1), SYN)
+    keyboard.send((EV_KEY, A, 1), SYN)
+
+    moves = LinuxEventApi._read_events(mouse.fd)
+    assert 0 < len(moves) < 3000
+
+    # the mouse doesn't keep the keyboard waiting
+    assert keys(LinuxEventApi._read_events(keyboard.fd)) == [("KeyDown", A)]
+
+    while True:
+        events = LinuxEventApi._read_events(mouse.fd)
+        if not events:
+            break
+
+        moves += events
+
+    assert len(moves) == 3000
+    assert all(
+        isinstance(move, MouseEvent.Move) and move.delta == (1, 1)
+        for move in moves
+    )
+
+
+def _chunk(*events: tuple[int, int, int]) -> bytes:
+    """ the bytes the reader thread would hand over for {events} """
+    return b"".join(INPUT_EVENT.pack(0, 0, *event) for event in events)
+
+
+def test_a_frame_split_across_chunks_is_kept_per_device(keyboard):
+    mouse = FakeKeyboard(name="fake-mouse", path="/dev/input/fake-mouse")
+    install_fake_devices(keyboard, mouse)
+    LinuxEventApi.start_listening()
+
+    def decode(device, *events):
+        return LinuxEventApi._decode_events(
+            device.fd, LinuxEventApi._iter_chunk(_chunk(*events))
+        )
+
+    # the reader thread read the mouse in the middle of a frame
+    assert decode(mouse, (EV_REL, 0, 5), (EV_KEY, A, 1)) == []
+
+    # the keyboard's frame doesn't end the mouse's
+    assert keys(decode(keyboard, (EV_KEY, S, 1), SYN)) == [("KeyDown", S)]
+
+    events = decode(mouse, (EV_REL, 1, 3), SYN)
+    assert keys(events) == [("KeyDown", A)]
+    assert [
+        event.delta
+        for event in events
+        if isinstance(event, MouseEvent.Move)
+    ] == [(5, 3)]
+
+
+def test_the_reader_thread_stamps_when_it_read_the_events(
+        keyboard, monkeypatch
+):
+    woken = threading.Event()
+    monkeypatch.setattr(LatencyTracer, "enabled", True)
+    monkeypatch.setattr(LinuxEventApi, "_reader_thread_wakeup", woken.set)
+    LinuxEventApi.start_listening()
+
+    sent_us = LatencyTracer.now_us()
+    keyboard.send((EV_KEY, A, 1), SYN)
+    assert woken.wait(5)
+
+    # decoded a while after they where read
+    time.sleep(0.05)
+    LinuxEventApi.drain_reader_thread()
+
+    assert LinuxEventApi.event_queue
+    for event in LinuxEventApi.event_queue:
+        read_us, decoded_us, queued_us = event._trace
+        assert sent_us <= read_us < decoded_us - 40_000
+
+
+def _unplugged(*args):
+    raise OSError(errno.ENODEV, "No such device")
+
+
+def _plug_in(monkeypatch, *devices: FakeKeyboard):
+    """ makes opening the paths of {devices} open them """
+    paths = {device.path: device for device in devices}
+    monkeypatch.setattr(evdev, "InputDevice", lambda path: paths[path])
+
+
+def test_hotplugged_devices_are_added_and_removed(keyboard, monkeypatch):
+    LinuxEventApi.start_listening()
+
+    pad = FakeKeyboard(name="fake-macro-pad", path="/dev/input/fake-pad")
+    _plug_in(monkeypatch, pad)
+
+    assert LinuxEventApi._handle_device_changes(({pad.path}, set())) == []
+    assert set(LinuxEventApi.get_fds()) == {keyboard.fd, pad.fd}
+
+    pad.active = {A}
+    pad.send((EV_KEY, A, 1), SYN)
+    assert keys(LinuxEventApi._read_events(pad.fd)) == [("KeyDown", A)]
+
+    # the key that was held on it is released with it
+    events = LinuxEventApi._handle_device_changes((set(), {pad.path}))
+    assert keys(events) == [("KeyUp", A)]
+    assert LinuxEventApi.get_fds() == [keyboard.fd]
+
+
+def test_an_unplugged_device_is_removed_when_reading_fails(
+        keyboard, monkeypatch
+):
+    keyboard.active = {A}
+    LinuxEventApi.start_listening()
+
+    keyboard.send((EV_KEY, A, 1), SYN)
+    LinuxEventApi._read_events(keyboard.fd)
+
+    monkeypatch.setattr(
+        LinuxEventApi, "_read_raw_events", classmethod(_unplugged)
+    )
+    keyboard.active = set()
+    keyboard.send((EV_KEY, S, 1))
+
+    assert keys(LinuxEventApi._read_events(keyboard.fd)) == [("KeyUp", A)]
+    assert LinuxEventApi.get_fds() == []
+
+
+def test_devices_found_gone_while_resyncing_are_removed_too(keyboard):
+    other = FakeKeyboard(path="/dev/input/fake-other")
+    third = FakeKeyboard(path="/dev/input/fake-third")
+    install_fake_devices(keyboard, other, third)
+    LinuxEventApi.start_listening()
+
+    other.active = {A}
+    third.active = {S}
+    other.send((EV_KEY, A, 1), SYN)
+    third.send((EV_KEY, S, 1), SYN)
+    LinuxEventApi._read_events(other.fd)
+    LinuxEventApi._read_events(third.fd)
+
+    # unplugged together with the keyboard, (e.g. on the same usb hub)
+    other.active_keys = _unplugged
+
+    events = LinuxEventApi._handle_device_changes((set(), {keyboard.path}))
+    assert keys(events) == [("KeyUp", A)]
+    assert LinuxEventApi.get_fds() == [third.fd]
+    assert set(LinuxKeyboard.get_pressed_keys()) == {S}
+
+
+def test_the_monitor_only_reports_event_devices(tmp_path):
+    monitor = InotifyDeviceMonitor(str(tmp_path))
+
+    try:
+        (tmp_path / "event3").touch()
+        (tmp_path / "mouse0").touch()
+        assert monitor.read_changes() == ({str(tmp_path / "event3")}, set())
+
+        (tmp_path / "event3").unlink()
+        assert monitor.read_changes() == (set(), {str(tmp_path / "event3")})
+    finally:
+        monitor.close()
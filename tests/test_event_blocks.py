@@ -0,0 +1,123 @@
+import importlib
+import types
+
+import pytest
+
+from src.AbsVkEnum import KeyData
+from src.Events import KeyboardEvent, MouseEvent
+from src.OsAbstractions.Abstract.EventApi import EventApi
+
+# not an import, the package's EventApi (the class) hides the module
+event_api_module = importlib.import_module(
+    "src.OsAbstractions.Abstract.EventApi"
+)
+
+A = 30
+S = 31
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """ [now], what time.monotonic() returns for the block table """
+    now = [100.0]
+    monkeypatch.setattr(
+        event_api_module, "time",
+        types.SimpleNamespace(monotonic=lambda: now[0])
+    )
+
+    return now
+
+
+@pytest.fixture
+def api(clock):
+    """ an EventApi with its own block table and stats """
+    class Api(EventApi):
+        _blocked_events = {}
+        block_ttl_ms = 1000
+
+        blocks_added = 0
+        blocks_matched = 0
+        blocks_expired = 0
+
+        _next_block_sweep = 0.0
+
+    return Api
+
+
+def key_down(vk: int, time_ms: float = 0) -> KeyboardEvent.KeyDown:
+    return KeyboardEvent.KeyDown(
+        time_ms=time_ms, raw=None, key_data=KeyData(vk, None)
+    )
+
+
+def click(pos: tuple[int, int]) -> MouseEvent.Click:
+    return MouseEvent.Click(time_ms=0, raw=None, pos=pos, button="left")
+
+
+def stats(api) -> tuple[int, int, int]:
+    return api.blocks_added, api.blocks_matched, api.blocks_expired
+
+
+def test_a_block_is_used_up_by_the_event_it_matches(api):
+    api.dispatch_event_block(key_down(A))
+    api.dispatch_event_block(key_down(A))
+
+    # only the key is compared for keyboard events
+    assert not api._is_event_blocked(key_down(S))
+    assert not api._is_event_blocked(KeyboardEvent.KeyUp(
+        time_ms=0, raw=None, key_data=KeyData(A, None)
+    ))
+    assert api._is_event_blocked(key_down(A, time_ms=5))
+    assert api._is_event_blocked(key_down(A))
+    assert not api._is_event_blocked(key_down(A))
+
+    # the whole event for the others
+    api.dispatch_event_block(click((1, 2)))
+    assert not api._is_event_blocked(click((1, 3)))
+    assert api._is_event_blocked(click((1, 2)))
+
+    assert stats(api) == (3, 3, 0)
+    assert api._blocked_events == {}
+
+
+def test_blocks_expire_after_the_ttl(api, clock):
+    api.dispatch_event_block(key_down(A))
+    clock[0] += 0.5
+    api.dispatch_event_block(key_down(A))
+
+    clock[0] += 0.6
+    # the first one expired, the second one is still there
+    assert api._is_event_blocked(key_down(A))
+    assert stats(api) == (2, 1, 1)
+
+    api.dispatch_event_block(key_down(A))
+    clock[0] += 1
+    assert not api._is_event_blocked(key_down(A))
+    assert stats(api) == (3, 1, 2)
+
+
+def test_the_sweep_removes_blocks_that_never_matched(api, clock):
+    api.dispatch_event_block(key_down(A))
+    api.dispatch_event_block(click((1, 2)))
+
+    # not swept again until block_ttl_ms has passed
+    clock[0] += 0.5
+    api.dispatch_event_block(key_down(S))
+    assert len(api._blocked_events) == 3
+
+    clock[0] += 0.6
+    api._sweep_expired_blocks(clock[0])
+
+    assert list(api._blocked_events) == [api._block_key(key_down(S))]
+    assert stats(api) == (3, 0, 2)
+
+    # and it waits a ttl before sweeping again
+    clock[0] += 0.9
+    api._sweep_expired_blocks(clock[0])
+    assert len(api._blocked_events) == 1
+    assert stats(api) == (3, 0, 2)
+
+    clock[0] += 0.1
+    api._sweep_expired_blocks(clock[0])
+    assert api._blocked_events == {}
+    assert stats(api) == (3, 0, 3)
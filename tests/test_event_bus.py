@@ -0,0 +1,145 @@
+import asyncio
+import socket
+
+import evdev
+import pytest
+
+from src.AbsVkEnum import KeyData
+from src.Events import KeyboardEvent, MouseEvent
+from src.Main.EventBus import EventBroadcaster
+from src.Main.EventBusProtocol import MessageReader, pack
+from src.Main.EventBusQueue import EventBusQueue
+
+EV_KEY = evdev.ecodes.EV_KEY
+EV_REL = evdev.ecodes.EV_REL
+SYN = (evdev.ecodes.EV_SYN, evdev.ecodes.SYN_REPORT, 0)
+
+A = evdev.ecodes.KEY_A
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "inputmgr.sock")
+
+
+def run(path: str, test, **kwargs):
+    """ runs test(broadcaster) with a started broadcaster on {path} """
+    async def main():
+        broadcaster = EventBroadcaster(path, **kwargs)
+        await broadcaster.start()
+
+        try:
+            await test(broadcaster)
+        finally:
+            broadcaster.close()
+            await asyncio.sleep(0.02)
+
+    asyncio.run(main())
+
+
+def subscribe(path: str, *event_types: type) -> EventBusQueue:
+    # not "block", that only reads the socket while it's iterated
+    return EventBusQueue(*event_types, path=path, overflow="drop_oldest")
+
+
+def test_subscribers_get_the_event_types_they_asked_for(keyboard, path):
+    async def test(broadcaster):
+        keys = subscribe(path, KeyboardEvent.KeyDown)
+        moves = subscribe(path, MouseEvent.Move)
+
+        with keys, moves:
+            await asyncio.sleep(0.05)
+
+            keyboard.send((EV_KEY, A, 1), SYN, (EV_KEY, A, 0), SYN)
+            keyboard.send((EV_REL, 0, 3), (EV_REL, 1, 4), SYN)
+            await asyncio.sleep(0.05)
+
+        key_down, = keys.queued_events
+        assert isinstance(key_down, KeyboardEvent.KeyDown)
+        assert key_down.key_data.vk == A
+        assert key_down.raw is None
+
+        move, = moves.queued_events
+        assert isinstance(move, MouseEvent.Move)
+        assert move.delta == (3, 4)
+
+    run(path, test)
+
+
+def test_the_broadcaster_only_sends_what_was_asked_for(keyboard, path):
+    async def test(broadcaster):
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(pack(["KeyUp"]))
+        await asyncio.sleep(0.05)
+
+        keyboard.send((EV_REL, 0, 3), SYN)
+        keyboard.send((EV_KEY, A, 1), SYN, (EV_KEY, A, 0), SYN)
+        await asyncio.sleep(0.05)
+
+        messages = MessageReader().feed(await reader.read(2 ** 16))
+        assert [
+            event["type"]
+            for events in messages
+            for event in events
+        ] == ["KeyUp"]
+
+        writer.close()
+
+    run(path, test)
+
+
+def test_the_key_send_chars_are_sent(keyboard, path):
+    async def test(broadcaster):
+        sends = subscribe(path, KeyboardEvent.KeySend)
+
+        with sends:
+            await asyncio.sleep(0.05)
+
+            keyboard.send((EV_KEY, A, 1), SYN, (EV_KEY, A, 0), SYN)
+            await asyncio.sleep(0.05)
+
+        send, = sends.queued_events
+        assert send.chars == "a"
+        assert send.key_data.vk == A
+
+    run(path, test)
+
+
+def test_a_live_socket_isnt_taken_over(path):
+    async def test(broadcaster):
+        with pytest.raises(OSError):
+            await EventBroadcaster(path).start()
+
+    run(path, test)
+
+    # but a left over one (no one is listening on it) is replaced
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.bind(path)
+
+    run(path, lambda broadcaster: asyncio.sleep(0))
+
+
+def test_a_slow_subscriber_misses_batches(path):
+    async def test(broadcaster):
+        # never reads what it's sent
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(pack([]))
+        await asyncio.sleep(0.05)
+
+        subscriber, = broadcaster._subscribers
+        key_down = KeyboardEvent.KeyDown(
+            time_ms=0, raw=None, key_data=KeyData(A, "a")
+        )
+        batch = (key_down,) * 100
+
+        for _ in range(10 ** 4):
+            broadcaster._publish(batch)
+            if subscriber.dropped:
+                break
+
+        assert subscriber.dropped == 1
+        assert subscriber.transport.get_write_buffer_size() > 0
+
+        writer.close()
+
+    run(path, test, max_buffer=0)
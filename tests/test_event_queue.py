@@ -0,0 +1,126 @@
+import asyncio
+
+import evdev
+import pytest
+
+from src.Events import KeyboardEvent
+from src.Main.EventQueue import EventDistributor, EventQueue
+
+EV_KEY = evdev.ecodes.EV_KEY
+EV_REL = evdev.ecodes.EV_REL
+SYN = (evdev.ecodes.EV_SYN, evdev.ecodes.SYN_REPORT, 0)
+
+A = evdev.ecodes.KEY_A
+
+
+@pytest.fixture(params=["reader", "thread", "poll"])
+def mode(request):
+    EventDistributor.mode = request.param
+    yield request.param
+    EventDistributor.mode = "reader"
+
+
+def key_downs(queue: EventQueue) -> int:
+    return sum(
+        isinstance(event, KeyboardEvent.KeyDown)
+        for event in queue.queued_events
+    )
+
+
+def test_drop_oldest_is_the_default(keyboard, mode):
+    async def main():
+        queue = EventQueue(capacity=4)
+
+        with queue:
+            await asyncio.sleep(0.02)
+
+            for x in range(6):
+                keyboard.send((EV_REL, 0, x), SYN)
+            await asyncio.sleep(0.02)
+
+        assert [move.delta for move in queue.queued_events] == [
+            (2, 0), (3, 0), (4, 0), (5, 0)
+        ]
+        assert queue.dropped == 2
+
+    asyncio.run(main())
+
+
+def test_drop_newest(keyboard, mode):
+    async def main():
+        queue = EventQueue(capacity=4, overflow="drop_newest")
+
+        with queue:
+            await asyncio.sleep(0.02)
+
+            for x in range(6):
+                keyboard.send((EV_REL, 0, x), SYN)
+            await asyncio.sleep(0.02)
+
+        assert [move.delta for move in queue.queued_events] == [
+            (0, 0), (1, 0), (2, 0), (3, 0)
+        ]
+        assert queue.dropped == 2
+
+    asyncio.run(main())
+
+
+def test_coalesce_merges_the_moves(keyboard, mode):
+    async def main():
+        queue = EventQueue(capacity=4, overflow="coalesce")
+
+        with queue:
+            await asyncio.sleep(0.02)
+
+            keyboard.send(*[(EV_REL, 0, 1), SYN] * 6)
+            await asyncio.sleep(0.02)
+
+            # no motion is lost, only events
+            assert [move.delta for move in queue.queued_events] == [
+                (1, 0), (1, 0), (1, 0), (3, 0)
+            ]
+            assert queue.coalesced == 2
+            assert queue.dropped == 0
+
+            # anything else pushes out the oldest event
+            keyboard.send((EV_KEY, A, 1), SYN)
+            await asyncio.sleep(0.02)
+
+        # for the KeyDown and the KeySend
+        assert key_downs(queue) == 1
+        assert len(queue.queued_events) == 4
+        assert queue.dropped == 2
+
+    asyncio.run(main())
+
+
+def test_block_pauses_reading_until_drained(keyboard, mode):
+    async def main():
+        queue = EventQueue(capacity=2, overflow="block")
+        got = []
+
+        with queue:
+            await asyncio.sleep(0.02)
+
+            for _ in range(6):
+                keyboard.send((EV_KEY, A, 1), SYN, (EV_KEY, A, 0), SYN)
+                await asyncio.sleep(0.005)
+
+            assert EventDistributor._paused_by == {queue}
+
+            async def consume():
+                async for event in queue:
+                    if isinstance(event, KeyboardEvent.KeyDown):
+                        got.append(event)
+
+                        if len(got) == 6:
+                            queue.stop()
+
+            await asyncio.wait_for(consume(), 1)
+
+        # nothing was lost
+        assert len(got) == 6
+        assert queue.dropped == 0
+        assert EventDistributor._paused_by == set()
+
+    asyncio.run(main())
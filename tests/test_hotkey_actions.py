@@ -0,0 +1,147 @@
+import asyncio
+import threading
+
+import evdev
+import pytest
+
+from src.Main.HotkeyActions import HotkeyAction
+from src.Main.Hotkeys import Hotkey, HotkeyRegistry
+from src.Main.Keyboard import Keyboard
+
+EV_KEY = evdev.ecodes.EV_KEY
+SYN = (evdev.ecodes.EV_SYN, evdev.ecodes.SYN_REPORT, 0)
+
+K = evdev.ecodes.KEY_K
+A = evdev.ecodes.KEY_A
+
+
+def counts(action: HotkeyAction) -> tuple[int, int, int]:
+    return action.running, action.waiting, action.dropped
+
+
+class Gate:
+    """ run is a coroutine function that waits until it's opened """
+    def __init__(self):
+        self.runs = 0
+        self.cancelled = 0
+        self._open = asyncio.Event()
+
+    async def run(self):
+        self.runs += 1
+        try:
+            await self._open.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+    def open(self):
+        self._open.set()
+
+
+def test_bound_actions_dont_make_the_listener_wait(keyboard):
+    async def main():
+        gate = Gate()
+        thread_runs = []
+        thread_gate = threading.Event()
+
+        def blocking():
+            thread_runs.append(None)
+            thread_gate.wait(5)
+
+        Keyboard.bind_to_hotkey(gate.run, Hotkey(K))
+        Keyboard.bind_to_hotkey(
+            blocking, Hotkey(A), run="thread", when_busy="queue"
+        )
+        task = HotkeyRegistry._bindings[K][(gate.run, Hotkey(K))].func
+        thread = HotkeyRegistry._bindings[A][(blocking, Hotkey(A))].func
+        await asyncio.sleep(0.02)
+
+        try:
+            for _ in range(3):
+                keyboard.send((EV_KEY, K, 1), SYN, (EV_KEY, K, 0), SYN)
+                keyboard.send((EV_KEY, A, 1), SYN, (EV_KEY, A, 0), SYN)
+            await asyncio.sleep(0.05)
+
+            assert counts(task) == (1, 0, 2)
+            assert counts(thread) == (1, 2, 0)
+
+            gate.open()
+            thread_gate.set()
+            await asyncio.sleep(0.05)
+
+            assert counts(task) == (0, 0, 2)
+            assert counts(thread) == (0, 0, 0)
+            assert gate.runs == 1
+            assert len(thread_runs) == 3
+        finally:
+            thread_gate.set()
+            Keyboard.unbind_hotkey(gate.run, Hotkey(K))
+            Keyboard.unbind_hotkey(blocking, Hotkey(A))
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("when_busy, waiting, dropped, runs", [
+    ("drop", 0, 3, 2),
+    ("queue", 3, 0, 5),
+    ("coalesce", 1, 2, 3),
+])
+def test_when_busy(when_busy, waiting, dropped, runs):
+    async def main():
+        gate = Gate()
+        action = HotkeyAction.wrap(
+            gate.run, max_running=2, when_busy=when_busy
+        )
+
+        for _ in range(5):
+            action()
+        await asyncio.sleep(0)
+
+        assert counts(action) == (2, waiting, dropped)
+
+        gate.open()
+        await asyncio.sleep(0.02)
+
+        assert counts(action) == (0, 0, dropped)
+        assert gate.runs == runs
+
+    asyncio.run(main())
+
+
+def test_cancel_stops_the_running_and_waiting_runs():
+    async def main():
+        gate = Gate()
+        action = HotkeyAction.wrap(gate.run, when_busy="queue")
+
+        for _ in range(3):
+            action()
+        await asyncio.sleep(0)
+        assert counts(action) == (1, 2, 0)
+
+        action.cancel()
+        await asyncio.sleep(0.01)
+
+        assert counts(action) == (0, 0, 0)
+        assert (gate.runs, gate.cancelled) == (1, 1)
+
+    asyncio.run(main())
+
+
+def test_how_funcs_can_be_ran():
+    def func():
+        pass
+
+    async def coroutine_func():
+        pass
+
+    # nothing to wrap
+    assert HotkeyAction.wrap(func) is func
+
+    with pytest.raises(TypeError):
+        HotkeyAction.wrap(func, run="task")
+
+    with pytest.raises(TypeError):
+        HotkeyAction.wrap(coroutine_func, run="thread")
+
+    with pytest.raises(ValueError):
+        HotkeyAction.wrap(func, run="thread", max_running=0)
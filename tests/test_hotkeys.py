@@ -0,0 +1,384 @@
+import asyncio
+
+import evdev
+import pytest
+
+from benchmarks._fake_device import install_fake_devices
+from src.Events import KeyboardEvent
+from src.Main.CallbackProfiler import CallbackProfiler
+from src.Main.EventQueue import EventDistributor
+from src.Main.Hotkeys import (
+    Hotkey, HotkeyRegistry, HotkeySequence, SequenceRegistry
+)
+from src.Main.Keyboard import Keyboard
+from src.OsAbstractions.Linux.EventApi import LinuxEventApi
+from src.OsAbstractions.Linux.VirtualDevices import VIRTUAL_PHYS_PREFIX
+from tests.conftest import FakeKeyboard
+
+EV_KEY = evdev.ecodes.EV_KEY
+SYN = (evdev.ecodes.EV_SYN, evdev.ecodes.SYN_REPORT, 0)
+
+CTRL = evdev.ecodes.KEY_LEFTCTRL
+K = evdev.ecodes.KEY_K
+C = evdev.ecodes.KEY_C
+X = evdev.ecodes.KEY_X
+A = evdev.ecodes.KEY_A
+BTN_LEFT = evdev.ecodes.BTN_LEFT
+
+
+@pytest.fixture
+def fired(keyboard):
+    """ what the funcs made with bind (below) recorded, in order """
+    fired = []
+
+    yield fired
+
+    for func, sequence in SequenceRegistry.get_bindings():
+        Keyboard.unbind_sequence(func, sequence)
+
+    for func, hotkey in HotkeyRegistry.get_bindings():
+        Keyboard.unbind_hotkey(func, hotkey)
+
+
+def bind(fired: list, name: str, hotkey: Hotkey | HotkeySequence):
+    def func():
+        fired.append(name)
+
+    if isinstance(hotkey, HotkeySequence):
+        Keyboard.bind_to_sequence(func, hotkey)
+    else:
+        Keyboard.bind_to_hotkey(func, hotkey)
+
+    return func
+
+
+async def press(device, *vks: int):
+    """ presses {vks} in order, then releases them in reverse """
+    for vk in vks:
+        device.send((EV_KEY, vk, 1), SYN)
+
+    for vk in reversed(vks):
+        device.send((EV_KEY, vk, 0), SYN)
+
+    await asyncio.sleep(0.02)
+
+
+def test_exclusive_hotkeys_need_exactly_their_keys(keyboard, fired):
+    async def main():
+        bind(fired, "ctrl+k", Hotkey(K, {CTRL}))
+        bind(fired, "k", Hotkey(K))
+        bind(fired, "with k", Hotkey(K, exclusive=False))
+        bind(fired, "with ctrl+k", Hotkey(K, {CTRL}, exclusive=False))
+        await asyncio.sleep(0.02)
+
+        await press(keyboard, CTRL, K)
+        assert sorted(fired) == ["ctrl+k", "with ctrl+k", "with k"]
+
+        fired.clear()
+        await press(keyboard, K)
+        assert sorted(fired) == ["k", "with k"]
+
+        fired.clear()
+        await press(keyboard, CTRL, A, K)
+        assert sorted(fired) == ["with ctrl+k", "with k"]
+
+        # only the press key triggers them
+        fired.clear()
+        await press(keyboard, K, CTRL)
+        assert sorted(fired) == ["k", "with k"]
+
+    asyncio.run(main())
+
+
+def test_the_mouse_buttons_are_ignored_unless_asked_not_to(keyboard, fired):
+    async def main():
+        bind(fired, "k", Hotkey(K))
+        bind(fired, "k, no mouse", Hotkey(K, ignore_mouse=False))
+        await asyncio.sleep(0.02)
+
+        await press(keyboard, K)
+        assert sorted(fired) == ["k", "k, no mouse"]
+
+        fired.clear()
+        await press(keyboard, BTN_LEFT, K)
+        assert fired == ["k"]
+
+    asyncio.run(main())
+
+
+def test_unbound_hotkeys_dont_fire(keyboard, fired):
+    async def main():
+        func = bind(fired, "k", Hotkey(K))
+        bind(fired, "ctrl+k", Hotkey(K, {CTRL}))
+        await asyncio.sleep(0.02)
+
+        Keyboard.unbind_hotkey(func, Hotkey(K))
+
+        await press(keyboard, K)
+        await press(keyboard, CTRL, K)
+        assert fired == ["ctrl+k"]
+
+        with pytest.raises(TypeError):
+            Keyboard.unbind_hotkey(func, Hotkey(K))
+
+    asyncio.run(main())
+
+
+def test_each_hotkey_is_profiled_on_its_own(keyboard, fired, monkeypatch):
+    monkeypatch.setattr(CallbackProfiler, "enabled", True)
+    monkeypatch.setattr(CallbackProfiler, "_stats", {})
+
+    async def main():
+        k = bind(fired, "k", Hotkey(K))
+        with_k = bind(fired, "with k", Hotkey(K, exclusive=False))
+        await asyncio.sleep(0.02)
+
+        await press(keyboard, K)
+        await press(keyboard, K)
+
+        assert sorted(fired) == ["k", "k", "with k", "with k"]
+        assert CallbackProfiler._stats[k].summary()["count"] == 2
+        assert CallbackProfiler._stats[with_k].summary()["count"] == 2
+
+    asyncio.run(main())
+
+
+def test_sequences_fire_when_completed_in_time(keyboard, fired):
+    async def main():
+        bind(fired, "kc", HotkeySequence(
+            Hotkey(K, {CTRL}), Hotkey(C, {CTRL}), timeout_ms=100
+        ))
+        bind(fired, "kx", HotkeySequence(
+            Hotkey(K, {CTRL}), Hotkey(X, {CTRL}), timeout_ms=100
+        ))
+        bind(fired, "aa", HotkeySequence(A, A, timeout_ms=100))
+        await asyncio.sleep(0.02)
+
+        # sharing the first step
+        await press(keyboard, CTRL, K)
+        await press(keyboard, CTRL, C)
+        assert fired == ["kc"]
+
+        # holding ctrl through the steps
+        await press(keyboard, CTRL, K)
+        keyboard.send((EV_KEY, CTRL, 1), SYN)
+        await press(keyboard, X)
+        keyboard.send((EV_KEY, CTRL, 0), SYN)
+        await asyncio.sleep(0.02)
+        assert fired == ["kc", "kx"]
+
+        # the third a only starts the next one
+        await press(keyboard, A)
+        await press(keyboard, A)
+        await press(keyboard, A)
+        assert fired == ["kc", "kx", "aa"]
+
+        # which times out
+        await asyncio.sleep(0.15)
+        assert SequenceRegistry._active == {}
+
+    asyncio.run(main())
+
+
+def test_sequences_are_broken_by_other_keys_and_timeouts(keyboard, fired):
+    async def main():
+        bind(fired, "kc", HotkeySequence(
+            Hotkey(K, {CTRL}), Hotkey(C, {CTRL}), timeout_ms=100
+        ))
+        await asyncio.sleep(0.02)
+
+        await press(keyboard, CTRL, K)
+        await press(keyboard, A)
+        await press(keyboard, CTRL, C)
+
+        await press(keyboard, CTRL, K)
+        await asyncio.sleep(0.15)
+        await press(keyboard, CTRL, C)
+
+        assert fired == []
+
+    asyncio.run(main())
+
+
+def test_sequences_sharing_a_prefix_keep_their_own_timeouts(
+        keyboard, fired
+):
+    async def main():
+        bind(fired, "kc", HotkeySequence(
+            Hotkey(K, {CTRL}), Hotkey(C, {CTRL}), timeout_ms=50
+        ))
+        bind(fired, "kx", HotkeySequence(
+            Hotkey(K, {CTRL}), Hotkey(X, {CTRL}), timeout_ms=1000
+        ))
+        bind(fired, "kxa", HotkeySequence(
+            Hotkey(K, {CTRL}), Hotkey(X, {CTRL}), A, timeout_ms=50
+        ))
+        bind(fired, "kxc", HotkeySequence(
+            Hotkey(K, {CTRL}), Hotkey(X, {CTRL}), C, timeout_ms=1000
+        ))
+        await asyncio.sleep(0.02)
+
+        # only the prefix of the long one is still waiting
+        await press(keyboard, CTRL, K)
+        await asyncio.sleep(0.2)
+        await press(keyboard, CTRL, C)
+        assert fired == []
+
+        # and a quick last step doesn't make up for a slow one before it
+        await press(keyboard, CTRL, K)
+        await asyncio.sleep(0.2)
+        await press(keyboard, CTRL, X)
+        await press(keyboard, A)
+        assert fired == ["kx"]
+
+        await press(keyboard, CTRL, K)
+        await asyncio.sleep(0.2)
+        await press(keyboard, CTRL, X)
+        await press(keyboard, C)
+        assert fired == ["kx", "kx", "kxc"]
+
+        # in time for all of them
+        fired.clear()
+        await press(keyboard, CTRL, K)
+        await press(keyboard, CTRL, C)
+        assert fired == ["kc"]
+
+    asyncio.run(main())
+
+
+def test_unbinding_the_sequences_empties_the_trie(keyboard, fired):
+    async def main():
+        bind(fired, "kc", HotkeySequence(
+            Hotkey(K, {CTRL}), Hotkey(C, {CTRL})
+        ))
+        bind(fired, "kx", HotkeySequence(
+            Hotkey(K, {CTRL}), Hotkey(X, {CTRL})
+        ))
+        await asyncio.sleep(0.02)
+
+        await press(keyboard, CTRL, K)
+
+        for func, sequence in SequenceRegistry.get_bindings():
+            Keyboard.unbind_sequence(func, sequence)
+
+        assert SequenceRegistry._root.children == {}
+        assert SequenceRegistry._active == {}
+
+    asyncio.run(main())
+
+
+async def hold(device, vk: int, seconds: float):
+    device.send((EV_KEY, vk, 1), SYN)
+    await asyncio.sleep(seconds)
+    device.send((EV_KEY, vk, 0), SYN)
+    await asyncio.sleep(0.02)
+
+
+def test_tap_hold_and_release_triggers(keyboard, fired):
+    async def main():
+        bind(fired, "tap", Hotkey(A, trigger="tap", delay_ms=100))
+        bind(fired, "hold", Hotkey(A, trigger="hold", delay_ms=100))
+        bind(fired, "release", Hotkey(A, trigger="release"))
+        await asyncio.sleep(0.02)
+
+        # both on the same release
+        await press(keyboard, A)
+        assert sorted(fired) == ["release", "tap"]
+        fired.clear()
+
+        # fires while it's still held, and isn't a tap
+        keyboard.send((EV_KEY, A, 1), SYN)
+        await asyncio.sleep(0.15)
+        assert fired == ["hold"]
+
+        keyboard.send((EV_KEY, A, 0), SYN)
+        await asyncio.sleep(0.02)
+        assert fired == ["hold", "release"]
+
+    asyncio.run(main())
+
+
+def test_a_tap_waits_to_see_if_its_a_double_tap(keyboard, fired):
+    async def main():
+        bind(fired, "tap", Hotkey(A, trigger="tap", delay_ms=100))
+        bind(fired, "double", Hotkey(A, trigger="double_tap", delay_ms=100))
+        await asyncio.sleep(0.02)
+
+        await press(keyboard, A)
+        assert fired == []
+
+        await asyncio.sleep(0.15)
+        assert fired == ["tap"]
+        fired.clear()
+
+        await press(keyboard, A)
+        await press(keyboard, A)
+        await asyncio.sleep(0.15)
+        assert fired == ["double"]
+        fired.clear()
+
+        # too slow for a double tap, so two taps
+        await press(keyboard, A)
+        await asyncio.sleep(0.15)
+        await press(keyboard, A)
+        await asyncio.sleep(0.15)
+        assert fired == ["tap", "tap"]
+
+        assert HotkeyRegistry._pending_taps == {}
+
+    asyncio.run(main())
+
+
+def test_a_long_press_is_no_tap(keyboard, fired):
+    async def main():
+        bind(fired, "tap", Hotkey(A, trigger="tap", delay_ms=100))
+        await asyncio.sleep(0.02)
+
+        await hold(keyboard, A, 0.15)
+        await asyncio.sleep(0.15)
+
+        assert fired == []
+
+    asyncio.run(main())
+
+
+def test_tagged_own_events_dont_trigger_hotkeys_or_replacements(
+        keyboard, fired, monkeypatch
+):
+    own = FakeKeyboard(name="InputMgr keyboard", path="/dev/input/fake-own")
+    own.phys = f"{VIRTUAL_PHYS_PREFIX}/keyboard"
+    install_fake_devices(keyboard, own)
+    monkeypatch.setattr(LinuxEventApi, "synthetic_events", "tag")
+
+    typed = []
+    monkeypatch.setattr(Keyboard, "typewrite", typed.append)
+
+    async def main():
+        events = []
+        EventDistributor.add_callback(events.append, KeyboardEvent.KeyDown)
+
+        bind(fired, "a", Hotkey(A))
+        bind(fired, "kc", HotkeySequence(K, C))
+        Keyboard.add_text_replacement("ka", "x")
+        await asyncio.sleep(0.02)
+
+        try:
+            await press(own, K)
+            await press(own, C)
+            await press(own, K)
+            await press(own, A)
+
+            # they're still there, just tagged
+            assert [event.synthetic for event in events] == [True] * 4
+            assert fired == []
+            assert typed == []
+
+            await press(keyboard, K)
+            await press(keyboard, A)
+            assert fired == ["a"]
+            assert typed == ["\b\bx"]
+        finally:
+            Keyboard.remove_text_replacement("ka")
+            EventDistributor.remove_callback(events.append)
+
+    asyncio.run(main())
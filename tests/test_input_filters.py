@@ -0,0 +1,156 @@
+import evdev
+import pytest
+
+from benchmarks._fake_device import FakePassthrough
+from src.Events import KeyboardEvent
+from src.OsAbstractions.Linux import EventApi
+from src.OsAbstractions.Linux.EventApi import LinuxEventApi
+from src.OsAbstractions.Linux.InputFilter import consume_keys
+
+EV_KEY = evdev.ecodes.EV_KEY
+SYN = (evdev.ecodes.EV_SYN, evdev.ecodes.SYN_REPORT, 0)
+
+A = evdev.ecodes.KEY_A
+B = evdev.ecodes.KEY_B
+
+
+@pytest.fixture
+def passthrough(keyboard, monkeypatch):
+    """ where the events of the grabbed keyboard are forwarded to """
+    passthrough = FakePassthrough()
+    monkeypatch.setattr(
+        EventApi, "make_passthrough_device", lambda device: passthrough
+    )
+
+    yield passthrough
+
+    LinuxEventApi.set_key_remap(None)
+    for input_filter in LinuxEventApi._input_filters:
+        LinuxEventApi.remove_input_filter(input_filter)
+
+    LinuxEventApi.un_suppress()
+
+
+def keys(events) -> list[tuple[int, int]]:
+    """ the key events as (code, value) """
+    return [
+        (code, value)
+        for type_, code, value in events
+        if type_ == EV_KEY
+    ]
+
+
+def read(device) -> list[tuple[int, int]]:
+    """ the key events we got from {device}, as (vk, value) """
+    return [
+        (event.key_data.vk, int(isinstance(event, KeyboardEvent.KeyDown)))
+        for event in LinuxEventApi._read_events(device.fd)
+        if isinstance(event, KeyboardEvent.KeyDown | KeyboardEvent.KeyUp)
+    ]
+
+
+def test_filters_decide_what_is_forwarded(keyboard, passthrough):
+    LinuxEventApi.start_listening()
+    LinuxEventApi.add_input_filter(consume_keys(A))
+
+    assert LinuxEventApi._grabbed == {keyboard.fd}
+
+    keyboard.send((EV_KEY, A, 1), SYN, (EV_KEY, B, 1), SYN)
+
+    # we still get everything, the rest of the system doesn't
+    assert read(keyboard) == [(A, 1), (B, 1)]
+    assert keys(passthrough.read_forwarded()) == [(B, 1)]
+
+
+def test_removing_the_last_filter_ungrabs(keyboard, passthrough):
+    LinuxEventApi.start_listening()
+
+    input_filter = consume_keys(A)
+    LinuxEventApi.add_input_filter(input_filter)
+    LinuxEventApi.remove_input_filter(input_filter)
+
+    assert LinuxEventApi._grabbed == set()
+    assert LinuxEventApi._passthroughs == {}
+
+
+def test_suppressing_forwards_nothing(keyboard, passthrough):
+    LinuxEventApi.start_listening()
+    LinuxEventApi.add_input_filter(consume_keys(A))
+    LinuxEventApi.suppress()
+
+    keyboard.send((EV_KEY, B, 1), SYN)
+
+    assert read(keyboard) == [(B, 1)]
+    assert LinuxEventApi._grabbed == {keyboard.fd}
+    assert LinuxEventApi._passthroughs == {}
+    assert passthrough.read_forwarded() == []
+
+
+CAPS_LOCK = evdev.ecodes.KEY_CAPSLOCK
+ESC = evdev.ecodes.KEY_ESC
+MACRO = evdev.ecodes.KEY_PROG1
+H = evdev.ecodes.KEY_H
+I = evdev.ecodes.KEY_I
+
+
+def test_remapped_keys_are_forwarded_as_their_target(keyboard, passthrough):
+    LinuxEventApi.start_listening()
+    LinuxEventApi.set_key_remap({CAPS_LOCK: ESC})
+
+    keyboard.send(
+        (EV_KEY, CAPS_LOCK, 1), SYN,
+        (EV_KEY, CAPS_LOCK, 2), SYN,
+        (EV_KEY, CAPS_LOCK, 0), SYN,
+        (EV_KEY, A, 1), SYN,
+    )
+
+    # we still get the original key
+    assert read(keyboard) == [(CAPS_LOCK, 1), (CAPS_LOCK, 0), (A, 1)]
+    assert keys(passthrough.read_forwarded()) == [
+        (ESC, 1), (ESC, 2), (ESC, 0), (A, 1)
+    ]
+
+
+def test_a_key_held_while_the_remap_changes_keeps_its_target(
+        keyboard, passthrough
+):
+    LinuxEventApi.start_listening()
+    LinuxEventApi.set_key_remap({CAPS_LOCK: ESC})
+
+    keyboard.send((EV_KEY, CAPS_LOCK, 1), SYN)
+    read(keyboard)
+
+    LinuxEventApi.set_key_remap({CAPS_LOCK: A})
+    keyboard.send((EV_KEY, CAPS_LOCK, 0), SYN)
+    keyboard.send((EV_KEY, CAPS_LOCK, 1), SYN, (EV_KEY, CAPS_LOCK, 0), SYN)
+    read(keyboard)
+
+    assert keys(passthrough.read_forwarded()) == [
+        (ESC, 1), (ESC, 0), (A, 1), (A, 0)
+    ]
+
+
+def test_a_key_remapped_to_a_sequence_taps_it(keyboard, passthrough):
+    LinuxEventApi.start_listening()
+    LinuxEventApi.set_key_remap({MACRO: [H, I]})
+
+    keyboard.send(
+        (EV_KEY, MACRO, 1), SYN,
+        (EV_KEY, MACRO, 2), SYN,
+        (EV_KEY, MACRO, 0), SYN,
+    )
+    read(keyboard)
+
+    # the repeat and the release are swallowed
+    assert keys(passthrough.read_forwarded()) == [
+        (H, 1), (H, 0), (I, 1), (I, 0)
+    ]
+
+
+def test_removing_the_remap_ungrabs(keyboard, passthrough):
+    LinuxEventApi.start_listening()
+    LinuxEventApi.set_key_remap({CAPS_LOCK: ESC})
+    LinuxEventApi.set_key_remap(None)
+
+    assert LinuxEventApi._input_filters == []
+    assert LinuxEventApi._grabbed == set()
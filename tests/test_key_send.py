@@ -0,0 +1,73 @@
+import dataclasses
+
+import evdev
+
+from src.Events import KeyboardEvent
+from src.OsAbstractions.Linux.EventApi import LinuxEventApi
+from src.OsAbstractions.Linux.LinuxVk.LinuxLayout import LinuxLayout
+
+EV_KEY = evdev.ecodes.EV_KEY
+SYN = (evdev.ecodes.EV_SYN, evdev.ecodes.SYN_REPORT, 0)
+
+A = evdev.ecodes.KEY_A
+# ¨ on the example layout (see LinuxLayout._load_vk_table)
+DIAERESIS = evdev.ecodes.KEY_RIGHTBRACE
+
+
+def key_send(chars) -> KeyboardEvent.KeySend:
+    return KeyboardEvent.KeySend(
+        time_ms=0, raw=None, key_data=LinuxLayout.for_vk(A, frozenset()),
+        chars=chars,
+    )
+
+
+def test_the_chars_are_calculated_once_when_read():
+    calls = []
+
+    def calc():
+        calls.append(None)
+        return "a"
+
+    event = key_send(calc)
+    hash(event)
+    assert calls == []
+
+    assert event.chars == "a"
+    assert event.chars == "a"
+    assert calls == [None]
+
+
+def test_the_chars_are_compared_and_shown():
+    assert key_send(lambda: "a") == key_send("a")
+    assert key_send("a") != key_send("b")
+
+    assert "chars='a'" in repr(key_send(lambda: "a"))
+
+    event = dataclasses.replace(key_send(lambda: "a"))
+    assert event.chars == "a"
+
+
+def test_dead_keys_dont_depend_on_when_the_chars_are_read(
+        keyboard, monkeypatch
+):
+    # as if someone wants the KeySends
+    monkeypatch.setattr(LinuxEventApi, "wanted_event_types", None)
+    LinuxEventApi.start_listening()
+
+    keyboard.send(
+        (EV_KEY, DIAERESIS, 1), SYN, (EV_KEY, DIAERESIS, 0), SYN,
+        (EV_KEY, DIAERESIS, 1), SYN, (EV_KEY, DIAERESIS, 0), SYN,
+        (EV_KEY, A, 1), SYN, (EV_KEY, A, 0), SYN,
+    )
+
+    sends = [
+        event
+        for event in LinuxEventApi._read_events(keyboard.fd)
+        if isinstance(event, KeyboardEvent.KeySend)
+    ]
+    dead = LinuxLayout.for_vk(DIAERESIS, frozenset())
+
+    # read after all of them are decoded, last first
+    assert [event.chars for event in reversed(sends)] == [
+        "a", dead.get_resulting_char(), ""
+    ]
@@ -0,0 +1,46 @@
+import pytest
+
+from src.OsAbstractions.Linux.Mouse.PointerTracker import PointerTracker
+
+
+@pytest.fixture
+def tracker(monkeypatch):
+    """ a PointerTracker that only resyncs for clamping """
+    monkeypatch.setattr(PointerTracker, "resync_interval_ms", None)
+    monkeypatch.setattr(PointerTracker, "resync_events", None)
+    PointerTracker.reset()
+
+    # the fake display has the pointer at (10, 20)
+    assert PointerTracker.get_pos() == (10, 20)
+
+    yield PointerTracker
+
+    PointerTracker.reset()
+
+
+def test_pushing_against_the_edge_resyncs_at_most_every_min_interval(
+        tracker, monkeypatch
+):
+    monkeypatch.setattr(tracker, "min_resync_interval_ms", 10 ** 6)
+    resyncs = tracker.resyncs
+
+    assert tracker.move(-10, 0) == (0, 20)
+    for _ in range(100):
+        assert tracker.move(-5, 0) == (0, 20)
+
+    assert tracker.resyncs == resyncs
+
+    monkeypatch.setattr(tracker, "min_resync_interval_ms", 0)
+
+    # the display says it's still at (10, 20)
+    assert tracker.move(-50, 0) == (10, 20)
+    assert tracker.resyncs == resyncs + 1
+
+
+def test_moves_inside_the_screen_dont_resync(tracker, monkeypatch):
+    monkeypatch.setattr(tracker, "min_resync_interval_ms", 0)
+    resyncs = tracker.resyncs
+
+    assert tracker.move(5, 5) == (15, 25)
+    assert tracker.move(-5, 0) == (10, 25)
+    assert tracker.resyncs == resyncs